@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+哈希算法和破解模式性能测试
+在临时目录中生成随机字典，对每种哈希算法分别以不加盐、加盐、批量、多进程四种模式
+遍历整个字典（目标为随机摘要，不会提前命中），报告每秒候选密码数，
+不需要真实的字典文件，可作为破解速度的回归检查
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+from hashers import available_hashers, get_hasher
+from parallel_cracker import crack_parallel, crack_range
+from wordlist import load_wordlist
+
+MODES = ("plain", "salted", "batch", "parallel")
+
+# 默认参与测试的算法，PBKDF2 的迭代次数取常见的下限
+DEFAULT_ALGORITHMS = available_hashers() + ["pbkdf2-sha256:1000"]
+
+
+def make_wordlist(path, count, seed=0):
+    """
+    生成随机字典，每行一个6到12位的小写字母和数字组合
+
+    Args:
+        path (str): 字典路径
+        count (int): 行数
+        seed (int): 随机种子
+    """
+    rng = random.Random(seed)
+    chars = string.ascii_lowercase + string.digits
+    with open(path, "w", encoding="ascii") as f:
+        for _ in range(count):
+            f.write("".join(rng.choices(chars, k=rng.randint(6, 12))) + "\n")
+
+
+def benchmark_mode(path, hasher, mode, salts=None, batch_size=10000, processes=None, seed=0):
+    """
+    用指定算法和模式遍历一次字典并统计速度
+
+    Args:
+        path (str): 字典路径
+        hasher (str or Hasher): 哈希算法
+        mode (str): "plain"（单个目标）、"salted"（单个目标，每个盐值作为前缀和后缀）、
+            "batch"（batch_size 个目标）或 "parallel"（单个目标，多进程）
+        salts (list): salted 模式使用的盐值（bytes）
+        batch_size (int): batch 模式的目标数
+        processes (int): parallel 模式的进程数，默认为CPU核数
+        seed (int): 生成随机目标的种子
+
+    Returns:
+        dict: 算法、模式、候选密码数、耗时和每秒候选密码数
+    """
+    hasher = get_hasher(hasher)
+    rng = random.Random(seed)
+    count = batch_size if mode == "batch" else 1
+    targets = {rng.randbytes(hasher.digest_size) for _ in range(count)}
+    wordlist = load_wordlist(path)
+    candidates = sum(1 for _ in wordlist.lines())
+
+    start = time.perf_counter()
+    if mode == "parallel":
+        crack_parallel(path, targets, processes=processes, hasher=hasher)
+    elif mode == "salted":
+        crack_range(path, 0, wordlist.size, targets, salts, hasher=hasher)
+        candidates *= 2 * len(salts)
+    elif mode in ("plain", "batch"):
+        crack_range(path, 0, wordlist.size, targets, hasher=hasher)
+    else:
+        raise ValueError(f"Unknown mode: {mode!r}")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "algorithm": hasher.name,
+        "mode": mode,
+        "candidates": candidates,
+        "elapsed": elapsed,
+        "candidates_per_sec": candidates / elapsed if elapsed else float("inf"),
+    }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="在随机字典上测试各哈希算法和破解模式的速度")
+    parser.add_argument("--algorithms", nargs="+", default=DEFAULT_ALGORITHMS,
+                        help="哈希算法，如 sha1 md5 pbkdf2-sha256:10000")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--words", type=int, default=200000, help="快速算法使用的字典行数")
+    parser.add_argument("--slow-words", type=int, default=500, help="慢速算法使用的字典行数")
+    parser.add_argument("--salts", type=int, default=4, help="salted 模式的盐值数量")
+    parser.add_argument("--batch-size", type=int, default=10000, help="batch 模式的目标数")
+    parser.add_argument("--processes", type=int, default=None, help="parallel 模式的进程数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    hashers = [get_hasher(name) for name in args.algorithms]
+    salts = [f"salt{i}".encode("ascii") for i in range(args.salts)]
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        fast_path = os.path.join(directory, "fast.txt")
+        slow_path = os.path.join(directory, "slow.txt")
+        make_wordlist(fast_path, args.words)
+        make_wordlist(slow_path, args.slow_words)
+        for hasher in hashers:
+            path = slow_path if hasher.slow else fast_path
+            for mode in args.modes:
+                reports.append(benchmark_mode(path, hasher, mode, salts, args.batch_size,
+                                              args.processes))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print(f"随机字典 {args.words} 行（慢速算法 {args.slow_words} 行），{args.salts} 个盐值，"
+              f"批量 {args.batch_size} 个目标")
+        print(f"{'ALGORITHM':<20} {'MODE':<10} {'CANDIDATES':>11} {'SECONDS':>9} "
+              f"{'CANDIDATES/SEC':>15}")
+        for report in reports:
+            print(f"{report['algorithm']:<20} {report['mode']:<10} {report['candidates']:>11} "
+                  f"{report['elapsed']:>9.3f} {report['candidates_per_sec']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+大规模目标哈希的布隆过滤器
+审计数百万个泄露的哈希时，把摘要全部放入集合要占用数GB内存。
+这里把目标摘要外部排序后写入文件，再按目标数和期望的误判率生成布隆过滤器，两者都内存映射：
+每个候选密码的摘要先查布隆过滤器（绝大多数在第一、二个位上就被排除），
+只有命中过滤器时才在有序摘要文件中二分查找确认，内存占用与目标数几乎无关
+"""
+
+import bisect
+import heapq
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+from sha1_index import atomic_open
+
+# 有序摘要文件头：魔数、摘要字节数、摘要数，其后为按字节排序且不重复的摘要
+_DIGESTS_MAGIC = b"DIGESTS\x00"
+_DIGESTS_HEADER = struct.Struct("<8sHQ")
+
+# 布隆过滤器文件头：魔数、位数、哈希函数个数，其后为位数组
+_BLOOM_MAGIC = b"BLOOM\x00\x00\x00"
+_BLOOM_HEADER = struct.Struct("<8sQI")
+
+BLOOM_SUFFIX = ".bloom"
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+# 外部排序时每个有序段的摘要数
+RUN_SIZE = 1 << 20
+
+
+def bloom_parameters(count, false_positive_rate):
+    """
+    按元素数和误判率计算布隆过滤器的位数和哈希函数个数
+
+    Args:
+        count (int): 元素数
+        false_positive_rate (float): 期望的误判率，0 < rate < 1
+
+    Returns:
+        tuple: (位数, 哈希函数个数)
+    """
+    if not 0 < false_positive_rate < 1:
+        raise ValueError(f"Invalid false positive rate: {false_positive_rate}")
+    count = max(count, 1)
+    size = max(8, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+    return size, max(1, round(size / count * math.log(2)))
+
+
+def _positions(digest, size, hash_count):
+    """摘要对应的全部位置"""
+    value = int.from_bytes(digest, "little")
+    index = value % size
+    step = (value >> 64) % size | 1
+    positions = [index]
+    for _ in range(hash_count - 1):
+        index = (index + step) % size
+        positions.append(index)
+    return positions
+
+
+def _make_probe(bits, size, hash_count):
+    """
+    返回检查摘要是否可能在过滤器中的函数
+
+    位置的计算方式与 _positions 相同；各参数作为闭包变量，避免每次检查时查找属性，
+    不在过滤器中的摘要大多在第一、二个位置上就返回。
+    """
+    from_bytes = int.from_bytes
+    rest = range(hash_count - 1)
+
+    def probe(digest):
+        value = from_bytes(digest, "little")
+        index = value % size
+        if not bits[index >> 3] >> (index & 7) & 1:
+            return False
+        step = (value >> 64) % size | 1
+        for _ in rest:
+            index = (index + step) % size
+            if not bits[index >> 3] >> (index & 7) & 1:
+                return False
+        return True
+
+    return probe
+
+
+class BloomFilter:
+    """
+    以摘要为元素的布隆过滤器
+
+    元素本身就是密码学哈希的输出，直接把摘要当作整数，对位数取模得到第一个位置，
+    高位部分取模得到步长，第 i 个位置为第一个位置加 i 倍步长（双重哈希），不需要再计算任何哈希。
+    """
+
+    def __init__(self, size, hash_count, bits=None):
+        """
+        Args:
+            size (int): 位数
+            hash_count (int): 哈希函数个数
+            bits: 位数组（bytearray、bytes 或内存映射），默认为全零
+        """
+        self.size = size
+        self.hash_count = hash_count
+        self._bits = bytearray((size + 7) // 8) if bits is None else bits
+        self.probe = _make_probe(self._bits, size, hash_count)
+
+    def add(self, digest):
+        """
+        加入一个摘要
+
+        Args:
+            digest (bytes): 不短于16字节的摘要
+        """
+        bits = self._bits
+        for index in _positions(digest, self.size, self.hash_count):
+            bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, digest):
+        return self.probe(digest)
+
+    def save(self, path):
+        """
+        写入文件，通过 sha1_index.atomic_open 先写临时文件再原子替换
+
+        Args:
+            path (str): 文件路径
+        """
+        with atomic_open(path) as f:
+            f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.size, self.hash_count))
+            f.write(self._bits)
+
+
+def _write_run(directory, digests):
+    """把一段摘要排序去重后写入临时文件，返回文件路径"""
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"".join(sorted(set(digests))))
+    return path
+
+
+def _read_run(path, digest_size):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(digest_size * 4096), b""):
+            for start in range(0, len(chunk), digest_size):
+                yield chunk[start:start + digest_size]
+
+
+def build_target_set(digests, path, digest_size, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+    """
+    把目标摘要写入有序摘要文件，并生成对应的布隆过滤器文件（路径加 ".bloom"）
+
+    摘要按 RUN_SIZE 个一段排序后写入临时文件，再多路归并去重，
+    内存占用只取决于 RUN_SIZE，与摘要总数无关。
+
+    Args:
+        digests (iterable): 目标摘要（bytes），可以重复，长度不等于 digest_size 的被忽略
+        path (str): 有序摘要文件路径
+        digest_size (int): 摘要字节数，不小于16
+        false_positive_rate (float): 布隆过滤器期望的误判率
+
+    Returns:
+        int: 不重复的摘要数
+    """
+    if digest_size < 16:
+        raise ValueError(f"Invalid digest size: {digest_size}")
+    directory = os.path.dirname(os.path.abspath(path))
+    runs = []
+    try:
+        run = []
+        for digest in digests:
+            if len(digest) != digest_size:
+                continue
+            run.append(digest)
+            if len(run) >= RUN_SIZE:
+                runs.append(_write_run(directory, run))
+                run = []
+        if run or not runs:
+            runs.append(_write_run(directory, run))
+
+        count = 0
+        with atomic_open(path) as f:
+            f.write(_DIGESTS_HEADER.pack(_DIGESTS_MAGIC, digest_size, 0))
+            previous = None
+            for digest in heapq.merge(*(_read_run(run, digest_size) for run in runs)):
+                if digest != previous:
+                    f.write(digest)
+                    count += 1
+                    previous = digest
+            f.seek(0)
+            f.write(_DIGESTS_HEADER.pack(_DIGESTS_MAGIC, digest_size, count))
+    finally:
+        for run in runs:
+            os.remove(run)
+
+    bloom = BloomFilter(*bloom_parameters(count, false_positive_rate))
+    with open(path, "rb") as f:
+        f.seek(_DIGESTS_HEADER.size)
+        for chunk in iter(lambda: f.read(digest_size * 4096), b""):
+            for start in range(0, len(chunk), digest_size):
+                bloom.add(chunk[start:start + digest_size])
+    bloom.save(path + BLOOM_SUFFIX)
+    return count
+
+
+class TargetSet:
+    """
+    内存映射的目标摘要集合，可以代替 set 交给 crack_range、crack_parallel 和 crack_mask
+
+    ``digest in targets`` 先查布隆过滤器，命中时再在有序摘要文件中二分查找确认，
+    结果与集合完全一致。序列化时只传递路径，工作进程重新映射同一组文件，共享页缓存。
+    """
+
+    def __init__(self, path):
+        """
+        打开 build_target_set 生成的文件
+
+        Args:
+            path (str): 有序摘要文件路径
+
+        Raises:
+            ValueError: 文件格式不正确
+        """
+        self.path = path
+        self._open()
+
+    def _open(self):
+        path = self.path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.digest_size, self._count = _DIGESTS_HEADER.unpack_from(self._map, 0)
+        if (magic != _DIGESTS_MAGIC
+                or len(self._map) != _DIGESTS_HEADER.size + self._count * self.digest_size):
+            self._map.close()
+            raise ValueError(f"Invalid digest file: {path}")
+        with open(path + BLOOM_SUFFIX, "rb") as f:
+            self._bloom_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, hash_count = _BLOOM_HEADER.unpack_from(self._bloom_map, 0)
+        if magic != _BLOOM_MAGIC or len(self._bloom_map) != _BLOOM_HEADER.size + (size + 7) // 8:
+            self.close()
+            raise ValueError(f"Invalid bloom filter: {path + BLOOM_SUFFIX}")
+        self._bits = memoryview(self._bloom_map)[_BLOOM_HEADER.size:]
+        self.bloom = BloomFilter(size, hash_count, self._bits)
+        self._probe = self.bloom.probe
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = _DIGESTS_HEADER.size + index * self.digest_size
+        return self._map[start:start + self.digest_size]
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def __contains__(self, digest):
+        if not self._probe(digest):
+            return False
+        index = bisect.bisect_left(self, digest)
+        return index < self._count and self[index] == digest
+
+    def close(self):
+        """解除内存映射"""
+        bits = getattr(self, "_bits", None)
+        if bits is not None:
+            # 位数组的视图释放后才能解除映射
+            self.bloom = self._probe = None
+            bits.release()
+            self._bits = None
+        if getattr(self, "_bloom_map", None) is not None:
+            self._bloom_map.close()
+        self._map.close()
@@ -0,0 +1,135 @@
+"""
+可替换的哈希算法
+破解流程只通过 Hasher.new(候选密码).digest() 计算摘要，与 hashlib 的构造函数用法一致，
+hashlib 支持的算法因此不多一层函数调用。算法在每次调用时用名称选择：
+"sha1"（默认）、"sha256"、"md5"、"ntlm"（需要 hashlib 支持 md4），
+以及 "pbkdf2-<算法>:<迭代次数>[:<十六进制盐值>]" 形式的 PBKDF2
+"""
+
+import hashlib
+
+DEFAULT_HASHER = "sha1"
+
+
+class Hasher:
+    """
+    一种哈希算法
+
+    Attributes:
+        name (str): 算法名称，与 get_hasher 的参数一致，也用于区分 potfile 中的记录
+        new (callable): new(bytes) 返回有 digest() 方法的对象
+        digest_size (int): 摘要字节数
+        block_size (int): 分块大小，new 返回的对象支持 copy() 和 update() 时提供，否则为None
+        slow (bool): 是否为慢速的密钥派生函数，慢速算法自动使用多进程破解
+    """
+
+    def __init__(self, name, new, digest_size, block_size=None, slow=False):
+        self.name = name
+        self.new = new
+        self.digest_size = digest_size
+        self.block_size = block_size
+        self.slow = slow
+
+    def __repr__(self):
+        return f"Hasher({self.name!r})"
+
+    def digest(self, data):
+        """
+        计算摘要
+
+        Args:
+            data (bytes): 候选密码
+
+        Returns:
+            bytes: 摘要
+        """
+        return self.new(data).digest()
+
+
+class _Digest:
+    """已经算好的摘要，给不是 hashlib 对象的算法提供 digest() 方法"""
+
+    __slots__ = ("_digest",)
+
+    def __init__(self, digest):
+        self._digest = digest
+
+    def digest(self):
+        return self._digest
+
+
+def _hashlib_hasher(name):
+    new = getattr(hashlib, name)
+    probe = new()
+    return Hasher(name, new, probe.digest_size, probe.block_size)
+
+
+def _ntlm_hasher():
+    """NTLM 为密码的 UTF-16LE 编码的 MD4，hashlib 不支持 md4 时返回None"""
+    try:
+        hashlib.new("md4")
+    except ValueError:
+        return None
+
+    def new(data):
+        password = data.decode("utf-8", "surrogateescape")
+        return hashlib.new("md4", password.encode("utf-16-le", "surrogatepass"))
+
+    return Hasher("ntlm", new, 16)
+
+
+def _pbkdf2_hasher(name):
+    """解析 "pbkdf2-<算法>:<迭代次数>[:<十六进制盐值>]" """
+    try:
+        algorithm, iterations, *rest = name[len("pbkdf2-"):].split(":")
+        iterations = int(iterations)
+        salt = bytes.fromhex(rest[0]) if rest else b""
+        digest_size = hashlib.new(algorithm).digest_size
+    except ValueError:
+        raise ValueError(f"Unknown hash algorithm: {name!r}") from None
+    if len(rest) > 1 or iterations < 1:
+        raise ValueError(f"Unknown hash algorithm: {name!r}")
+    pbkdf2_hmac = hashlib.pbkdf2_hmac
+    return Hasher(name, lambda data: _Digest(pbkdf2_hmac(algorithm, data, salt, iterations)),
+                  digest_size, slow=True)
+
+
+# 名称 -> Hasher
+_hashers = {name: _hashlib_hasher(name) for name in ("sha1", "sha256", "md5")}
+_ntlm = _ntlm_hasher()
+if _ntlm is not None:
+    _hashers["ntlm"] = _ntlm
+
+
+def available_hashers():
+    """
+    返回可用的固定名称的算法，PBKDF2 的名称带参数，不在其中
+
+    Returns:
+        list: 算法名称
+    """
+    return list(_hashers)
+
+
+def get_hasher(hasher=None):
+    """
+    按名称返回哈希算法
+
+    Args:
+        hasher (str or Hasher): 算法名称或 Hasher 对象，默认为None（SHA-1）
+
+    Returns:
+        Hasher: 哈希算法
+
+    Raises:
+        ValueError: 未知的算法或当前环境不支持的算法（如没有 md4 时的 "ntlm"）
+    """
+    if isinstance(hasher, Hasher):
+        return hasher
+    name = DEFAULT_HASHER if hasher is None else hasher
+    result = _hashers.get(name)
+    if result is None:
+        if not name.startswith("pbkdf2-"):
+            raise ValueError(f"Unknown hash algorithm: {name!r}")
+        result = _hashers[name] = _pbkdf2_hasher(name)
+    return result
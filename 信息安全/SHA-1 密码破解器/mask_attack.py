@@ -0,0 +1,293 @@
+"""
+掩码（暴力）攻击
+按掩码（如 "?u?l?l?l?d?d"）枚举密码空间，每个候选密码对应一个下标，
+密码空间按下标切分为连续的块交给进程池，各进程互不依赖；
+已完成的下标范围可以记录到文件中，中断后从上次的位置继续
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import string
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from hashers import get_hasher
+from sha1_index import atomic_open
+
+# 掩码中 ?x 代表的字符集
+CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "h": "0123456789abcdef",
+}
+CHARSETS["a"] = CHARSETS["l"] + CHARSETS["u"] + CHARSETS["d"] + CHARSETS["s"]
+
+# 每个块的候选密码数，一个块在一个进程中约需一秒
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# 工作进程每处理这么多个前缀检查一次是否已被取消
+CANCEL_CHECK_PREFIXES = 256
+
+
+class Mask:
+    """
+    掩码描述的密码空间
+
+    每个位置可以是字面字符，或 ``?l``（小写字母）、``?u``（大写字母）、``?d``（数字）、
+    ``?s``（空格和符号）、``?h``（小写十六进制）、``?a``（以上全部）；``??`` 表示字面的问号。
+    下标按字典序排列：第一个位置变化最慢，最后一个位置变化最快。
+    """
+
+    def __init__(self, mask):
+        """
+        Args:
+            mask (str): 掩码，如 "?u?l?l?l?d?d"
+
+        Raises:
+            ValueError: 掩码格式不正确
+        """
+        self.mask = mask
+        self.positions = []  # 每个位置的候选字符（bytes）列表
+        index = 0
+        while index < len(mask):
+            char = mask[index]
+            if char == "?":
+                if index + 1 >= len(mask):
+                    raise ValueError(f"Invalid mask: {mask!r}")
+                key = mask[index + 1]
+                if key == "?":
+                    chars = "?"
+                elif key in CHARSETS:
+                    chars = CHARSETS[key]
+                else:
+                    raise ValueError(f"Invalid mask: {mask!r}")
+                index += 2
+            else:
+                chars = char
+                index += 1
+            self.positions.append([c.encode("utf-8") for c in chars])
+        if not self.positions:
+            raise ValueError(f"Invalid mask: {mask!r}")
+        self.size = 1
+        for chars in self.positions:
+            self.size *= len(chars)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _digits(self, index):
+        """把下标转换为每个位置的字符序号"""
+        digits = []
+        for chars in reversed(self.positions):
+            index, digit = divmod(index, len(chars))
+            digits.append(digit)
+        digits.reverse()
+        return digits
+
+    def plaintext(self, index):
+        """
+        返回下标对应的候选密码
+
+        Args:
+            index (int): 下标，0 <= index < size
+
+        Returns:
+            bytes: 候选密码
+        """
+        return b"".join(chars[digit] for chars, digit in zip(self.positions, self._digits(index)))
+
+    def crack_range(self, start, end, targets, cancel=None, hasher=None):
+        """
+        计算下标位于 [start, end) 的候选密码的摘要并在目标集合中查找
+
+        最后一个位置之前的部分（前缀）对连续的一组候选密码只拼接一次。
+
+        Args:
+            start (int): 起始下标
+            end (int): 结束下标
+            targets (set): 目标摘要
+            cancel: 提供时定期检查，is_set() 为True时提前结束
+            hasher (str or Hasher): 哈希算法，默认为None（SHA-1）
+
+        Returns:
+            dict: 摘要 -> (下标, 候选密码)
+        """
+        found = {}
+        new = get_hasher(hasher).new
+        positions = self.positions
+        last = positions[-1]
+        digits = self._digits(start)
+        index = start
+        prefixes = 0
+        while index < end:
+            prefix = b"".join(chars[digit] for chars, digit in zip(positions, digits[:-1]))
+            first = digits[-1]
+            stop = min(len(last), first + end - index)
+            for position in range(first, stop):
+                candidate = prefix + last[position]
+                digest = new(candidate).digest()
+                if digest in targets and digest not in found:
+                    found[digest] = (index + position - first, candidate)
+            index += stop - first
+            if len(found) == len(targets):
+                break
+            # 前缀进位
+            digits[-1] = 0
+            for i in range(len(digits) - 2, -1, -1):
+                digits[i] += 1
+                if digits[i] < len(positions[i]):
+                    break
+                digits[i] = 0
+            prefixes += 1
+            if cancel is not None and prefixes % CANCEL_CHECK_PREFIXES == 0 and cancel.is_set():
+                break
+        return found
+
+
+def _write_state(path, state):
+    with atomic_open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def _read_state(path, mask, targets, hasher):
+    """
+    读取续扫位置和之前已找到的目标，掩码、目标或算法不同时从头开始
+
+    Returns:
+        tuple: (续扫位置, 摘要 -> (下标, 候选密码) 的字典)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if (state.get("mask") != mask.mask or state.get("targets") != _targets_key(targets)
+                or state.get("hasher", "sha1") != hasher.name):
+            return 0, {}
+        found = {bytes.fromhex(digest): (index, bytes.fromhex(candidate))
+                 for digest, (index, candidate) in state.get("found", {}).items()}
+        return state.get("next", 0), found
+    except (FileNotFoundError, ValueError, TypeError, AttributeError):
+        return 0, {}
+
+
+def _targets_key(targets):
+    """目标集合的指纹，用于判断续扫文件是否属于同一组目标"""
+    return hashlib.sha1(b"".join(sorted(targets))).hexdigest()
+
+
+# 工作进程的全局状态，由 _init_worker 在进程启动时设置
+_worker_mask = None
+_worker_targets = None
+_worker_cancel = None
+_worker_hasher = None
+
+
+def _init_worker(mask, targets, cancel, hasher):
+    global _worker_mask, _worker_targets, _worker_cancel, _worker_hasher
+    _worker_mask = Mask(mask)
+    _worker_targets = targets
+    _worker_cancel = cancel
+    _worker_hasher = get_hasher(hasher)
+
+
+def _crack_chunk(start, end):
+    if _worker_cancel.is_set():
+        return None
+    return _worker_mask.crack_range(start, end, _worker_targets, _worker_cancel,
+                                    _worker_hasher)
+
+
+def crack_mask(mask, targets, processes=1, start=0, end=None, chunk_size=DEFAULT_CHUNK_SIZE,
+               progress=None, resume=None, hasher=None):
+    """
+    掩码攻击
+
+    把下标范围切分为连续的块，按顺序交给进程池；所有目标都已找到后取消其余的块。
+
+    Args:
+        mask (str or Mask): 掩码
+        targets (set): 目标摘要
+        processes (int): 进程数，默认为1（在当前进程中计算），None表示使用全部CPU核
+        start (int): 起始下标，默认为0
+        end (int): 结束下标，默认为密码空间大小
+        chunk_size (int): 每个块的候选密码数
+        progress (callable): 每完成一个块调用一次 progress(已完成的候选密码数, 总数)
+        resume (str): 续扫文件路径，提供时从文件记录的位置开始，并沿用之前已找到的目标；
+            每完成一个块更新记录（之前的全部下标都已完成的位置和已找到的目标），
+            整个密码空间完成或全部目标都已找到后删除文件
+        hasher (str or Hasher): 哈希算法，默认为None（SHA-1）
+
+    Returns:
+        tuple: (摘要 -> (下标, 候选密码) 的字典, 之前的全部下标都已完成的位置)
+    """
+    if not isinstance(mask, Mask):
+        mask = Mask(mask)
+    hasher = get_hasher(hasher)
+    end = mask.size if end is None else min(end, mask.size)
+    found = {}
+    if resume is not None:
+        resume_index, found = _read_state(resume, mask, targets, hasher)
+        start = max(start, resume_index)
+    chunks = [(low, min(low + chunk_size, end)) for low in range(start, end, chunk_size)]
+    if found and len(found) == len(targets):
+        chunks = []
+    total = end - start
+    done = 0
+    finished = set()  # 已完成的块的起始下标
+    next_index = start
+
+    def complete(chunk, chunk_found):
+        nonlocal done, next_index
+        for digest, match in chunk_found.items():
+            if digest not in found or match[0] < found[digest][0]:
+                found[digest] = match
+        done += chunk[1] - chunk[0]
+        finished.add(chunk[0])
+        while next_index < end and next_index in finished:
+            finished.discard(next_index)
+            next_index = min(next_index + chunk_size, end)
+        if progress is not None:
+            progress(done, total)
+        if resume is not None:
+            _write_state(resume, {"mask": mask.mask, "targets": _targets_key(targets),
+                                  "hasher": hasher.name, "next": next_index,
+                                  "found": {digest.hex(): [index, candidate.hex()]
+                                            for digest, (index, candidate) in found.items()}})
+
+    if processes == 1:
+        for chunk in chunks:
+            complete(chunk, mask.crack_range(chunk[0], chunk[1], targets, hasher=hasher))
+            if len(found) == len(targets):
+                break
+    elif chunks:
+        context = multiprocessing.get_context()
+        cancel = context.Event()
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker,
+                                 initargs=(mask.mask, targets, cancel, hasher.name)) as executor:
+            pending = {executor.submit(_crack_chunk, *chunk): chunk for chunk in chunks}
+            while pending:
+                done_futures, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    chunk = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    result = future.result()
+                    # 被取消的块没有完成，不计入进度
+                    if result is not None and not cancel.is_set():
+                        complete(chunk, result)
+                    elif result:
+                        for digest, match in result.items():
+                            found.setdefault(digest, match)
+                if len(found) == len(targets) and not cancel.is_set():
+                    cancel.set()
+                    for future in pending:
+                        future.cancel()
+
+    if resume is not None and (next_index >= mask.size or len(found) == len(targets)):
+        try:
+            os.remove(resume)
+        except FileNotFoundError:
+            pass
+    return found, next_index
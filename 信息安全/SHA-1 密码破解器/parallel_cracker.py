@@ -0,0 +1,212 @@
+"""
+多进程分片破解
+把字典文件按字节范围切分为若干分片，每个工作进程内存映射字典并只遍历自己的分片，
+内存占用与字典大小无关；所有目标都已找到时通知其余进程提前结束
+"""
+
+import multiprocessing
+import os
+import queue
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from hashers import get_hasher
+from rules import parse_rules
+from sha1_index import POSITIONS, PREFIX, SUFFIX
+from wordlist import load_wordlist
+
+# 一个命中的目标：
+# rank 为 (行首偏移量, 该行的第几个候选)，用于在多个分片的结果中选出字典中最靠前的匹配；
+# password 为字典中的原密码，candidate 为实际计算哈希的候选密码（不含盐值），
+# salt 和 position 为匹配的盐值及其位置（"prefix" 或 "suffix"），不加盐时为None
+Match = namedtuple("Match", "rank password candidate salt position")
+
+# 工作进程每处理这么多行检查一次是否已被取消
+CANCEL_CHECK_LINES = 4096
+
+# 每个进程分配的分片数，分片多于进程数时各进程的负载更均衡
+SHARDS_PER_PROCESS = 4
+
+
+def shard_ranges(path, count):
+    """
+    把文件切分为大小相近的字节范围
+
+    分片边界不必对齐到行首：一行属于它的第一个字节所在的分片，
+    由 Wordlist.lines 在读取时跳过分片开头不完整的行。
+
+    Args:
+        path (str): 文件路径
+        count (int): 分片数
+
+    Returns:
+        list: [(起始偏移量, 结束偏移量), ...]，空文件返回空列表
+    """
+    size = os.path.getsize(path)
+    count = max(1, min(count, size))
+    bounds = [size * i // count for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(count) if bounds[i] < bounds[i + 1]]
+
+
+def crack_range(path, start, end, targets, salts=None, cancel=None, notify=None, rules=None,
+                hasher=None):
+    """
+    遍历字典中行首位于 [start, end) 的行，计算每个候选密码的摘要并在目标集合中查找。
+    字典通过 wordlist.load_wordlist 内存映射，候选密码直接以字节串计算哈希，不解码
+
+    Args:
+        path (str): 字典路径
+        start (int): 起始偏移量
+        end (int): 结束偏移量
+        targets (set): 目标摘要
+        salts (list): 盐值（bytes），提供时每个盐值先作为前缀、再作为后缀，默认为None（不加盐）
+        cancel: 提供时每处理 CANCEL_CHECK_LINES 行检查一次，is_set() 为True时提前结束
+        notify (callable): 提供时每找到一个目标调用一次 notify(摘要)
+        rules (list): Rule 对象，提供时用每条规则变形后的候选密码代替原密码，默认为None
+        hasher (str or Hasher): 哈希算法（见 hashers.get_hasher），默认为None（SHA-1）
+
+    Returns:
+        dict: 摘要 -> Match，同一摘要只保留范围内第一个匹配
+    """
+    found = {}
+    hasher = get_hasher(hasher)
+    new = hasher.new
+
+    def record(digest, offset, sequence, word, candidate, salt=None, position=None):
+        found[digest] = Match((offset, sequence), word.decode("utf-8", "surrogateescape"),
+                              candidate.decode("utf-8", "surrogateescape"),
+                              None if salt is None else salt.decode("utf-8", "surrogateescape"),
+                              None if position is None else POSITIONS[position])
+        if notify is not None:
+            notify(digest)
+
+    lines = 0
+    for offset, word in load_wordlist(path).lines(start, end):
+        if rules is None:
+            if salts is None:
+                digest = new(word).digest()
+                if digest in targets and digest not in found:
+                    record(digest, offset, 0, word, word)
+            else:
+                for index, salt in enumerate(salts):
+                    digest = new(salt + word).digest()
+                    if digest in targets and digest not in found:
+                        record(digest, offset, 2 * index, word, word, salt, PREFIX)
+                    digest = new(word + salt).digest()
+                    if digest in targets and digest not in found:
+                        record(digest, offset, 2 * index + 1, word, word, salt, SUFFIX)
+        else:
+            sequence = 0
+            for rule in rules:
+                if salts is None:
+                    for candidate, digest in rule.digests(word, hasher=hasher):
+                        if digest in targets and digest not in found:
+                            record(digest, offset, sequence, word, candidate)
+                        sequence += 1
+                else:
+                    for salt in salts:
+                        for position, prefix, tail in ((PREFIX, salt, b""), (SUFFIX, b"", salt)):
+                            for candidate, digest in rule.digests(word, prefix, tail, hasher):
+                                if digest in targets and digest not in found:
+                                    record(digest, offset, sequence, word, candidate,
+                                           salt, position)
+                                sequence += 1
+        if len(found) == len(targets):
+            break
+        lines += 1
+        if cancel is not None and lines % CANCEL_CHECK_LINES == 0 and cancel.is_set():
+            break
+    return found
+
+
+# 工作进程的全局状态，由 _init_worker 在进程启动时设置，避免每个分片重复传输目标集合
+_worker_targets = None
+_worker_salts = None
+_worker_cancel = None
+_worker_hits = None
+_worker_rules = None
+_worker_hasher = None
+
+
+def _init_worker(targets, salts, cancel, hits, rules, hasher):
+    global _worker_targets, _worker_salts, _worker_cancel, _worker_hits, _worker_rules
+    global _worker_hasher
+    _worker_targets = targets
+    _worker_salts = salts
+    _worker_cancel = cancel
+    _worker_hits = hits
+    _worker_rules = parse_rules(rules) if rules is not None else None
+    _worker_hasher = get_hasher(hasher)
+
+
+def _crack_shard(path, start, end):
+    if _worker_cancel.is_set():
+        return {}
+    return crack_range(path, start, end, _worker_targets, _worker_salts,
+                       _worker_cancel, _worker_hits.put, _worker_rules, _worker_hasher)
+
+
+def merge_found(found, shard_found):
+    """
+    把一个分片的结果并入总结果，同一摘要保留字典中位置最靠前的匹配
+
+    Args:
+        found (dict): 总结果，会被修改
+        shard_found (dict): crack_range 返回的分片结果
+    """
+    for digest, match in shard_found.items():
+        current = found.get(digest)
+        if current is None or match.rank < current.rank:
+            found[digest] = match
+
+
+def crack_parallel(path, targets, salts=None, processes=None, rules=None, hasher=None):
+    """
+    用多个进程分片破解
+
+    每个工作进程找到目标时立即通知主进程，所有目标都已找到后，
+    主进程通知其余进程在处理完当前几千行后结束。提前结束时，
+    字典中有多个候选密码对应同一摘要的情况下不保证返回最靠前的那个。
+
+    Args:
+        path (str): 字典路径
+        targets (set): 目标摘要
+        salts (list): 盐值（bytes），默认为None（不加盐）
+        processes (int): 进程数，默认为CPU核数
+        rules (list): 规则（字符串或 Rule 对象），默认为None（不变形）
+        hasher (str or Hasher): 哈希算法，默认为None（SHA-1）
+
+    Returns:
+        dict: 摘要 -> Match
+    """
+    processes = processes or os.cpu_count() or 1
+    shards = shard_ranges(path, processes * SHARDS_PER_PROCESS)
+    found = {}
+    if not shards or not targets:
+        return found
+
+    context = multiprocessing.get_context()
+    cancel = context.Event()
+    hits = context.Queue()
+    seen = set()
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker,
+                             initargs=(targets, salts, cancel, hits,
+                                       [rule.text for rule in parse_rules(rules)]
+                                       if rules is not None else None,
+                                       get_hasher(hasher).name)) as executor:
+        pending = {executor.submit(_crack_shard, path, start, end) for start, end in shards}
+        while pending:
+            done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                merge_found(found, future.result())
+            # 通知只用于判断何时取消，结果以各分片的返回值为准
+            while True:
+                try:
+                    seen.add(hits.get_nowait())
+                except queue.Empty:
+                    break
+            seen.update(found)
+            if len(seen) == len(targets):
+                cancel.set()
+    hits.close()
+    return found
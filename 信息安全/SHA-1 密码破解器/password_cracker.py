@@ -1,48 +1,331 @@
 import hashlib
+import os
+import tempfile
 
-def crack_sha1_hash(hash_value, use_salts=False):
+import rainbow
+from bloom import DEFAULT_FALSE_POSITIVE_RATE, TargetSet, build_target_set
+from hashers import get_hasher
+from mask_attack import crack_mask
+from parallel_cracker import crack_parallel, crack_range
+from potfile import PotEntry, Potfile
+from rules import parse_rules
+from sha1_index import PasswordIndex, SaltedIndex, parse_digest
+from wordlist import load_salts, load_wordlist
+
+PASSWORDS_FILE = 'top-10000-passwords.txt'
+SALTS_FILE = 'known-salts.txt'
+# 建议的已破解哈希记录文件名，破解函数默认不使用记录文件，由调用方显式传入路径
+POTFILE = 'sha1-cracker.potfile'
+NOT_FOUND = "密码不在数据库中"
+
+# (字典路径, 盐值文件路径或None) -> 查找表，查找表在进程内只打开一次
+_indexes = {}
+
+
+def _index(wordlist_path, salts_path=None):
+    """返回字典（和盐值）对应的查找表，首次使用时打开（必要时构建）"""
+    key = (wordlist_path, salts_path)
+    index = _indexes.get(key)
+    if index is None:
+        if salts_path is None:
+            index = PasswordIndex(wordlist_path)
+        else:
+            index = SaltedIndex(wordlist_path, salts_path)
+        _indexes[key] = index
+    return index
+
+
+# 路径 -> Potfile，同一进程内共享，文件在第一次查询时才读取
+_potfiles = {}
+
+
+def _potfile(path):
+    """返回路径对应的 Potfile，path 为None时返回None"""
+    if path is None:
+        return None
+    potfile = _potfiles.get(path)
+    if potfile is None:
+        potfile = _potfiles[path] = Potfile(path)
+    return potfile
+
+
+def _rules_attack(rules):
+    """
+    规则破解在 potfile 中的破解方式，包含规则文本的指纹：
+    规则变形后的密码与字典中的原密码、不同规则集的结果分开记录
+    """
+    text = "\n".join(rule.text for rule in rules)
+    return "rules:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def crack_sha1_hash(hash_value, use_salts=False, rules=None, potfile=None, hasher=None,
+                    processes=None):
     """
     破解SHA-1哈希密码
     
     Args:
         hash_value (str): 要破解的SHA-1哈希值
         use_salts (bool): 是否使用盐值，默认为False
+        rules (list): 变形规则（见 rules.Rule），查找表中没有时再用规则变形后的候选密码破解，
+            默认为None（只尝试字典中的原密码）
+        potfile (str): 已破解哈希的记录文件，先在其中查询，破解成功后追加记录，
+            默认为None（不使用），需要时传入路径，如 POTFILE
+        hasher (str or Hasher): 哈希算法（见 hashers.get_hasher），默认为None（SHA-1）；
+            查找表只适用于SHA-1，其他算法遍历字典破解
+        processes (int): 提供时不构建查找表（构建时要把字典的全部记录放入内存），
+            直接流式遍历内存映射的字典：1表示在当前进程中破解，大于1时按字节范围分片交给多个进程；
+            默认为None（使用查找表）
     
     Returns:
         str: 如果找到密码则返回密码，否则返回"密码不在数据库中"
     """
+    hasher = get_hasher(hasher)
+    if hasher.name != "sha1" or processes is not None:
+        return crack_sha1_hashes([hash_value], use_salts, processes or 1, rules=rules,
+                                 potfile=potfile, hasher=hasher)[hash_value]
+    digest = parse_digest(hash_value)
+    if digest is None:
+        return NOT_FOUND
+    pot = _potfile(potfile)
+    if pot is not None:
+        entry = pot.get(digest, use_salts)
+        if entry is not None:
+            return entry.password
     
-    # 读取前10,000个密码
+    # 在预计算的查找表中二分查找，不需要计算哈希。
+    # 加盐查找表包含每个密码与每个盐值的前缀、后缀组合
+    try:
+        if use_salts:
+            match = _index(PASSWORDS_FILE, SALTS_FILE).lookup(digest)
+            entry = PotEntry(*match) if match is not None else None
+        else:
+            password = _index(PASSWORDS_FILE).lookup(digest)
+            entry = PotEntry(password, None, None) if password is not None else None
+    except FileNotFoundError:
+        return NOT_FOUND
+    if entry is None:
+        if rules is not None:
+            return crack_sha1_hashes([hash_value], use_salts, rules=rules,
+                                     potfile=potfile)[hash_value]
+        return NOT_FOUND
+    if pot is not None:
+        pot.add_many([(digest, entry)])
+    return entry.password
+
+
+def _crack_targets(targets, use_salts, processes, rules, hasher):
+    """遍历字典破解一组目标摘要，返回 摘要 -> Match，字典或盐值文件不存在时返回空字典"""
     try:
-        with open('top-10000-passwords.txt', 'r', encoding='utf-8') as f:
-            passwords = [line.strip() for line in f.readlines()]
+        salts = load_salts(SALTS_FILE) if use_salts else None
+        if processes == 1:
+            return crack_range(PASSWORDS_FILE, 0, load_wordlist(PASSWORDS_FILE).size,
+                               targets, salts,
+                               rules=parse_rules(rules) if rules is not None else None,
+                               hasher=hasher)
+        if not isinstance(targets, TargetSet):
+            targets = set(targets)
+        return crack_parallel(PASSWORDS_FILE, targets, salts, processes, rules, hasher)
     except FileNotFoundError:
-        return "密码不在数据库中"
-    
-    # 如果不使用盐值，直接比较哈希
-    if not use_salts:
-        for password in passwords:
-            if hashlib.sha1(password.encode('utf-8')).hexdigest() == hash_value:
-                return password
-    else:
-        # 读取盐值
+        return {}
+
+
+def crack_sha1_hashes(hash_values, use_salts=False, processes=1, rules=None, potfile=None,
+                      hasher=None):
+    """
+    批量破解SHA-1哈希密码
+    
+    把所有目标哈希转换为20字节的摘要放入集合，只遍历一次字典，
+    每个候选密码计算一次哈希后在集合中查找，耗时与目标哈希的数量无关。
+    全部目标都已找到时提前结束。
+    
+    Args:
+        hash_values (iterable): 要破解的SHA-1哈希值
+        use_salts (bool): 是否使用盐值，默认为False
+        processes (int): 进程数，默认为1（在当前进程中破解）；
+            大于1时把字典按字节范围分片交给多个进程，None表示使用全部CPU核
+        rules (list): 变形规则（字符串或 rules.Rule），提供时对字典中的每个密码
+            依次应用每条规则，尝试变形后的候选密码，默认为None（只尝试原密码）
+        potfile (str): 已破解哈希的记录文件，其中已有的哈希不再破解，新破解的哈希追加记录，
+            默认为None（不使用）；使用规则时的结果与原密码的结果分开记录
+        hasher (str or Hasher): 哈希算法（见 hashers.get_hasher），默认为None（SHA-1）；
+            PBKDF2 等慢速算法在 processes 为1时也使用全部CPU核
+    
+    Returns:
+        dict: 哈希值 -> 密码（使用规则时为变形后的密码），找不到的哈希对应"密码不在数据库中"
+    """
+    hasher = get_hasher(hasher)
+    if hasher.slow and processes == 1:
+        processes = None
+    if rules is not None:
+        rules = parse_rules(rules)
+    attack = _rules_attack(rules) if rules is not None else None
+    pot = _potfile(potfile)
+    results = {}
+    targets = {}  # 摘要 -> 对应的哈希值列表（同一摘要可能有大小写不同的写法）
+    for hash_value in hash_values:
+        results[hash_value] = NOT_FOUND
+        digest = parse_digest(hash_value, hasher.digest_size)
+        if digest is None:
+            continue
+        entry = pot.get(digest, use_salts, hasher.name, attack) if pot is not None else None
+        if entry is not None:
+            results[hash_value] = entry.password
+        else:
+            targets.setdefault(digest, []).append(hash_value)
+    if not targets:
+        return results
+    
+    found = _crack_targets(targets.keys(), use_salts, processes, rules, hasher)
+    for digest, match in found.items():
+        for hash_value in targets[digest]:
+            results[hash_value] = match.candidate
+    if pot is not None:
+        pot.add_many(((digest, PotEntry(match.candidate, match.salt, match.position))
+                      for digest, match in found.items()), hasher.name, attack)
+    return results
+
+
+def crack_sha1_hash_rainbow(hash_value, tables, potfile=None):
+    """
+    用预先生成的彩虹表破解SHA-1哈希密码，适合字典无法覆盖的密码空间
+    （如所有6位以内的小写字母和数字组合），彩虹表用 rainbow.py 生成
+    
+    Args:
+        hash_value (str): 要破解的SHA-1哈希值
+        tables (iterable): 彩虹表路径或 rainbow.RainbowTable 对象
+        potfile (str): 已破解哈希的记录文件，默认为None（不使用）；
+            彩虹表的结果与字典破解的结果分开记录
+    
+    Returns:
+        str: 如果找到密码则返回密码，否则返回"密码不在数据库中"
+    """
+    digest = parse_digest(hash_value)
+    if digest is None:
+        return NOT_FOUND
+    pot = _potfile(potfile)
+    if pot is not None:
+        entry = pot.get(digest, attack="rainbow")
+        if entry is not None:
+            return entry.password
+    password = rainbow.crack(digest, tables)
+    if password is None:
+        return NOT_FOUND
+    if pot is not None:
+        pot.add(digest, password, attack="rainbow")
+    return password
+
+
+def crack_sha1_hashes_mask(hash_values, mask, processes=1, progress=None, resume=None,
+                           potfile=None, hasher=None):
+    """
+    用掩码攻击批量破解SHA-1哈希密码，枚举掩码描述的全部密码（如 "?u?l?l?l?d?d"），
+    不需要字典；密码空间按下标切分为连续的块，可以交给多个进程并中断后继续
+    
+    Args:
+        hash_values (iterable): 要破解的SHA-1哈希值
+        mask (str): 掩码，格式见 mask_attack.Mask
+        processes (int): 进程数，默认为1（在当前进程中破解），None表示使用全部CPU核
+        progress (callable): 每完成一个块调用一次 progress(已完成的候选密码数, 总数)
+        resume (str): 续扫文件路径，中断后用同样的参数再次调用时从记录的位置继续
+        potfile (str): 已破解哈希的记录文件，默认为None（不使用）；
+            每个掩码的结果与字典破解的结果分开记录
+        hasher (str or Hasher): 哈希算法，默认为None（SHA-1）；慢速算法在 processes 为1时
+            也使用全部CPU核
+    
+    Returns:
+        dict: 哈希值 -> 密码，找不到的哈希对应"密码不在数据库中"
+    
+    Raises:
+        ValueError: 掩码格式不正确
+    """
+    hasher = get_hasher(hasher)
+    if hasher.slow and processes == 1:
+        processes = None
+    attack = f"mask:{mask}"
+    pot = _potfile(potfile)
+    results = {}
+    targets = {}  # 摘要 -> 对应的哈希值列表
+    for hash_value in hash_values:
+        results[hash_value] = NOT_FOUND
+        digest = parse_digest(hash_value, hasher.digest_size)
+        if digest is None:
+            continue
+        entry = pot.get(digest, algorithm=hasher.name, attack=attack) if pot is not None else None
+        if entry is not None:
+            results[hash_value] = entry.password
+        else:
+            targets.setdefault(digest, []).append(hash_value)
+    if not targets:
+        return results
+    
+    found, _ = crack_mask(mask, set(targets), processes, progress=progress, resume=resume,
+                          hasher=hasher)
+    for digest, (_, candidate) in found.items():
+        password = candidate.decode("utf-8")
+        for hash_value in targets[digest]:
+            results[hash_value] = password
+    if pot is not None:
+        pot.add_many(((digest, PotEntry(candidate.decode("utf-8"), None, None))
+                      for digest, (_, candidate) in found.items()), hasher.name, attack)
+    return results
+
+
+def crack_sha1_hash_file(hashes_path, use_salts=False, processes=1, rules=None, potfile=None,
+                         hasher=None, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+    """
+    破解文件中的大量哈希（每行一个，如泄露的数百万个哈希）
+    
+    目标摘要不放入内存中的集合，而是外部排序写入临时的有序摘要文件并生成布隆过滤器
+    （见 bloom.TargetSet）：每个候选密码的摘要先查过滤器，命中时才在文件中二分查找确认，
+    内存占用与哈希数几乎无关。
+    
+    Args:
+        hashes_path (str): 哈希文件路径，每行一个十六进制哈希，格式不正确的行被忽略
+        use_salts (bool): 是否使用盐值，默认为False
+        processes (int): 进程数，默认为1，None表示使用全部CPU核；工作进程共享同一组映射文件
+        rules (list): 变形规则，默认为None
+        potfile (str): 已破解哈希的记录文件，默认为None（不使用）
+        hasher (str or Hasher): 哈希算法，默认为None（SHA-1）
+        false_positive_rate (float): 布隆过滤器的误判率，越低过滤器越大、二分查找越少
+    
+    Returns:
+        dict: 小写的十六进制哈希 -> 密码，只包含已破解的哈希
+    
+    Raises:
+        FileNotFoundError: 哈希文件不存在
+    """
+    hasher = get_hasher(hasher)
+    if hasher.slow and processes == 1:
+        processes = None
+    if rules is not None:
+        rules = parse_rules(rules)
+    attack = _rules_attack(rules) if rules is not None else None
+    pot = _potfile(potfile)
+    results = {}
+    
+    def digests():
+        for _, line in load_wordlist(hashes_path).lines():
+            digest = parse_digest(line.decode("ascii", "replace"), hasher.digest_size)
+            if digest is None:
+                continue
+            entry = pot.get(digest, use_salts, hasher.name, attack) if pot is not None else None
+            if entry is not None:
+                results[digest.hex()] = entry.password
+            else:
+                yield digest
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "targets.digests")
+        build_target_set(digests(), path, hasher.digest_size, false_positive_rate)
+        targets = TargetSet(path)
         try:
-            with open('known-salts.txt', 'r', encoding='utf-8') as f:
-                salts = [line.strip() for line in f.readlines()]
-        except FileNotFoundError:
-            return "密码不在数据库中"
-        
-        # 对每个密码尝试添加盐值（前缀和后缀）
-        for password in passwords:
-            for salt in salts:
-                # 尝试盐值作为前缀
-                salted_password = salt + password
-                if hashlib.sha1(salted_password.encode('utf-8')).hexdigest() == hash_value:
-                    return password
-                
-                # 尝试盐值作为后缀
-                salted_password = password + salt
-                if hashlib.sha1(salted_password.encode('utf-8')).hexdigest() == hash_value:
-                    return password
-    
-    return "密码不在数据库中"
+            found = _crack_targets(targets, use_salts, processes, rules, hasher) if targets else {}
+        finally:
+            targets.close()
+    
+    for digest, match in found.items():
+        results[digest.hex()] = match.candidate
+    if pot is not None:
+        pot.add_many(((digest, PotEntry(match.candidate, match.salt, match.position))
+                      for digest, match in found.items()), hasher.name, attack)
+    return results
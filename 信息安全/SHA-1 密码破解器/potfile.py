@@ -0,0 +1,139 @@
+"""
+已破解哈希的记录文件（potfile）
+每破解一个哈希就在文件末尾追加一行JSON，记录哈希、密码、匹配的盐值和位置、哈希算法以及破解方式。
+第一次查询时才把文件读入按摘要索引的字典，之后只读取其他进程新追加的部分，
+重复审计时已破解的哈希不需要再做任何字典计算
+"""
+
+import json
+import os
+from collections import namedtuple
+
+# 一条记录：密码、盐值（不加盐时为None）、盐值位置（"prefix"、"suffix"，不加盐时为None）
+PotEntry = namedtuple("PotEntry", "password salt position")
+
+# 记录中省略 "algorithm" 字段时的哈希算法
+DEFAULT_ALGORITHM = "sha1"
+
+
+class Potfile:
+    """
+    只追加的已破解哈希记录
+
+    加盐和不加盐的结果、不同哈希算法的结果、不同破解方式（字典原密码、规则、掩码、彩虹表）的结果
+    分开索引：同一个哈希只有按破解时的方式查询才会命中，因此查询结果与重新破解的结果一致。
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): 文件路径，文件不存在时在第一次记录时创建
+        """
+        self.path = path
+        self._entries = None  # (摘要, 是否加盐, 算法, 破解方式) -> PotEntry
+        self._offset = 0      # 已读取到的位置
+
+    def _refresh(self):
+        """载入文件中尚未读取的部分；文件被截断或替换时重新载入"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if self._entries is None or size < self._offset:
+            self._entries = {}
+            self._offset = 0
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # 只处理完整的行，另一个进程正在写入的最后一行留到下次读取
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                digest = bytes.fromhex(record["hash"])
+                entry = PotEntry(record["password"], record.get("salt"), record.get("position"))
+                algorithm = record.get("algorithm", DEFAULT_ALGORITHM)
+                attack = record.get("attack")
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._entries.setdefault((digest, entry.salt is not None, algorithm, attack), entry)
+        self._offset += end
+
+    def __len__(self):
+        self._refresh()
+        return len(self._entries)
+
+    def get(self, digest, salted=False, algorithm=DEFAULT_ALGORITHM, attack=None):
+        """
+        查询已破解的哈希
+
+        Args:
+            digest (bytes): 摘要
+            salted (bool): 是否查询加盐破解的结果
+            algorithm (str): 哈希算法名称（见 hashers.get_hasher），默认为 "sha1"
+            attack (str): 破解方式（如 "rules:<规则指纹>"、"mask:<掩码>"、"rainbow"），
+                默认为None（字典中的原密码）
+
+        Returns:
+            PotEntry: 记录，没有时返回None
+        """
+        self._refresh()
+        return self._entries.get((digest, salted, algorithm, attack))
+
+    def add(self, digest, password, salt=None, position=None, algorithm=DEFAULT_ALGORITHM,
+            attack=None):
+        """
+        记录一个已破解的哈希，已有记录时忽略
+
+        Args:
+            digest (bytes): 摘要
+            password (str): 密码
+            salt (str): 匹配的盐值，不加盐时为None
+            position (str): 盐值的位置，"prefix" 或 "suffix"
+            algorithm (str): 哈希算法名称，默认为 "sha1"
+            attack (str): 破解方式，默认为None（字典中的原密码）
+        """
+        self.add_many([(digest, PotEntry(password, salt, position))], algorithm, attack)
+
+    def add_many(self, entries, algorithm=DEFAULT_ALGORITHM, attack=None):
+        """
+        记录多个已破解的哈希，一次写入文件
+
+        Args:
+            entries (iterable): (摘要, PotEntry)
+            algorithm (str): 哈希算法名称，默认为 "sha1"
+            attack (str): 破解方式，默认为None（字典中的原密码）
+        """
+        self._refresh()
+        lines = []
+        for digest, entry in entries:
+            key = (digest, entry.salt is not None, algorithm, attack)
+            if key in self._entries:
+                continue
+            self._entries[key] = entry
+            record = {"hash": digest.hex(), "password": entry.password}
+            if entry.salt is not None:
+                record["salt"] = entry.salt
+                record["position"] = entry.position
+            if algorithm != DEFAULT_ALGORITHM:
+                record["algorithm"] = algorithm
+            if attack is not None:
+                record["attack"] = attack
+            lines.append(json.dumps(record) + "\n")
+        if not lines:
+            return
+        data = "".join(lines).encode("utf-8")
+        with open(self.path, "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                # 上次写入中断留下的不完整行单独成行，不影响新记录
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+        # 本进程写入的内容已经在字典中，写入前没有未读取的内容时直接跳过它们；
+        # 否则下次查询时连同其他进程追加的内容一起读取，setdefault 保证不会覆盖
+        if size == self._offset:
+            self._offset += len(data)
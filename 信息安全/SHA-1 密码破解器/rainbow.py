@@ -0,0 +1,292 @@
+"""
+SHA-1彩虹表
+对由字符集和长度范围确定的密码空间，预先生成若干条哈希链，只保存每条链的起点和终点，
+按终点排序写入文件。查找时从哈希值出发依次假设它位于链的每一列，
+走到链尾后在表中二分查找终点，再从对应链的起点重新计算出密码。
+一次性的生成换取对字典无法覆盖的密码空间的快速查找，全部在本地完成
+"""
+
+import argparse
+import bisect
+import hashlib
+import math
+import mmap
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from sha1_index import atomic_open
+
+# 文件头：魔数、版本、表序号、最短长度、最长长度、链长、链数、字符集字节数，其后为字符集
+_MAGIC = b"SHA1RBW\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHHHHIQH")
+
+# 每条链的记录：终点下标、起点下标，大端序使按字节排序与按数值排序一致
+_CHAIN = struct.Struct(">QQ")
+
+# 每个工作进程一次计算的链数
+CHAINS_PER_TASK = 4096
+
+# 生成起点时使用的步长，与密码空间大小互质时起点均匀分布在整个空间
+_START_STRIDE = 0x9E3779B97F4A7C15
+
+
+class Keyspace:
+    """由字符集和长度范围确定的密码空间，空间中的每个密码对应一个下标"""
+
+    def __init__(self, charset, min_length, max_length):
+        """
+        Args:
+            charset (str): 字符集，如 "abcdefghijklmnopqrstuvwxyz0123456789"
+            min_length (int): 最短长度
+            max_length (int): 最长长度
+
+        Raises:
+            ValueError: 字符集为空或长度范围无效
+        """
+        self.charset = charset
+        self._chars = [c.encode("utf-8") for c in charset]
+        if not self._chars or len(set(self._chars)) != len(self._chars):
+            raise ValueError(f"Invalid charset: {charset!r}")
+        if not 1 <= min_length <= max_length:
+            raise ValueError(f"Invalid length range: {min_length}-{max_length}")
+        self.min_length = min_length
+        self.max_length = max_length
+        # 每种长度的密码数，按长度从短到长排列
+        self._counts = [len(self._chars) ** length for length in range(min_length, max_length + 1)]
+        self.size = sum(self._counts)
+
+    def plaintext(self, index):
+        """
+        返回下标对应的密码
+
+        Args:
+            index (int): 下标，0 <= index < size
+
+        Returns:
+            bytes: 密码
+        """
+        length = self.min_length
+        for count in self._counts:
+            if index < count:
+                break
+            index -= count
+            length += 1
+        base = len(self._chars)
+        chars = self._chars
+        out = []
+        for _ in range(length):
+            index, digit = divmod(index, base)
+            out.append(chars[digit])
+        return b"".join(out)
+
+
+def _table_mask(table_index):
+    """每张表的约简函数使用不同的掩码，不同表中的链不会合并"""
+    return int.from_bytes(hashlib.sha1(b"rainbow%d" % table_index).digest()[:8], "big")
+
+
+def reduce_digest(digest, column, mask, size):
+    """
+    约简函数：把第 column 列的摘要映射为密码空间中的下标
+
+    Args:
+        digest (bytes): 摘要
+        column (int): 列号
+        mask (int): 表的掩码
+        size (int): 密码空间大小
+
+    Returns:
+        int: 下标
+    """
+    return ((int.from_bytes(digest[:8], "big") ^ mask) + column) % size
+
+
+def _walk(keyspace, index, first_column, last_column, mask):
+    """从第 first_column 列的下标出发，计算到第 last_column 列（不含）为止的下标"""
+    sha1 = hashlib.sha1
+    plaintext = keyspace.plaintext
+    size = keyspace.size
+    for column in range(first_column, last_column):
+        index = reduce_digest(sha1(plaintext(index)).digest(), column, mask, size)
+    return index
+
+
+def _chain_task(charset, min_length, max_length, chain_length, table_index, starts):
+    keyspace = Keyspace(charset, min_length, max_length)
+    mask = _table_mask(table_index)
+    return [(_walk(keyspace, start, 0, chain_length, mask), start) for start in starts]
+
+
+def generate_table(path, keyspace, chain_length, chain_count, table_index=0, processes=None):
+    """
+    生成彩虹表
+
+    链在进程池中并行计算。终点相同的链只保留一条，因此表中的链数可能少于 chain_count。
+
+    Args:
+        path (str): 彩虹表路径
+        keyspace (Keyspace): 密码空间
+        chain_length (int): 链长（每条链的哈希次数）
+        chain_count (int): 链数，不超过密码空间大小
+        table_index (int): 表序号，同一密码空间的多张表应使用不同的序号
+        processes (int): 进程数，默认为CPU核数
+
+    Returns:
+        int: 写入的链数
+    """
+    if chain_length < 1:
+        raise ValueError(f"Invalid chain length: {chain_length}")
+    chain_count = min(chain_count, keyspace.size)
+    stride = _START_STRIDE % keyspace.size or 1
+    while math.gcd(stride, keyspace.size) != 1:
+        stride += 1
+    starts = [i * stride % keyspace.size for i in range(chain_count)]
+
+    chains = {}  # 终点 -> 起点
+    args = (keyspace.charset, keyspace.min_length, keyspace.max_length, chain_length, table_index)
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(_chain_task, *args, starts[i:i + CHAINS_PER_TASK])
+                   for i in range(0, len(starts), CHAINS_PER_TASK)]
+        for future in futures:
+            for end, start in future.result():
+                chains.setdefault(end, start)
+
+    charset = keyspace.charset.encode("utf-8")
+    with atomic_open(path) as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, table_index, keyspace.min_length,
+                             keyspace.max_length, chain_length, len(chains), len(charset)))
+        f.write(charset)
+        f.write(b"".join(_CHAIN.pack(end, chains[end]) for end in sorted(chains)))
+    return len(chains)
+
+
+class RainbowTable:
+    """内存映射的彩虹表"""
+
+    def __init__(self, path):
+        """
+        打开彩虹表
+
+        Args:
+            path (str): 彩虹表路径
+
+        Raises:
+            ValueError: 文件格式不正确
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.table_index, min_length, max_length, self.chain_length,
+         self._count, charset_size) = _HEADER.unpack_from(self._map, 0)
+        self._start = _HEADER.size + charset_size
+        if (magic != _MAGIC or version != _VERSION
+                or len(self._map) != self._start + self._count * _CHAIN.size):
+            self._map.close()
+            raise ValueError(f"Invalid rainbow table: {path}")
+        charset = self._map[_HEADER.size:self._start].decode("utf-8")
+        self.keyspace = Keyspace(charset, min_length, max_length)
+        self._mask = _table_mask(self.table_index)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return _CHAIN.unpack_from(self._map, self._start + index * _CHAIN.size)[0]
+
+    def _chain_start(self, end):
+        """返回终点为 end 的链的起点"""
+        position = bisect.bisect_left(self, end)
+        if position < self._count and self[position] == end:
+            return _CHAIN.unpack_from(self._map, self._start + position * _CHAIN.size)[1]
+        return None
+
+    def lookup(self, digest):
+        """
+        查找摘要对应的密码
+
+        依次假设摘要位于链的最后一列、倒数第二列……第一列，
+        每种假设下计算到链尾的终点并在表中查找；找到的链从起点重新计算，
+        确认确实经过该摘要（排除不同链合并造成的误报）。
+
+        Args:
+            digest (bytes): 20字节的SHA-1摘要
+
+        Returns:
+            str: 密码，表中的链没有覆盖该摘要时返回None
+        """
+        keyspace = self.keyspace
+        size = keyspace.size
+        sha1 = hashlib.sha1
+        for column in range(self.chain_length - 1, -1, -1):
+            index = reduce_digest(digest, column, self._mask, size)
+            end = _walk(keyspace, index, column + 1, self.chain_length, self._mask)
+            start = self._chain_start(end)
+            if start is None:
+                continue
+            # 从起点走到第 column 列，检查该列的密码的哈希
+            index = _walk(keyspace, start, 0, column, self._mask)
+            plaintext = keyspace.plaintext(index)
+            if sha1(plaintext).digest() == digest:
+                return plaintext.decode("utf-8")
+        return None
+
+    def close(self):
+        """解除内存映射"""
+        self._map.close()
+
+
+def crack(digest, tables):
+    """
+    依次在多张彩虹表中查找摘要
+
+    Args:
+        digest (bytes): 20字节的SHA-1摘要
+        tables (iterable): RainbowTable 对象或彩虹表路径
+
+    Returns:
+        str: 密码，所有表中都没有时返回None
+    """
+    for table in tables:
+        if isinstance(table, RainbowTable):
+            password = table.lookup(digest)
+        else:
+            table = RainbowTable(table)
+            try:
+                password = table.lookup(digest)
+            finally:
+                table.close()
+        if password is not None:
+            return password
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成SHA-1彩虹表或在其中查找哈希")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="生成彩虹表")
+    build.add_argument("path", help="彩虹表路径")
+    build.add_argument("--charset", default="abcdefghijklmnopqrstuvwxyz0123456789")
+    build.add_argument("--min-length", type=int, default=1)
+    build.add_argument("--max-length", type=int, default=6)
+    build.add_argument("--chain-length", type=int, default=2000)
+    build.add_argument("--chains", type=int, default=1000000)
+    build.add_argument("--table-index", type=int, default=0)
+    build.add_argument("--processes", type=int, default=None)
+    lookup = subparsers.add_parser("lookup", help="在彩虹表中查找哈希")
+    lookup.add_argument("hash", help="十六进制的SHA-1哈希")
+    lookup.add_argument("tables", nargs="+", help="彩虹表路径")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        keyspace = Keyspace(args.charset, args.min_length, args.max_length)
+        count = generate_table(args.path, keyspace, args.chain_length, args.chains,
+                               args.table_index, args.processes)
+        print(f"{args.path}: {count} 条链，链长 {args.chain_length}，密码空间 {keyspace.size}")
+    else:
+        password = crack(bytes.fromhex(args.hash), args.tables)
+        print(password if password is not None else "密码不在彩虹表中")
+
+
+if __name__ == "__main__":
+    main()
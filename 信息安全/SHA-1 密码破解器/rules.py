@@ -0,0 +1,232 @@
+"""
+规则变形引擎
+用类似 hashcat 的规则把字典中的每个密码变形为多个候选密码（首字母大写、leetspeak、
+追加数字、反转等）。规则末尾的追加操作展开为一组后缀，同一密码的所有候选共享前缀，
+前缀足够长时计算哈希时复制前缀的哈希状态，只对后缀做增量计算
+"""
+
+import itertools
+import string
+
+from hashers import get_hasher
+
+# 规则中 ?x 代表的字符集
+CHARSETS = {
+    "d": string.digits,
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "s": "!@#$%^&*?_-.",
+}
+
+# 默认规则，按命中率从高到低排列
+DEFAULT_RULES = [
+    ":",                   # 原样
+    "c",                   # 首字母大写
+    "u",                   # 全部大写
+    "$?d",                 # 追加一位数字
+    "$?d$?d",              # 追加两位数字
+    "c $?d",
+    "c $?d$?d",
+    "$1$2$3",
+    "$!",
+    "c $!",
+    "r",                   # 反转
+    "d",                   # 重复
+    "sa@ se3 si1 so0",     # leetspeak
+    "c sa@ se3 si1 so0",
+    "t",                   # 大小写互换
+]
+
+
+# 操作符 -> (参数个数, 函数)。函数接受 (密码, *参数) 并返回变形结果的列表；
+# $ 和 ^ 的参数可以是 ?x 字符集，此时对字符集中的每个字符各调用一次
+_OPERATIONS = {
+    ":": (0, lambda word: [word]),
+    "l": (0, lambda word: [word.lower()]),
+    "u": (0, lambda word: [word.upper()]),
+    "c": (0, lambda word: [word.capitalize()]),
+    "t": (0, lambda word: [word.swapcase()]),
+    "r": (0, lambda word: [word[::-1]]),
+    "d": (0, lambda word: [word + word]),
+    "$": (1, lambda word, char: [word + char]),
+    "^": (1, lambda word, char: [char + word]),
+    "s": (2, lambda word, old, new: [word.replace(old, new)]),
+    "@": (1, lambda word, char: [word.replace(char, b"")]),
+}
+
+
+def _parse(text):
+    """
+    把规则解析为操作列表
+
+    Returns:
+        list: [(操作符, 参数列表), ...]，每个参数为候选字符（bytes）的列表
+    """
+    operations = []
+    index = 0
+    while index < len(text):
+        op = text[index]
+        index += 1
+        if op == " ":
+            continue
+        if op not in _OPERATIONS:
+            raise ValueError(f"Invalid rule: {text!r}")
+        count = _OPERATIONS[op][0]
+        args = []
+        for _ in range(count):
+            if index >= len(text):
+                raise ValueError(f"Invalid rule: {text!r}")
+            if op in "$^" and text[index] == "?" and index + 1 < len(text) \
+                    and text[index + 1] in CHARSETS:
+                args.append([c.encode("ascii") for c in CHARSETS[text[index + 1]]])
+                index += 2
+            else:
+                args.append([text[index].encode("utf-8")])
+                index += 1
+        operations.append((op, args))
+    if not operations:
+        raise ValueError(f"Invalid rule: {text!r}")
+    return operations
+
+
+class Rule:
+    """
+    一条变形规则
+
+    规则由操作符组成，操作符之间的空格会被忽略：
+
+    - ``:`` 原样，``l`` 小写，``u`` 大写，``c`` 首字母大写，``t`` 大小写互换
+    - ``r`` 反转，``d`` 重复
+    - ``$X`` 追加字符，``^X`` 在开头插入字符，X 为 ``?d``、``?l``、``?u``、``?s`` 时展开为整个字符集
+    - ``sXY`` 把所有 X 替换为 Y，``@X`` 删除所有 X
+
+    规则末尾连续的 ``$`` 操作展开为 suffixes，其余操作由 apply 作用在密码上，
+    候选密码为 apply 的每个结果加上每个后缀。
+    """
+
+    def __init__(self, text):
+        """
+        Args:
+            text (str): 规则，如 "c $?d$?d"
+
+        Raises:
+            ValueError: 规则格式不正确
+        """
+        self.text = text
+        operations = _parse(text)
+        split = len(operations)
+        while split > 0 and operations[split - 1][0] == "$":
+            split -= 1
+        self._transforms = [(_OPERATIONS[op][1], args) for op, args in operations[:split]]
+        self.suffixes = [b"".join(chars) for chars in
+                         itertools.product(*(args[0] for _, args in operations[split:]))]
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+    def apply(self, word):
+        """
+        对密码执行末尾追加操作之前的部分
+
+        Args:
+            word (bytes): 密码
+
+        Returns:
+            list: 变形结果（bytes），还需要加上 suffixes 中的每个后缀
+        """
+        bases = [word]
+        for function, args in self._transforms:
+            expanded = []
+            for base in bases:
+                for values in itertools.product(*args):
+                    expanded.extend(function(base, *values))
+            bases = expanded
+        return bases
+
+    def candidates(self, word):
+        """
+        生成一个密码按此规则变形后的全部候选密码
+
+        Args:
+            word (bytes): 密码
+
+        Yields:
+            bytes: 候选密码
+        """
+        for base in self.apply(word):
+            for suffix in self.suffixes:
+                yield base + suffix
+
+    def digests(self, word, prefix=b"", tail=b"", hasher=None):
+        """
+        计算全部候选密码的摘要。算法可以复制哈希状态且 prefix 加变形结果不短于一个块时，
+        同一变形结果的所有后缀共享前缀的哈希状态
+
+        Args:
+            word (bytes): 密码
+            prefix (bytes): 加在候选密码前面的内容（如前缀盐值）
+            tail (bytes): 加在候选密码后面的内容（如后缀盐值）
+            hasher (str or Hasher): 哈希算法，默认为None（SHA-1）
+
+        Yields:
+            tuple: (候选密码, 摘要)
+        """
+        hasher = get_hasher(hasher)
+        new = hasher.new
+        for base in self.apply(word):
+            head = prefix + base
+            # 哈希按块计算，共享前缀不足一个块时复制哈希状态省不下任何计算，直接计算更快
+            if (hasher.block_size is None or len(head) < hasher.block_size
+                    or len(self.suffixes) == 1):
+                for suffix in self.suffixes:
+                    yield base + suffix, new(head + suffix + tail).digest()
+                continue
+            copy = new(head).copy
+            for suffix in self.suffixes:
+                state = copy()
+                state.update(suffix + tail)
+                yield base + suffix, state.digest()
+
+
+def parse_rules(rules):
+    """
+    把规则字符串转换为 Rule 对象
+
+    Args:
+        rules (iterable): 规则字符串或 Rule 对象
+
+    Returns:
+        list: Rule 对象列表
+    """
+    return [rule if isinstance(rule, Rule) else Rule(rule) for rule in rules]
+
+
+def load_rules(path):
+    """
+    从文件读取规则，每行一条，忽略空行和以 # 开头的注释
+
+    Args:
+        path (str): 规则文件路径
+
+    Returns:
+        list: Rule 对象列表
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [Rule(line.strip()) for line in f if line.strip() and not line.startswith("#")]
+
+
+def iter_candidates(words, rules=DEFAULT_RULES):
+    """
+    流式生成全部候选密码：对每个密码依次应用每条规则
+
+    Args:
+        words (iterable): 密码（bytes）
+        rules (iterable): 规则，默认为 DEFAULT_RULES
+
+    Yields:
+        bytes: 候选密码
+    """
+    rules = parse_rules(rules)
+    for word in words:
+        for rule in rules:
+            yield from rule.candidates(word)
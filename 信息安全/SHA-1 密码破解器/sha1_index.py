@@ -0,0 +1,390 @@
+"""
+预计算的SHA-1查找表
+把密码字典中每个密码（以及每个密码与每个盐值的前缀、后缀组合）的SHA-1摘要，
+与密码在字典文件中的偏移量一起排序写入二进制文件，
+查找时内存映射该文件并二分查找，破解一个哈希只需 O(log n) 次比较，不需要计算任何哈希
+"""
+
+import bisect
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from wordlist import load_wordlist
+
+# 文件头：魔数、版本、每条记录附加数据的字节数、记录数、源文件内容的SHA-256
+_MAGIC = b"SHA1TBL\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHHQ32s")
+
+DIGEST_SIZE = 20
+
+# 密码查找表每条记录的附加数据：密码在字典文件中的偏移量。
+# 使用大端序，使记录按字节排序时同一摘要的记录按偏移量从小到大排列
+_OFFSET = struct.Struct(">Q")
+
+# 加盐查找表每条记录的附加数据：密码的偏移量、盐值在盐值文件中的偏移量、盐值的位置
+_SALTED = struct.Struct(">QIB")
+PREFIX = 0  # 盐值 + 密码
+SUFFIX = 1  # 密码 + 盐值
+POSITIONS = ("prefix", "suffix")
+
+# 查找表文件名的后缀
+INDEX_SUFFIX = ".sha1idx"
+SALTED_INDEX_SUFFIX = ".salted.sha1idx"
+
+
+def file_digest(path):
+    """
+    计算文件内容的SHA-256，用于判断查找表是否过期
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        bytes: 32字节的摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def sources_digest(paths):
+    """
+    计算一组源文件的合并摘要，任一文件内容变化时结果都会变化
+
+    Args:
+        paths (list): 文件路径
+
+    Returns:
+        bytes: 32字节的摘要
+    """
+    if len(paths) == 1:
+        return file_digest(paths[0])
+    return hashlib.sha256(b"".join(file_digest(path) for path in paths)).digest()
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="wb", encoding=None):
+    """
+    打开同一目录下的唯一临时文件供写入，正常结束时原子替换目标文件，出错时删除临时文件。
+    多个进程同时生成同一个文件时各写各的临时文件，最后完成的替换生效，不会互相截断
+
+    Args:
+        path (str): 目标文件路径
+        mode (str): 打开模式，"wb"、"w+b" 或 "w"
+        encoding (str): 文本模式的编码
+
+    Yields:
+        file: 临时文件对象
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".sha1-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_table(path, records, payload_size, source_hash):
+    """
+    把记录排序后写入查找表，通过 atomic_open 先写临时文件再原子替换
+
+    Args:
+        path (str): 查找表路径
+        records (list): 记录列表，每条为20字节摘要加 payload_size 字节的附加数据
+        payload_size (int): 每条记录附加数据的字节数
+        source_hash (bytes): 源文件内容的摘要，写入文件头
+    """
+    records.sort()
+    with atomic_open(path) as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, payload_size, len(records), source_hash))
+        f.write(b"".join(records))
+
+
+class DigestTable:
+    """
+    内存映射的有序摘要表，支持按摘要二分查找
+
+    表中的记录可以像列表一样按下标读取摘要，因此可以直接交给 bisect 使用。
+    """
+
+    def __init__(self, path):
+        """
+        打开查找表
+
+        Args:
+            path (str): 查找表路径
+
+        Raises:
+            ValueError: 文件格式不正确
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.payload_size, self._count, self.source_hash = \
+            _HEADER.unpack_from(self._map, 0)
+        self._record_size = DIGEST_SIZE + self.payload_size
+        if (magic != _MAGIC or version != _VERSION
+                or len(self._map) != _HEADER.size + self._count * self._record_size):
+            self._map.close()
+            raise ValueError(f"Invalid digest table: {path}")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = _HEADER.size + index * self._record_size
+        return self._map[start:start + DIGEST_SIZE]
+
+    def find(self, digest):
+        """
+        二分查找摘要，摘要重复时返回附加数据最小的记录
+
+        Args:
+            digest (bytes): 20字节的摘要
+
+        Returns:
+            bytes: 记录的附加数据，找不到时返回None
+        """
+        low = bisect.bisect_left(self, digest)
+        if low < self._count and self[low] == digest:
+            start = _HEADER.size + low * self._record_size + DIGEST_SIZE
+            return self._map[start:start + self.payload_size]
+        return None
+
+    def close(self):
+        """解除内存映射"""
+        self._map.close()
+
+
+def build_password_index(wordlist_path, index_path=None):
+    """
+    为密码字典构建查找表
+
+    Args:
+        wordlist_path (str): 密码字典路径
+        index_path (str): 查找表路径，默认为字典路径加 ".sha1idx"
+
+    Returns:
+        str: 查找表路径
+    """
+    if index_path is None:
+        index_path = wordlist_path + INDEX_SUFFIX
+    sha1 = hashlib.sha1
+    pack = _OFFSET.pack
+    records = [sha1(password).digest() + pack(offset)
+               for offset, password in load_wordlist(wordlist_path).lines()]
+    write_table(index_path, records, _OFFSET.size, file_digest(wordlist_path))
+    return index_path
+
+
+def build_salted_index(wordlist_path, salts_path, index_path=None):
+    """
+    为密码字典和盐值的全部前缀、后缀组合构建查找表
+
+    Args:
+        wordlist_path (str): 密码字典路径
+        salts_path (str): 盐值文件路径
+        index_path (str): 查找表路径，默认为字典路径加 ".salted.sha1idx"
+
+    Returns:
+        str: 查找表路径
+    """
+    if index_path is None:
+        index_path = wordlist_path + SALTED_INDEX_SUFFIX
+    passwords = list(load_wordlist(wordlist_path).lines())
+    salts = list(load_wordlist(salts_path).lines())
+    sha1 = hashlib.sha1
+    pack = _SALTED.pack
+    records = []
+    append = records.append
+    for salt_offset, salt in salts:
+        for offset, password in passwords:
+            append(sha1(salt + password).digest() + pack(offset, salt_offset, PREFIX))
+            append(sha1(password + salt).digest() + pack(offset, salt_offset, SUFFIX))
+    write_table(index_path, records, _SALTED.size, sources_digest([wordlist_path, salts_path]))
+    return index_path
+
+
+class _IndexedTable:
+    """
+    与一组源文件保持一致的查找表
+
+    打开时检查查找表是否与源文件内容一致，不一致或不存在时自动重新构建；
+    之后每次查找前只比较源文件的大小和修改时间，文件变化时再按内容判断是否需要重建。
+    """
+
+    def __init__(self, sources, index_path):
+        """
+        Args:
+            sources (list): 源文件路径
+            index_path (str): 查找表路径
+        """
+        self.sources = sources
+        self.index_path = index_path
+        self._table = None
+        self._stat = None
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _refresh(self):
+        key = []
+        for path in self.sources:
+            stat = os.stat(path)
+            key.append((stat.st_size, stat.st_mtime_ns))
+        if self._table is not None and key == self._stat:
+            return
+        source_hash = sources_digest(self.sources)
+        if self._table is None:
+            try:
+                self._table = DigestTable(self.index_path)
+            except (OSError, ValueError):
+                pass
+        if self._table is not None and self._table.source_hash != source_hash:
+            self._table.close()
+            self._table = None
+        if self._table is None:
+            self._build()
+            self._table = DigestTable(self.index_path)
+        self._stat = key
+
+    def find(self, digest):
+        """
+        查找摘要对应的记录
+
+        Args:
+            digest (bytes): 20字节的SHA-1摘要
+
+        Returns:
+            bytes: 记录的附加数据，找不到时返回None
+
+        Raises:
+            FileNotFoundError: 源文件不存在
+        """
+        self._refresh()
+        return self._table.find(digest)
+
+    def close(self):
+        """解除查找表的内存映射"""
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+            self._stat = None
+
+
+class PasswordIndex(_IndexedTable):
+    """密码字典的查找表"""
+
+    def __init__(self, wordlist_path, index_path=None):
+        """
+        Args:
+            wordlist_path (str): 密码字典路径
+            index_path (str): 查找表路径，默认为字典路径加 ".sha1idx"
+        """
+        super().__init__([wordlist_path],
+                         index_path if index_path is not None else wordlist_path + INDEX_SUFFIX)
+        self.wordlist_path = wordlist_path
+
+    def _build(self):
+        build_password_index(self.wordlist_path, self.index_path)
+
+    def lookup(self, digest):
+        """
+        查找摘要对应的密码
+
+        Args:
+            digest (bytes): 20字节的SHA-1摘要
+
+        Returns:
+            str: 密码，字典中没有对应的密码时返回None
+
+        Raises:
+            FileNotFoundError: 字典文件不存在
+        """
+        payload = self.find(digest)
+        if payload is None:
+            return None
+        (offset,) = _OFFSET.unpack(payload)
+        return load_wordlist(self.wordlist_path).line_at(offset).decode("utf-8")
+
+
+class SaltedIndex(_IndexedTable):
+    """密码字典与盐值组合的查找表，字典或盐值文件变化时自动重建"""
+
+    def __init__(self, wordlist_path, salts_path, index_path=None):
+        """
+        Args:
+            wordlist_path (str): 密码字典路径
+            salts_path (str): 盐值文件路径
+            index_path (str): 查找表路径，默认为字典路径加 ".salted.sha1idx"
+        """
+        super().__init__([wordlist_path, salts_path],
+                         index_path if index_path is not None
+                         else wordlist_path + SALTED_INDEX_SUFFIX)
+        self.wordlist_path = wordlist_path
+        self.salts_path = salts_path
+
+    def _build(self):
+        build_salted_index(self.wordlist_path, self.salts_path, self.index_path)
+
+    def lookup(self, digest):
+        """
+        查找摘要对应的密码和盐值。多个组合的摘要相同时，
+        按字典中的顺序、盐值文件中的顺序、先前缀后后缀取第一个
+
+        Args:
+            digest (bytes): 20字节的SHA-1摘要
+
+        Returns:
+            tuple: (密码, 盐值, "prefix" 或 "suffix")，没有对应的组合时返回None
+
+        Raises:
+            FileNotFoundError: 字典或盐值文件不存在
+        """
+        payload = self.find(digest)
+        if payload is None:
+            return None
+        offset, salt_offset, position = _SALTED.unpack(payload)
+        return (load_wordlist(self.wordlist_path).line_at(offset).decode("utf-8"),
+                load_wordlist(self.salts_path).line_at(salt_offset).decode("utf-8"),
+                POSITIONS[position])
+
+
+def parse_digest(hash_value, size=DIGEST_SIZE):
+    """
+    把十六进制哈希转换为摘要
+
+    Args:
+        hash_value (str): 十六进制哈希
+        size (int): 摘要字节数，默认为SHA-1的20字节
+
+    Returns:
+        bytes: 摘要，格式不正确时返回None
+    """
+    if len(hash_value) != size * 2:
+        return None
+    try:
+        digest = bytes.fromhex(hash_value)
+    except ValueError:
+        return None
+    return digest if len(digest) == size else None
+
+
+if __name__ == "__main__":
+    # 预先构建查找表：python sha1_index.py [字典文件 [盐值文件]]
+    wordlist = sys.argv[1] if len(sys.argv) > 1 else "top-10000-passwords.txt"
+    salts = sys.argv[2] if len(sys.argv) > 2 else "known-salts.txt"
+    print(f"{wordlist} -> {build_password_index(wordlist)}")
+    if os.path.exists(salts):
+        print(f"{wordlist} + {salts} -> {build_salted_index(wordlist, salts)}")
@@ -1,5 +1,28 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
 import unittest
-from password_cracker import crack_sha1_hash
+from unittest import mock
+
+import benchmark
+import bloom
+import hashers
+import mask_attack
+import parallel_cracker
+import password_cracker
+import potfile
+import rainbow
+import rules
+import sha1_index
+import wordlist
+from password_cracker import crack_sha1_hash, crack_sha1_hashes
+
+
+def sha1_hex(text):
+    """计算字符串的SHA-1哈希"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
 
 class TestPasswordCracker(unittest.TestCase):
     """测试密码破解器功能"""
@@ -51,5 +74,754 @@ class TestPasswordCracker(unittest.TestCase):
         result = crack_sha1_hash("invalid_hash", use_salts=False)
         self.assertEqual(result, "密码不在数据库中")
 
+
+class TestWithWordlist(unittest.TestCase):
+    """在临时目录中使用自己生成的字典和盐值文件进行测试"""
+    
+    PASSWORDS = ["123456", "password", "sammy123", "abacab", "superman", "password", "bubbles1"]
+    SALTS = ["salt1", "NaCl", "pepper"]
+    
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tempdir = tempfile.TemporaryDirectory()
+        os.chdir(self._tempdir.name)
+        self.write_file(password_cracker.PASSWORDS_FILE, self.PASSWORDS)
+        self.write_file(password_cracker.SALTS_FILE, self.SALTS)
+    
+    def tearDown(self):
+        for index in password_cracker._indexes.values():
+            index.close()
+        password_cracker._indexes.clear()
+        password_cracker._potfiles.clear()
+        os.chdir(self._cwd)
+        self._tempdir.cleanup()
+    
+    def write_file(self, path, lines):
+        """写入每行一项的文本文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class TestPasswordIndex(TestWithWordlist):
+    """测试预计算的查找表"""
+    
+    def test_lookup_builds_index(self):
+        """测试首次查找时构建查找表，之后直接查表"""
+        index_path = password_cracker.PASSWORDS_FILE + sha1_index.INDEX_SUFFIX
+        self.assertFalse(os.path.exists(index_path))
+        for password in self.PASSWORDS:
+            self.assertEqual(crack_sha1_hash(sha1_hex(password)), password)
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(crack_sha1_hash(sha1_hex("not-in-list")), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hash(sha1_hex("abacab").upper()), "abacab")
+        for invalid in ("", "invalid_hash", "zz" * 20, " " * 40):
+            self.assertEqual(crack_sha1_hash(invalid), "密码不在数据库中")
+    
+    def test_digest_table(self):
+        """测试查找表的排序、记录数和重复密码"""
+        path = sha1_index.build_password_index(password_cracker.PASSWORDS_FILE)
+        table = sha1_index.DigestTable(path)
+        try:
+            self.assertEqual(len(table), len(self.PASSWORDS))
+            digests = [table[i] for i in range(len(table))]
+            self.assertEqual(digests, sorted(digests))
+            # 重复的密码返回第一次出现的位置
+            payload = table.find(hashlib.sha1(b"password").digest())
+            self.assertEqual(int.from_bytes(payload, "big"), len("123456\n"))
+            self.assertIsNone(table.find(b"\x00" * 20))
+            self.assertIsNone(table.find(b"\xff" * 20))
+        finally:
+            table.close()
+    
+    def test_concurrent_build(self):
+        """测试同时构建同一个查找表不会互相截断临时文件"""
+        errors = []
+        
+        def build():
+            try:
+                sha1_index.build_password_index(password_cracker.PASSWORDS_FILE, "shared.idx")
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        table = sha1_index.DigestTable("shared.idx")
+        self.assertEqual(len(table), len(self.PASSWORDS))
+        table.close()
+        self.assertFalse([name for name in os.listdir(".") if name.endswith(".tmp")])
+        
+        # 写入出错时目标文件不变，临时文件被删除
+        with self.assertRaises(RuntimeError):
+            with sha1_index.atomic_open("shared.idx") as f:
+                f.write(b"partial")
+                raise RuntimeError
+        table = sha1_index.DigestTable("shared.idx")
+        self.assertEqual(len(table), len(self.PASSWORDS))
+        table.close()
+        self.assertFalse([name for name in os.listdir(".") if name.endswith(".tmp")])
+    
+    def test_rebuild_when_wordlist_changes(self):
+        """测试字典内容变化后自动重建查找表"""
+        self.assertEqual(crack_sha1_hash(sha1_hex("letmein"), potfile=None), "密码不在数据库中")
+        self.write_file(password_cracker.PASSWORDS_FILE, ["letmein"] + self.PASSWORDS)
+        self.assertEqual(crack_sha1_hash(sha1_hex("letmein"), potfile=None), "letmein")
+        self.assertEqual(crack_sha1_hash(sha1_hex("abacab"), potfile=None), "abacab")
+        
+        # 新进程打开过期的查找表时同样会重建
+        password_cracker._indexes.pop((password_cracker.PASSWORDS_FILE, None)).close()
+        self.write_file(password_cracker.PASSWORDS_FILE, ["qwerty"])
+        self.assertEqual(crack_sha1_hash(sha1_hex("qwerty"), potfile=None), "qwerty")
+        self.assertEqual(crack_sha1_hash(sha1_hex("letmein"), potfile=None), "密码不在数据库中")
+    
+    def test_missing_wordlist(self):
+        """测试字典文件不存在"""
+        os.remove(password_cracker.PASSWORDS_FILE)
+        self.assertEqual(crack_sha1_hash(sha1_hex("password")), "密码不在数据库中")
+    
+    def test_salted(self):
+        """测试使用盐值的破解"""
+        self.assertEqual(crack_sha1_hash(sha1_hex("NaCl" + "superman"), use_salts=True), "superman")
+        self.assertEqual(crack_sha1_hash(sha1_hex("abacab" + "pepper"), use_salts=True), "abacab")
+        self.assertEqual(crack_sha1_hash(sha1_hex("abacab"), use_salts=True), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hash(sha1_hex("NaCl" + "superman"), use_salts=False),
+                         "密码不在数据库中")
+        self.assertTrue(os.path.exists(
+            password_cracker.PASSWORDS_FILE + sha1_index.SALTED_INDEX_SUFFIX))
+    
+    def test_salted_index_match(self):
+        """测试加盐查找表返回的盐值和位置，以及全部组合都在表中"""
+        index = sha1_index.SaltedIndex(password_cracker.PASSWORDS_FILE, password_cracker.SALTS_FILE)
+        try:
+            self.assertEqual(index.lookup(hashlib.sha1(b"bubbles1salt1").digest()),
+                             ("bubbles1", "salt1", "suffix"))
+            self.assertEqual(index.lookup(hashlib.sha1(b"pepperpassword").digest()),
+                             ("password", "pepper", "prefix"))
+            self.assertIsNone(index.lookup(hashlib.sha1(b"password").digest()))
+            for password in set(self.PASSWORDS):
+                for salt in self.SALTS:
+                    for text in (salt + password, password + salt):
+                        match = index.lookup(hashlib.sha1(text.encode()).digest())
+                        self.assertEqual(match[:2], (password, salt))
+        finally:
+            index.close()
+    
+    def test_salted_rebuild_when_salts_change(self):
+        """测试盐值文件内容变化后自动重建加盐查找表"""
+        self.assertEqual(crack_sha1_hash(sha1_hex("sugar" + "abacab"), use_salts=True,
+                                         potfile=None),
+                         "密码不在数据库中")
+        self.write_file(password_cracker.SALTS_FILE, self.SALTS + ["sugar"])
+        self.assertEqual(crack_sha1_hash(sha1_hex("sugar" + "abacab"), use_salts=True,
+                                         potfile=None), "abacab")
+        os.remove(password_cracker.SALTS_FILE)
+        self.assertEqual(crack_sha1_hash(sha1_hex("sugar" + "abacab"), use_salts=True,
+                                         potfile=None),
+                         "密码不在数据库中")
+
+
+class TestBatchCracking(TestWithWordlist):
+    """测试批量破解"""
+    
+    def test_crack_sha1_hashes(self):
+        """测试一次破解多个哈希，结果与逐个破解相同"""
+        hashes = [sha1_hex(password) for password in ("abacab", "password", "not-in-list")]
+        hashes += ["invalid_hash", sha1_hex("sammy123").upper()]
+        results = crack_sha1_hashes(hashes)
+        self.assertEqual(results, {
+            hashes[0]: "abacab",
+            hashes[1]: "password",
+            hashes[2]: "密码不在数据库中",
+            "invalid_hash": "密码不在数据库中",
+            hashes[4]: "sammy123",
+        })
+        for hash_value, password in results.items():
+            self.assertEqual(crack_sha1_hash(hash_value), password)
+    
+    def test_crack_sha1_hashes_with_salts(self):
+        """测试批量破解加盐哈希"""
+        hashes = [sha1_hex("NaCl" + "superman"), sha1_hex("bubbles1" + "salt1"),
+                  sha1_hex("bubbles1")]
+        results = crack_sha1_hashes(hashes, use_salts=True)
+        self.assertEqual([results[h] for h in hashes], ["superman", "bubbles1", "密码不在数据库中"])
+        for hash_value, password in results.items():
+            self.assertEqual(crack_sha1_hash(hash_value, use_salts=True), password)
+    
+    def test_crack_sha1_hashes_empty(self):
+        """测试没有目标、字典不存在的情况"""
+        self.assertEqual(crack_sha1_hashes([]), {})
+        os.remove(password_cracker.SALTS_FILE)
+        self.assertEqual(crack_sha1_hashes([sha1_hex("abacab")], use_salts=True),
+                         {sha1_hex("abacab"): "密码不在数据库中"})
+
+
+class TestParallelCracking(TestWithWordlist):
+    """测试多进程分片破解"""
+    
+    def test_shards_cover_every_line_once(self):
+        """测试任意分片数下每一行恰好属于一个分片"""
+        lines = [f"pw{i}" + "x" * (i % 7) for i in range(200)]
+        self.write_file("words.txt", lines)
+        targets = {hashlib.sha1(line.encode()).digest() for line in lines}
+        for count in (1, 2, 3, 7, 64, 10000):
+            found = {}
+            for start, end in parallel_cracker.shard_ranges("words.txt", count):
+                shard_found = parallel_cracker.crack_range("words.txt", start, end, targets)
+                self.assertFalse(set(shard_found) & set(found), count)
+                found.update(shard_found)
+            self.assertEqual(set(found), targets, count)
+        open("empty.txt", 'w').close()
+        self.assertEqual(parallel_cracker.shard_ranges("empty.txt", 4), [])
+    
+    def test_cancel(self):
+        """测试取消后工作进程在检查点处结束"""
+        self.write_file("words.txt", [str(i) for i in range(parallel_cracker.CANCEL_CHECK_LINES * 3)])
+        cancel = threading.Event()
+        cancel.set()
+        notified = []
+        target = hashlib.sha1(b"0").digest()
+        found = parallel_cracker.crack_range("words.txt", 0, os.path.getsize("words.txt"),
+                                             {target, b"\x00" * 20}, cancel=cancel,
+                                             notify=notified.append)
+        self.assertEqual(found, {target: parallel_cracker.Match((0, 0), "0", "0", None, None)})
+        self.assertEqual(notified, [target])
+    
+    def test_crack_sha1_hashes_parallel(self):
+        """测试多进程破解的结果与单进程相同"""
+        hashes = [sha1_hex(password) for password in self.PASSWORDS] + [sha1_hex("not-in-list")]
+        self.assertEqual(crack_sha1_hashes(hashes, processes=2), crack_sha1_hashes(hashes))
+        salted = [sha1_hex("NaCl" + "superman"), sha1_hex("abacab" + "pepper"), sha1_hex("abacab")]
+        self.assertEqual(crack_sha1_hashes(salted, use_salts=True, processes=2),
+                         crack_sha1_hashes(salted, use_salts=True))
+    
+    def test_crack_sha1_hash_processes(self):
+        """测试单个哈希指定进程数时不构建查找表"""
+        for processes in (1, 2):
+            self.assertEqual(crack_sha1_hash(sha1_hex("superman"), processes=processes,
+                                             potfile=None), "superman")
+            self.assertEqual(crack_sha1_hash(sha1_hex("pepper" + "bubbles1"), use_salts=True,
+                                             processes=processes, potfile=None), "bubbles1")
+            self.assertEqual(crack_sha1_hash(sha1_hex("nope"), processes=processes,
+                                             potfile=None), "密码不在数据库中")
+        self.assertFalse([name for name in os.listdir(".") if name.endswith(".sha1idx")])
+
+
+class TestRules(TestWithWordlist):
+    """测试规则变形引擎"""
+    
+    def test_rule_candidates(self):
+        """测试各操作符"""
+        cases = {
+            ":": [b"pass"],
+            "c": [b"Pass"],
+            "u": [b"PASS"],
+            "r": [b"ssap"],
+            "d": [b"passpass"],
+            "t": [b"PASS"],
+            "^1": [b"1pass"],
+            "$1 $2": [b"pass12"],
+            "sa@ ss$": [b"p@$$"],
+            "@s": [b"pa"],
+            "c $?d": [b"Pass" + str(i).encode() for i in range(10)],
+            "^?d c": [str(i).encode() + b"pass" for i in range(10)],
+            "$?d r": [str(i).encode() + b"ssap" for i in range(10)],
+        }
+        for text, expected in cases.items():
+            self.assertEqual(list(rules.Rule(text).candidates(b"pass")), expected, text)
+        self.assertEqual(len(list(rules.Rule("$?d$?d$?d").candidates(b"x"))), 1000)
+        for invalid in ("", "  ", "x", "$", "sa"):
+            with self.assertRaises(ValueError):
+                rules.Rule(invalid)
+    
+    def test_rule_digests_reuse_prefix_state(self):
+        """测试共享前缀状态计算的摘要与直接计算的相同"""
+        rule = rules.Rule("c $?d$?s")
+        self.assertEqual(rule.suffixes[:2], [b"0!", b"0@"])
+        for prefix, tail in ((b"", b""), (b"salt", b""), (b"", b"salt"), (b"s" * 70, b"salt")):
+            for candidate, digest in rule.digests(b"word", prefix, tail):
+                self.assertEqual(digest, hashlib.sha1(prefix + candidate + tail).digest())
+        candidates = list(rules.iter_candidates([b"a", b"b"], [":", "u"]))
+        self.assertEqual(candidates, [b"a", b"A", b"b", b"B"])
+        
+        # 每个变形结果都按 Hasher 的属性判断是否共享前缀状态，与哈希对象的属性无关
+        class State:
+            def __init__(self, state):
+                self._state = state
+            
+            def copy(self):
+                return State(self._state.copy())
+            
+            def update(self, data):
+                self._state.update(data)
+            
+            def digest(self):
+                return self._state.digest()
+        
+        hasher = hashers.Hasher("wrapped", lambda data: State(hashlib.sha1(data)), 20, 64)
+        rule = rules.Rule("^?d $?d$?d")
+        digests = list(rule.digests(b"word", b"s" * 70, hasher=hasher))
+        self.assertEqual(len(digests), 1000)
+        for candidate, digest in digests:
+            self.assertEqual(digest, hashlib.sha1(b"s" * 70 + candidate).digest())
+    
+    def test_crack_with_rules(self):
+        """测试用规则破解字典中没有的密码"""
+        hashes = [sha1_hex("Superman7"), sha1_hex("p@ssw0rd"), sha1_hex("abacab42"),
+                  sha1_hex("abacab")]
+        expected = ["Superman7", "p@ssw0rd", "abacab42", "abacab"]
+        results = crack_sha1_hashes(hashes, rules=rules.DEFAULT_RULES)
+        self.assertEqual([results[h] for h in hashes], expected)
+        self.assertEqual(crack_sha1_hashes(hashes, rules=rules.DEFAULT_RULES, processes=2), results)
+        self.assertEqual(crack_sha1_hash(hashes[0], potfile=None), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hash(hashes[0], rules=["c $?d"], potfile=None), "Superman7")
+        
+        salted = sha1_hex("NaCl" + "Bubbles1!")
+        self.assertEqual(crack_sha1_hashes([salted], use_salts=True, rules=["c $!"]),
+                         {salted: "Bubbles1!"})
+        salted = sha1_hex("Bubbles12" + "pepper")
+        self.assertEqual(crack_sha1_hash(salted, use_salts=True, rules=["c $?d"]), "Bubbles12")
+
+
+class TestRainbowTable(TestWithWordlist):
+    """测试彩虹表"""
+    
+    def test_keyspace(self):
+        """测试密码空间的下标与密码一一对应"""
+        keyspace = rainbow.Keyspace("abc", 1, 3)
+        self.assertEqual(keyspace.size, 3 + 9 + 27)
+        plaintexts = [keyspace.plaintext(i) for i in range(keyspace.size)]
+        self.assertEqual(len(set(plaintexts)), keyspace.size)
+        self.assertEqual(plaintexts[:4], [b"a", b"b", b"c", b"aa"])
+        self.assertEqual(plaintexts[-1], b"ccc")
+        for charset, low, high in (("", 1, 2), ("aa", 1, 2), ("ab", 0, 2), ("ab", 3, 2)):
+            with self.assertRaises(ValueError):
+                rainbow.Keyspace(charset, low, high)
+    
+    def test_generate_and_lookup(self):
+        """测试表中每条链经过的密码都能查到，表外的哈希查不到"""
+        keyspace = rainbow.Keyspace("abcd", 1, 4)
+        count = rainbow.generate_table("t0.rbw", keyspace, chain_length=16, chain_count=200,
+                                       processes=2)
+        self.assertEqual([name for name in os.listdir() if name.endswith(".tmp")], [])
+        table = rainbow.RainbowTable("t0.rbw")
+        try:
+            self.assertEqual(len(table), count)
+            self.assertEqual(table.chain_length, 16)
+            ends = [table[i] for i in range(len(table))]
+            self.assertEqual(ends, sorted(set(ends)))
+            covered = set()
+            mask = rainbow._table_mask(0)
+            for position in range(len(table)):
+                start = rainbow._CHAIN.unpack_from(
+                    table._map, table._start + position * rainbow._CHAIN.size)[1]
+                for column in range(16):
+                    index = rainbow._walk(keyspace, start, 0, column, mask)
+                    covered.add(keyspace.plaintext(index))
+            for plaintext in covered:
+                self.assertEqual(table.lookup(hashlib.sha1(plaintext).digest()),
+                                 plaintext.decode())
+            self.assertIsNone(table.lookup(hashlib.sha1(b"zzzzz").digest()))
+        finally:
+            table.close()
+        
+        # 通过 password_cracker 查找，覆盖率应当很高
+        found = sum(password_cracker.crack_sha1_hash_rainbow(sha1_hex(p.decode()), ["t0.rbw"])
+                    != "密码不在数据库中"
+                    for p in map(keyspace.plaintext, range(keyspace.size)))
+        self.assertEqual(found, len(covered))
+        self.assertGreater(found, keyspace.size // 2)
+        self.assertEqual(password_cracker.crack_sha1_hash_rainbow("xyz", ["t0.rbw"]),
+                         "密码不在数据库中")
+    
+    def test_invalid_table(self):
+        """测试文件格式不正确"""
+        with open("bad.rbw", 'wb') as f:
+            f.write(b"\x00" * 64)
+        with self.assertRaises(ValueError):
+            rainbow.RainbowTable("bad.rbw")
+
+
+class TestMaskAttack(TestWithWordlist):
+    """测试掩码攻击"""
+    
+    def test_mask(self):
+        """测试掩码解析以及下标与密码一一对应"""
+        mask = mask_attack.Mask("?dx?l")
+        self.assertEqual(len(mask), 3)
+        self.assertEqual(mask.size, 10 * 26)
+        plaintexts = [mask.plaintext(i) for i in range(mask.size)]
+        self.assertEqual(len(set(plaintexts)), mask.size)
+        self.assertEqual(plaintexts[:2], [b"0xa", b"0xb"])
+        self.assertEqual(plaintexts[-1], b"9xz")
+        self.assertEqual(mask_attack.Mask("a??").plaintext(0), b"a?")
+        for text in ("", "?", "a?x"):
+            with self.assertRaises(ValueError):
+                mask_attack.Mask(text)
+    
+    def test_crack_range(self):
+        """测试任意边界的下标范围都只计算范围内的候选密码"""
+        mask = mask_attack.Mask("?l?d?d")
+        targets = {hashlib.sha1(mask.plaintext(i)).digest() for i in (0, 99, 100, 1234, 2599)}
+        found = {}
+        for start in range(0, mask.size, 37):
+            found.update(mask.crack_range(start, min(start + 37, mask.size), targets))
+        self.assertEqual(sorted(index for index, _ in found.values()), [0, 99, 100, 1234, 2599])
+        for index, candidate in found.values():
+            self.assertEqual(mask.plaintext(index), candidate)
+        self.assertEqual(mask.crack_range(1, 99, targets), {})
+    
+    def test_crack_mask(self):
+        """测试单进程和多进程的结果以及进度报告"""
+        digests = {hashlib.sha1(p).digest(): p for p in (b"Ab1", b"Zz9")}
+        for processes in (1, 2):
+            calls = []
+            found, next_index = mask_attack.crack_mask(
+                "?u?l?d", set(digests), processes, chunk_size=1000,
+                progress=lambda done, total: calls.append((done, total)))
+            self.assertEqual({d: p for d, (_, p) in found.items()}, digests)
+            self.assertEqual(calls[-1][1], 26 * 26 * 10)
+            self.assertEqual(calls, sorted(calls))
+        
+        # 目标全部找到后不再计算之后的块
+        found, next_index = mask_attack.crack_mask("?u?l?d", {hashlib.sha1(b"Ab1").digest()},
+                                                   chunk_size=100)
+        self.assertEqual(next_index, 100)
+        
+        # 多进程时目标在第一个块中找到，其余排队的块被取消
+        target = hashlib.sha1(b"aaa1").digest()
+        found, _ = mask_attack.crack_mask("?l?l?l?d", {target}, 2, chunk_size=1000,
+                                          resume="mask.resume")
+        self.assertEqual(found, {target: (1, b"aaa1")})
+        self.assertFalse(os.path.exists("mask.resume"))
+    
+    def test_resume(self):
+        """测试中断后从续扫文件记录的位置继续"""
+        mask = mask_attack.Mask("?l?l?d")
+        early = hashlib.sha1(b"aa1").digest()
+        late = hashlib.sha1(b"zz9").digest()
+        targets = {early, late}
+        found, next_index = mask_attack.crack_mask(mask, targets, end=3000, chunk_size=1000,
+                                                   resume="mask.resume")
+        self.assertEqual(set(found), {early})
+        self.assertEqual(next_index, 3000)
+        self.assertTrue(os.path.exists("mask.resume"))
+        
+        calls = []
+        found, next_index = mask_attack.crack_mask(
+            mask, targets, chunk_size=1000, resume="mask.resume",
+            progress=lambda done, total: calls.append((done, total)))
+        # 中断前找到的目标仍然在结果中
+        self.assertEqual(found, {early: (1, b"aa1"), late: (mask.size - 1, b"zz9")})
+        self.assertEqual(calls[-1], (mask.size - 3000, mask.size - 3000))
+        self.assertEqual(next_index, mask.size)
+        self.assertFalse(os.path.exists("mask.resume"))
+        
+        # 全部目标都已找到而提前结束时也删除续扫文件
+        found, next_index = mask_attack.crack_mask(mask, {early}, chunk_size=1000,
+                                                   resume="mask.resume")
+        self.assertEqual(set(found), {early})
+        self.assertEqual(next_index, 1000)
+        self.assertFalse(os.path.exists("mask.resume"))
+        
+        # 掩码不同时不使用续扫文件
+        mask_attack.crack_mask("?l?l?d", targets, end=3000, resume="mask.resume")
+        found, _ = mask_attack.crack_mask("?l?d?d", {hashlib.sha1(b"a00").digest()},
+                                          resume="mask.resume")
+        self.assertEqual(len(found), 1)
+    
+    def test_crack_sha1_hashes_mask(self):
+        """测试通过 password_cracker 做掩码攻击并记录到 potfile"""
+        hashes = [sha1_hex("Cat12"), sha1_hex("Cat12").upper(), sha1_hex("dog99"), "xyz"]
+        pot_path = password_cracker.POTFILE
+        results = password_cracker.crack_sha1_hashes_mask(hashes, "?u?l?l?d?d", potfile=pot_path)
+        self.assertEqual(results, {hashes[0]: "Cat12", hashes[1]: "Cat12",
+                                   hashes[2]: "密码不在数据库中", hashes[3]: "密码不在数据库中"})
+        pot = potfile.Potfile(pot_path)
+        self.assertEqual(pot.get(bytes.fromhex(hashes[0]), attack="mask:?u?l?l?d?d").password,
+                         "Cat12")
+        # 掩码的结果不会被字典破解当作字典中的密码返回
+        self.assertEqual(crack_sha1_hash(hashes[0], potfile=pot_path), "密码不在数据库中")
+
+
+class TestPotfile(TestWithWordlist):
+    """测试已破解哈希的记录文件"""
+    
+    def test_potfile_records(self):
+        """测试追加、延迟载入、加盐与不加盐分开索引"""
+        pot = potfile.Potfile("test.potfile")
+        self.assertFalse(os.path.exists("test.potfile"))
+        self.assertEqual(len(pot), 0)
+        digest = hashlib.sha1(b"password").digest()
+        pot.add(digest, "password")
+        pot.add(digest, "other")  # 已有记录时忽略
+        pot.add(digest, "password", "NaCl", "prefix")
+        self.assertEqual(pot.get(digest), potfile.PotEntry("password", None, None))
+        self.assertEqual(pot.get(digest, salted=True),
+                         potfile.PotEntry("password", "NaCl", "prefix"))
+        
+        # 另一个实例（另一个进程）从文件载入，并读取之后追加的内容
+        other = potfile.Potfile("test.potfile")
+        self.assertEqual(len(other), 2)
+        pot.add(hashlib.sha1(b"x").digest(), "x")
+        self.assertEqual(other.get(hashlib.sha1(b"x").digest()).password, "x")
+        
+        # 中断留下的不完整行被忽略，不影响之后的记录
+        with open("test.potfile", 'a', encoding='utf-8') as f:
+            f.write('{"hash": "00')
+        pot.add(hashlib.sha1(b"y").digest(), "y")
+        self.assertEqual(len(potfile.Potfile("test.potfile")), 4)
+        self.assertEqual(len(other), 4)
+    
+    def test_crack_uses_potfile(self):
+        """测试破解前先查询记录，破解成功后追加记录"""
+        pot_path = password_cracker.POTFILE
+        salted = sha1_hex("abacab" + "pepper")
+        # 默认不使用记录文件
+        self.assertEqual(crack_sha1_hash(salted, use_salts=True), "abacab")
+        self.assertFalse(os.path.exists(pot_path))
+        
+        self.assertEqual(crack_sha1_hash(salted, use_salts=True, potfile=pot_path), "abacab")
+        self.assertEqual(crack_sha1_hashes([sha1_hex("sammy123")], potfile=pot_path),
+                         {sha1_hex("sammy123"): "sammy123"})
+        pot = potfile.Potfile(pot_path)
+        self.assertEqual(pot.get(bytes.fromhex(salted), salted=True),
+                         potfile.PotEntry("abacab", "pepper", "suffix"))
+        self.assertIsNone(pot.get(bytes.fromhex(salted)))
+        
+        # 字典被删除后，已破解的哈希仍然可以立即得到结果，加盐与不加盐的结果互不混用
+        os.remove(password_cracker.PASSWORDS_FILE)
+        password_cracker._potfiles.clear()
+        self.assertEqual(crack_sha1_hash(salted, use_salts=True, potfile=pot_path), "abacab")
+        self.assertEqual(crack_sha1_hash(salted, potfile=pot_path), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hashes([sha1_hex("sammy123"), salted], potfile=pot_path),
+                         {sha1_hex("sammy123"): "sammy123", salted: "密码不在数据库中"})
+        self.assertEqual(crack_sha1_hash(sha1_hex("sammy123")), "密码不在数据库中")
+    
+    def test_rules_recorded_separately(self):
+        """测试规则变形后的密码与字典中的原密码、不同规则集的结果分开记录"""
+        pot_path = password_cracker.POTFILE
+        target = sha1_hex("Superman7")
+        self.assertEqual(crack_sha1_hash(target, rules=["c $?d"], potfile=pot_path), "Superman7")
+        self.assertEqual(crack_sha1_hash(target, rules=["c $?d"], potfile=pot_path), "Superman7")
+        self.assertEqual(crack_sha1_hash(target, potfile=pot_path), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hashes([target], rules=["$?d"], potfile=pot_path),
+                         {target: "密码不在数据库中"})
+        
+        # 字典被删除后只有同一组规则能从记录中得到结果
+        os.remove(password_cracker.PASSWORDS_FILE)
+        password_cracker._potfiles.clear()
+        self.assertEqual(crack_sha1_hashes([target], rules=[rules.Rule("c $?d")], potfile=pot_path),
+                         {target: "Superman7"})
+        self.assertEqual(crack_sha1_hashes([target], potfile=pot_path), {target: "密码不在数据库中"})
+
+
+class TestWordlist(TestWithWordlist):
+    """测试内存映射的字典缓存"""
+    
+    def test_lines(self):
+        """测试逐行遍历、去掉空白、按范围遍历"""
+        with open("words.txt", 'wb') as f:
+            f.write(b"alpha\r\n  beta \n\ngamma")
+        words = wordlist.Wordlist("words.txt")
+        self.assertEqual(list(words.lines()),
+                         [(0, b"alpha"), (7, b"beta"), (15, b""), (16, b"gamma")])
+        self.assertEqual(words.line_at(7), b"beta")
+        self.assertEqual(words.items(), [b"alpha", b"beta", b"", b"gamma"])
+        for split in range(words.size + 1):
+            self.assertEqual(list(words.lines(0, split)) + list(words.lines(split)),
+                             list(words.lines()), split)
+        open("empty.txt", 'w').close()
+        self.assertEqual(list(wordlist.Wordlist("empty.txt").lines()), [])
+    
+    def test_chunks(self):
+        """测试跨越多个块的遍历"""
+        lines = [f"word{i}".encode() for i in range(5000)]
+        self.write_file("words.txt", [line.decode() for line in lines])
+        original = wordlist.CHUNK_SIZE
+        wordlist.CHUNK_SIZE = 100
+        try:
+            words = wordlist.Wordlist("words.txt")
+            self.assertEqual([line for _, line in words.lines()], lines)
+            self.assertEqual([line for _, line in words.lines(1000, 2000)],
+                             [line for offset, line in words.lines() if 1000 <= offset < 2000])
+        finally:
+            wordlist.CHUNK_SIZE = original
+    
+    def test_cache_invalidation(self):
+        """测试进程内缓存在文件修改后重新映射"""
+        first = wordlist.load_wordlist(password_cracker.SALTS_FILE)
+        self.assertIs(wordlist.load_wordlist(password_cracker.SALTS_FILE), first)
+        self.assertEqual(wordlist.load_salts(password_cracker.SALTS_FILE),
+                         [salt.encode() for salt in self.SALTS])
+        self.write_file(password_cracker.SALTS_FILE, ["only"])
+        stat = os.stat(password_cracker.SALTS_FILE)
+        os.utime(password_cracker.SALTS_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(wordlist.load_salts(password_cracker.SALTS_FILE), [b"only"])
+        os.remove(password_cracker.SALTS_FILE)
+        with self.assertRaises(FileNotFoundError):
+            wordlist.load_salts(password_cracker.SALTS_FILE)
+
+class TestHashers(TestWithWordlist):
+    """测试可替换的哈希算法"""
+    
+    def test_get_hasher(self):
+        """测试按名称选择算法，摘要与 hashlib 一致"""
+        self.assertEqual(hashers.get_hasher().name, "sha1")
+        for name in ("sha1", "sha256", "md5"):
+            hasher = hashers.get_hasher(name)
+            self.assertIs(hashers.get_hasher(hasher), hasher)
+            self.assertEqual(hasher.digest(b"abc"), hashlib.new(name, b"abc").digest())
+            self.assertEqual(hasher.digest_size, hashlib.new(name).digest_size)
+            self.assertFalse(hasher.slow)
+        pbkdf2 = hashers.get_hasher("pbkdf2-sha256:10:00ff")
+        self.assertTrue(pbkdf2.slow)
+        self.assertEqual(pbkdf2.digest(b"abc"),
+                         hashlib.pbkdf2_hmac("sha256", b"abc", b"\x00\xff", 10))
+        for name in ("sha3", "pbkdf2-sha256", "pbkdf2-sha256:0", "pbkdf2-nope:10",
+                     "pbkdf2-sha256:10:zz", "pbkdf2-sha256:10:00:00"):
+            with self.assertRaises(ValueError):
+                hashers.get_hasher(name)
+    
+    @unittest.skipUnless("ntlm" in hashers.available_hashers(), "hashlib 不支持 md4")
+    def test_ntlm(self):
+        """测试NTLM摘要"""
+        self.assertEqual(hashers.get_hasher("ntlm").digest(b"password").hex(),
+                         "8846f7eaee8fb117ad06bdd830b7586c")
+    
+    def test_crack_with_hasher(self):
+        """测试按调用选择算法破解，potfile 按算法分开记录"""
+        md5 = hashlib.md5(b"sammy123").hexdigest()
+        sha256 = hashlib.sha256(b"pepper" + b"superman").hexdigest()
+        pot_path = password_cracker.POTFILE
+        self.assertEqual(crack_sha1_hash(md5, hasher="md5", potfile=pot_path), "sammy123")
+        self.assertEqual(crack_sha1_hash(md5, potfile=pot_path), "密码不在数据库中")
+        self.assertEqual(crack_sha1_hashes([sha256, md5], use_salts=True, hasher="sha256",
+                                           potfile=pot_path),
+                         {sha256: "superman", md5: "密码不在数据库中"})
+        self.assertEqual(crack_sha1_hash(md5, hasher="md5"), "sammy123")
+        pot = potfile.Potfile(password_cracker.POTFILE)
+        self.assertEqual(pot.get(bytes.fromhex(md5), algorithm="md5").password, "sammy123")
+        self.assertIsNone(pot.get(bytes.fromhex(md5)))
+        
+        # 规则在长前缀下复制哈希状态
+        long_salt = "s" * 70
+        self.write_file(password_cracker.SALTS_FILE, [long_salt])
+        target = hashlib.sha256(long_salt.encode() + b"Bubbles142").hexdigest()
+        self.assertEqual(crack_sha1_hashes([target], use_salts=True, rules=["c $?d$?d"],
+                                           potfile=None, hasher="sha256"),
+                         {target: "Bubbles142"})
+    
+    def test_slow_hasher_uses_processes(self):
+        """测试慢速算法自动使用多进程破解"""
+        hasher = "pbkdf2-sha1:50"
+        target = hashers.get_hasher(hasher).digest(b"abacab").hex()
+        with mock.patch.object(password_cracker, "crack_parallel",
+                               wraps=password_cracker.crack_parallel) as crack_parallel:
+            self.assertEqual(crack_sha1_hash(target, hasher=hasher), "abacab")
+        self.assertEqual(crack_parallel.call_args.args[3], None)
+        self.assertEqual(password_cracker.crack_sha1_hashes_mask([target], "abaca?l",
+                                                                 hasher=hasher),
+                         {target: "abacab"})
+    
+    def test_benchmark(self):
+        """测试各算法和模式的性能测试"""
+        benchmark.make_wordlist("bench.txt", 50)
+        self.assertEqual(len(wordlist.load_wordlist("bench.txt").items()), 50)
+        for mode in benchmark.MODES:
+            report = benchmark.benchmark_mode("bench.txt", "md5", mode, [b"a", b"b"],
+                                              batch_size=10, processes=2)
+            self.assertEqual(report["algorithm"], "md5")
+            self.assertEqual(report["candidates"], 200 if mode == "salted" else 50)
+            self.assertGreater(report["candidates_per_sec"], 0)
+        with self.assertRaises(ValueError):
+            benchmark.benchmark_mode("bench.txt", "md5", "nope")
+
+
+class TestBloomFilter(TestWithWordlist):
+    """测试布隆过滤器和内存映射的目标集合"""
+    
+    def test_bloom_filter(self):
+        """测试没有漏报，误判率接近设定值"""
+        size, hash_count = bloom.bloom_parameters(10000, 0.01)
+        self.assertEqual((size, hash_count), (95851, 7))
+        with self.assertRaises(ValueError):
+            bloom.bloom_parameters(10, 0)
+        bloom_filter = bloom.BloomFilter(size, hash_count)
+        members = [hashlib.sha1(b"member%d" % i).digest() for i in range(10000)]
+        for digest in members:
+            bloom_filter.add(digest)
+        self.assertTrue(all(digest in bloom_filter for digest in members))
+        false_positives = sum(hashlib.sha1(b"other%d" % i).digest() in bloom_filter
+                              for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+    
+    def test_target_set(self):
+        """测试外部排序去重后的目标集合与内存中的集合一致"""
+        digests = [hashlib.md5(b"%d" % (i % 300)).digest() for i in range(1000)]
+        original = bloom.RUN_SIZE
+        bloom.RUN_SIZE = 64
+        try:
+            count = bloom.build_target_set(iter(digests + [b"short"]), "t.digests", 16)
+        finally:
+            bloom.RUN_SIZE = original
+        self.assertEqual(count, 300)
+        self.assertTrue(os.path.exists("t.digests.bloom"))
+        self.assertFalse([name for name in os.listdir(".") if name.endswith((".run", ".tmp"))])
+        
+        targets = bloom.TargetSet("t.digests")
+        copy = pickle.loads(pickle.dumps(targets))
+        try:
+            self.assertEqual(len(targets), 300)
+            self.assertEqual(list(targets), sorted(set(digests)))
+            for candidate in (targets, copy):
+                self.assertTrue(all(digest in candidate for digest in digests))
+                self.assertFalse(any(hashlib.md5(b"x%d" % i).digest() in candidate
+                                     for i in range(1000)))
+        finally:
+            targets.close()
+            copy.close()
+        
+        bloom.build_target_set(iter([]), "empty.digests", 20)
+        empty = bloom.TargetSet("empty.digests")
+        self.assertEqual(len(empty), 0)
+        self.assertNotIn(b"\x00" * 20, empty)
+        empty.close()
+        with open("bad.digests", "wb") as f:
+            f.write(b"\x00" * 64)
+        with self.assertRaises(ValueError):
+            bloom.TargetSet("bad.digests")
+    
+    def test_crack_sha1_hash_file(self):
+        """测试从文件破解大量哈希，结果与批量破解一致"""
+        hashes = [sha1_hex(p) for p in ("sammy123", "superman", "nope")]
+        hashes += [os.urandom(20).hex() for _ in range(500)] + ["bad", sha1_hex("sammy123").upper()]
+        self.write_file("hashes.txt", hashes)
+        expected = {sha1_hex("sammy123"): "sammy123", sha1_hex("superman"): "superman"}
+        for processes in (1, 2):
+            self.assertEqual(password_cracker.crack_sha1_hash_file("hashes.txt",
+                                                                   processes=processes),
+                             expected)
+        
+        pot_path = password_cracker.POTFILE
+        salted = hashlib.sha256(b"abacab" + b"NaCl").hexdigest()
+        self.write_file("salted.txt", [salted, hashes[0]])
+        self.assertEqual(password_cracker.crack_sha1_hash_file("salted.txt", use_salts=True,
+                                                               potfile=pot_path, hasher="sha256"),
+                         {salted: "abacab"})
+        
+        # 已记录在 potfile 中的哈希不再进入目标集合
+        self.assertEqual(password_cracker.crack_sha1_hash_file("hashes.txt", potfile=pot_path),
+                         expected)
+        with mock.patch.object(password_cracker, "_crack_targets") as crack_targets:
+            self.assertEqual(password_cracker.crack_sha1_hash_file("salted.txt", use_salts=True,
+                                                                   potfile=pot_path,
+                                                                   hasher="sha256"),
+                             {salted: "abacab"})
+        crack_targets.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+内存映射的字典缓存
+字典和盐值文件在进程内只映射一次，逐行遍历时直接返回字节串，
+不做解码和编码（计算哈希本来就需要字节串）；文件的修改时间或大小变化时才重新映射
+"""
+
+import mmap
+import os
+
+# 遍历时每次从映射中取出的字节数（按行尾对齐），在C代码中切分成行
+CHUNK_SIZE = 1 << 20
+
+
+class Wordlist:
+    """
+    内存映射的字典文件
+
+    每行去掉首尾的ASCII空白字符后作为一个条目，空文件视为没有条目。
+    """
+
+    def __init__(self, path):
+        """
+        映射文件
+
+        Args:
+            path (str): 文件路径
+
+        Raises:
+            FileNotFoundError: 文件不存在
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.stat_key = (stat.st_size, stat.st_mtime_ns)
+            if stat.st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._map = b""
+        self.size = len(self._map)
+        self._items = None
+
+    def _line_end(self, offset):
+        end = self._map.find(b"\n", offset)
+        return self.size if end < 0 else end
+
+    def lines(self, start=0, end=None):
+        """
+        遍历行首位于 [start, end) 的行
+
+        范围的边界不必对齐到行首：一行属于它的第一个字节所在的范围，
+        因此把文件切分为相邻的范围时每一行恰好被遍历一次。
+
+        Args:
+            start (int): 起始偏移量
+            end (int): 结束偏移量，默认为文件末尾
+
+        Yields:
+            tuple: (行首偏移量, 去掉首尾空白后的内容)
+        """
+        if end is None or end > self.size:
+            end = self.size
+        offset = start
+        if 0 < start < self.size and self._map[start - 1] != 0x0A:
+            # 跳过上一个范围中的行的剩余部分
+            offset = self._line_end(start) + 1
+        while offset < end:
+            # 取出从 offset 开始、至少 CHUNK_SIZE 字节的完整行，最后一行的行首不超过 end
+            chunk_end = self._line_end(min(offset + CHUNK_SIZE, end) - 1)
+            for line in self._map[offset:chunk_end].split(b"\n"):
+                yield offset, line.strip()
+                offset += len(line) + 1
+
+    def line_at(self, offset):
+        """
+        返回从 offset 开始的一行
+
+        Args:
+            offset (int): 行首偏移量
+
+        Returns:
+            bytes: 去掉首尾空白后的内容
+        """
+        return self._map[offset:self._line_end(offset)].strip()
+
+    def items(self):
+        """
+        返回全部条目，第一次调用后缓存，适合盐值等小文件
+
+        Returns:
+            list: 条目（bytes）
+        """
+        if self._items is None:
+            self._items = [line for _, line in self.lines()]
+        return self._items
+
+
+# 路径 -> Wordlist，文件修改时间或大小变化时替换
+_cache = {}
+
+
+def load_wordlist(path):
+    """
+    返回路径对应的 Wordlist，进程内缓存，文件变化时重新映射
+
+    旧的映射不会被显式关闭，正在遍历它的调用结束后自动解除映射。
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        Wordlist: 字典
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    wordlist = _cache.get(path)
+    if wordlist is not None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            del _cache[path]
+            raise
+        if (stat.st_size, stat.st_mtime_ns) == wordlist.stat_key:
+            return wordlist
+    wordlist = _cache[path] = Wordlist(path)
+    return wordlist
+
+
+def load_salts(path):
+    """
+    返回盐值文件中的全部盐值
+
+    Args:
+        path (str): 盐值文件路径
+
+    Returns:
+        list: 盐值（bytes）
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    return load_wordlist(path).items()
@@ -0,0 +1,201 @@
+"""
+服务横幅识别
+连接开放端口读取服务主动发送的前几个字节（横幅），用预编译的特征索引识别服务，
+识别不出时退回常见端口字典。抓取在线程池中并发进行，可以与连接扫描流水线执行
+"""
+
+import re
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from common_ports import ports_and_services
+
+# 单个端口读取横幅的时间上限（秒）
+DEFAULT_BANNER_TIMEOUT = 0.5
+
+# 并发抓取横幅的最大线程数
+DEFAULT_BANNER_WORKERS = 32
+
+# 最多读取的字节数
+BANNER_SIZE = 256
+
+# 服务端不主动发送数据时使用的探测请求，多数HTTP服务会回应
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+
+# (服务名称, 横幅特征)，特征从横幅开头匹配。
+# 同一前缀的特征按从具体到一般的顺序排列，例如 "220 ... FTP" 排在 "220 ... SMTP" 之前
+SIGNATURES = [
+    ("ssh", rb"SSH-\d+\.\d+-"),
+    ("http", rb"HTTP/\d\.\d \d{3}"),
+    ("ftp", rb"220[ -][^\r\n]*(?:ftp|filezilla)"),
+    ("smtp", rb"220[ -][^\r\n]*(?:smtp|mail|postfix|exim)"),
+    ("ftp", rb"220[ -]"),
+    ("pop3", rb"\+OK"),
+    ("imap", rb"\* (?:OK|PREAUTH)"),
+    ("mysql", rb"[\s\S]{3}\x00\x0a\d+\.\d+\.\d+"),
+    ("vnc", rb"RFB \d{3}\.\d{3}"),
+    ("telnet", rb"\xff[\xfb-\xfe]"),
+    ("redis", rb"-(?:ERR|NOAUTH|DENIED)"),
+    ("rtsp", rb"RTSP/\d\.\d"),
+]
+
+
+def _compile_signatures(signatures):
+    """
+    把所有特征合并为一个带命名分组的正则表达式，一次匹配即可得到结果
+
+    Returns:
+        tuple: (编译后的正则表达式, 分组名 -> 服务名称)
+    """
+    names = {}
+    parts = []
+    for index, (service, pattern) in enumerate(signatures):
+        group = f"s{index}"
+        names[group] = service
+        parts.append(b"(?P<" + group.encode("ascii") + b">" + pattern + b")")
+    return re.compile(b"|".join(parts), re.IGNORECASE), names
+
+
+_SIGNATURE_INDEX, _SIGNATURE_NAMES = _compile_signatures(SIGNATURES)
+
+
+def match_banner(banner):
+    """
+    用特征索引识别横幅对应的服务
+
+    Args:
+        banner (bytes): 横幅
+
+    Returns:
+        str: 服务名称，没有匹配的特征时返回None
+    """
+    match = _SIGNATURE_INDEX.match(banner)
+    if match is None:
+        return None
+    return _SIGNATURE_NAMES[match.lastgroup]
+
+
+def identify_service(port, banner):
+    """
+    识别端口上的服务，横幅无法识别时使用常见端口字典
+
+    Args:
+        port (int): 端口
+        banner (bytes): 横幅，可以为空
+
+    Returns:
+        str: 服务名称，未知服务返回 "unknown"
+    """
+    return match_banner(banner) or ports_and_services.get(port, "unknown")
+
+
+def grab_banner(host, port, timeout=DEFAULT_BANNER_TIMEOUT):
+    """
+    连接端口并读取横幅。服务端在一半时限内没有发送数据时，
+    发送一个HTTP请求再读取剩余时限
+
+    Args:
+        host (str): IP地址
+        port (int): 端口
+        timeout (float): 读取横幅的总时限（秒）
+
+    Returns:
+        bytes: 读到的横幅，连接失败或没有数据时返回空字节串
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout / 2)
+    try:
+        sock.connect((host, port))
+        try:
+            return sock.recv(BANNER_SIZE)
+        except socket.timeout:
+            pass
+        sock.sendall(HTTP_PROBE)
+        return sock.recv(BANNER_SIZE)
+    except OSError:
+        return b""
+    finally:
+        sock.close()
+
+
+class BannerGrabber:
+    """
+    并发横幅抓取器
+
+    扫描过程中每发现一个开放端口就调用 submit，抓取在后台线程中进行，
+    扫描结束后调用 services 取得识别结果，此时大部分抓取已经完成。
+
+    用法::
+
+        with BannerGrabber() as grabber:
+            for result in results:
+                grabber.submit(result.host, result.port)
+            grabber.services(host, open_ports)  # 端口 -> 服务名称
+    """
+
+    def __init__(self, timeout=DEFAULT_BANNER_TIMEOUT, max_workers=DEFAULT_BANNER_WORKERS):
+        """
+        初始化抓取器
+
+        Args:
+            timeout (float): 单个端口读取横幅的时限（秒）
+            max_workers (int): 最大线程数
+        """
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}  # (主机, 端口) -> Future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, host, port):
+        """
+        提交一个端口的横幅抓取，重复提交会被忽略
+
+        Args:
+            host (str): IP地址
+            port (int): 端口
+        """
+        key = (host, port)
+        if key not in self._futures:
+            self._futures[key] = self._executor.submit(grab_banner, host, port, self.timeout)
+
+    def banner(self, host, port):
+        """
+        等待并返回一个端口的横幅，未提交的端口会先提交
+
+        Args:
+            host (str): IP地址
+            port (int): 端口
+
+        Returns:
+            bytes: 横幅
+        """
+        self.submit(host, port)
+        return self._futures[(host, port)].result()
+
+    def services(self, host, ports):
+        """
+        等待抓取完成并识别每个端口的服务
+
+        Args:
+            host (str): IP地址
+            ports (iterable): 开放端口
+
+        Returns:
+            dict: 端口 -> 服务名称
+        """
+        ports = list(ports)
+        for port in ports:
+            self.submit(host, port)
+        return {port: identify_service(port, self.banner(host, port)) for port in ports}
+
+    def close(self):
+        """取消尚未开始的抓取并关闭线程池"""
+        for future in self._futures.values():
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+端口扫描后端性能测试
+在本机搭建一组模拟服务器（开放、关闭、丢弃SYN、延迟响应的端口），
+分别用各个扫描后端扫描，报告每秒端口数、连接耗时的p50/p99和结果准确率，
+不需要访问外部网络，可作为扫描速度的回归检查
+"""
+
+import argparse
+import heapq
+import json
+import selectors
+import socket
+import sys
+import threading
+import time
+
+import scan_engine
+from scan_engine import OPEN, CLOSED, FILTERED, BACKENDS, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+from timing import make_timing
+from rate_limit import RateLimiter
+from scan_stats import ScanStats
+
+# 延迟端口在延迟结束后发送的数据
+DELAYED_BANNER = b"SSH-2.0-OpenSSH_8.9p1\r\n"
+
+
+class ServerFarm:
+    """
+    本机模拟服务器集合
+
+    - open: 正常监听的端口，后台线程接受连接后立即关闭
+    - closed: 只绑定不监听的端口，保证连接被拒绝（RST）
+    - blackholed: backlog为0且已被占满的监听端口，Linux内核会直接丢弃新的SYN，
+      效果等同于被防火墙过滤
+    - delayed: 本地代理端口，接受连接后等待 delay 秒才发送数据再关闭。
+      握手由内核完成，不需要root权限就无法推迟握手本身，
+      因此这类端口对连接扫描表现为开放，延迟体现在应用层响应上
+
+    用法::
+
+        with ServerFarm(open_count=10, closed_count=1000) as farm:
+            farm.expected  # 端口 -> 期望状态
+    """
+
+    def __init__(self, open_count=10, closed_count=1000, blackholed_count=5,
+                 delayed_count=5, delay=0.2, host="127.0.0.1"):
+        """
+        初始化模拟服务器集合
+
+        Args:
+            open_count (int): 开放端口数量
+            closed_count (int): 关闭端口数量
+            blackholed_count (int): 丢弃SYN的端口数量
+            delayed_count (int): 延迟响应的端口数量
+            delay (float): 延迟端口的响应延迟（秒）
+            host (str): 绑定地址
+        """
+        self.host = host
+        self.delay = delay
+        self.counts = (open_count, closed_count, blackholed_count, delayed_count)
+        self.expected = {}
+        self._sockets = []
+        self._accepting = {}  # 监听套接字 -> 是否为延迟端口
+        self._selector = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((self.host, 0))
+        self._sockets.append(sock)
+        return sock, sock.getsockname()[1]
+
+    def start(self):
+        """创建所有端口并启动后台接受线程"""
+        open_count, closed_count, blackholed_count, delayed_count = self.counts
+        for _ in range(open_count):
+            sock, port = self._bind()
+            sock.listen(128)
+            self._accepting[sock] = False
+            self.expected[port] = OPEN
+        for _ in range(delayed_count):
+            sock, port = self._bind()
+            sock.listen(128)
+            self._accepting[sock] = True
+            self.expected[port] = OPEN
+        for _ in range(closed_count):
+            _, port = self._bind()
+            self.expected[port] = CLOSED
+        for _ in range(blackholed_count):
+            sock, port = self._bind()
+            sock.listen(0)
+            for _ in range(3):
+                filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                filler.setblocking(False)
+                filler.connect_ex((self.host, port))
+                self._sockets.append(filler)
+            self.expected[port] = FILTERED
+
+        self._selector = selectors.DefaultSelector()
+        for sock in self._accepting:
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        # 等待丢弃SYN的端口的队列被占满
+        time.sleep(0.05)
+
+    def _serve(self):
+        """接受连接；延迟端口的连接在延迟结束后发送数据并关闭"""
+        pending = []  # (到期时间, 序号, 连接)
+        seq = 0
+        while not self._stop.is_set():
+            wait = 0.05
+            if pending:
+                wait = max(0.0, min(wait, pending[0][0] - time.monotonic()))
+            for key, _ in self._selector.select(wait):
+                while True:
+                    try:
+                        conn, _ = key.fileobj.accept()
+                    except (BlockingIOError, OSError):
+                        break
+                    if self._accepting[key.fileobj]:
+                        seq += 1
+                        heapq.heappush(pending, (time.monotonic() + self.delay, seq, conn))
+                    else:
+                        conn.close()
+            now = time.monotonic()
+            while pending and pending[0][0] <= now:
+                _, _, conn = heapq.heappop(pending)
+                try:
+                    conn.sendall(DELAYED_BANNER)
+                except OSError:
+                    pass
+                conn.close()
+        for _, _, conn in pending:
+            conn.close()
+
+    def stop(self):
+        """停止后台线程并关闭所有端口"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._selector is not None:
+            self._selector.close()
+        for sock in self._sockets:
+            sock.close()
+        self._sockets = []
+
+
+def benchmark_backend(backend, host, ports, concurrency=DEFAULT_CONCURRENCY,
+                      timeout=DEFAULT_TIMEOUT, timing=None, expected=None, rate=None):
+    """
+    用指定后端扫描一组端口并统计性能和准确率
+
+    Args:
+        backend (str): 扫描后端
+        host (str): 目标IP地址
+        ports (list): 待扫描端口列表
+        concurrency (int): 最大并发连接数
+        timeout (float): 单个连接的超时时间（秒）
+        timing (str): 自适应时序配置，默认为None
+        expected (dict): 端口 -> 期望状态，提供时计算准确率
+        rate (float): 每秒最多发起的连接数，提供时报告实际速率
+
+    Returns:
+        dict: 后端名、耗时、每秒端口数、连接耗时分位数（来自 ScanStats 的直方图估算）、开放端口列表、
+            在途连接数峰值、各错误码次数和准确率
+    """
+    limiter = RateLimiter(rate) if rate else None
+    stats = ScanStats()
+    probes = ((host, port) for port in ports)
+    states = {}
+    start = time.perf_counter()
+    for result in scan_engine.scan(probes, backend, concurrency, timeout,
+                                   make_timing(timing, timeout, limiter), stats):
+        states[result.port] = result.state
+    elapsed = time.perf_counter() - start
+    # 只统计得到明确响应（开放或拒绝）的连接，超时的连接耗时等于超时时间，没有参考意义
+    latency = stats.combined_latency((OPEN, CLOSED))
+
+    report = {
+        "backend": backend,
+        "ports": len(ports),
+        "elapsed": elapsed,
+        "ports_per_sec": len(ports) / elapsed if elapsed else float("inf"),
+        "p50_ms": latency.percentile(0.50) * 1000,
+        "p99_ms": latency.percentile(0.99) * 1000,
+        "open_ports": sorted(port for port, state in states.items() if state == OPEN),
+        "max_in_flight": stats.max_in_flight,
+        "errors": dict(stats.errors),
+    }
+    if limiter is not None:
+        report["rate_cap"] = rate
+        report["achieved_rate"] = limiter.achieved_rate()
+    if expected is not None:
+        wrong = sorted(port for port, state in expected.items() if states.get(port) != state)
+        report["accuracy"] = 1 - len(wrong) / len(expected) if expected else 1.0
+        report["mismatched_ports"] = wrong
+    return report
+
+
+def _raise_fd_limit():
+    """尽量提高打开文件数上限，模拟服务器和高并发扫描都需要大量文件描述符"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="在本机模拟服务器上测试各端口扫描后端的速度和准确率")
+    parser.add_argument("--open", type=int, default=20, help="开放端口数量")
+    parser.add_argument("--closed", type=int, default=2000, help="关闭端口数量")
+    parser.add_argument("--blackholed", type=int, default=10, help="丢弃SYN的端口数量")
+    parser.add_argument("--delayed", type=int, default=10, help="延迟响应的端口数量")
+    parser.add_argument("--delay", type=float, default=0.2, help="延迟端口的响应延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--timing", default=None, help="自适应时序配置，如 aggressive")
+    parser.add_argument("--rate", type=float, default=None, help="每秒最多发起的连接数")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    parser.add_argument("--min-ports-per-sec", type=float, default=None,
+                        help="任一后端低于该速度时以非零状态退出")
+    parser.add_argument("--min-accuracy", type=float, default=None,
+                        help="任一后端准确率低于该值时以非零状态退出")
+    args = parser.parse_args()
+
+    _raise_fd_limit()
+    reports = []
+    with ServerFarm(args.open, args.closed, args.blackholed, args.delayed, args.delay) as farm:
+        ports = sorted(farm.expected)
+        for backend in args.backends:
+            reports.append(benchmark_backend(backend, farm.host, ports, args.concurrency,
+                                             args.timeout, args.timing, farm.expected,
+                                             args.rate))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print(f"扫描 {len(ports)} 个本机端口（开放 {args.open}，关闭 {args.closed}，"
+              f"丢弃 {args.blackholed}，延迟 {args.delayed}）")
+        print(f"{'BACKEND':<12} {'SECONDS':>9} {'PORTS/SEC':>10} {'P50 MS':>8} "
+              f"{'P99 MS':>8} {'ACCURACY':>9}")
+        for report in reports:
+            print(f"{report['backend']:<12} {report['elapsed']:>9.3f} "
+                  f"{report['ports_per_sec']:>10.0f} {report['p50_ms']:>8.3f} "
+                  f"{report['p99_ms']:>8.3f} {report['accuracy']:>9.2%}")
+
+    failed = False
+    for report in reports:
+        if args.min_ports_per_sec is not None and report["ports_per_sec"] < args.min_ports_per_sec:
+            print(f"{report['backend']}: {report['ports_per_sec']:.0f} ports/sec "
+                  f"< {args.min_ports_per_sec}", file=sys.stderr)
+            failed = True
+        if args.min_accuracy is not None and report["accuracy"] < args.min_accuracy:
+            print(f"{report['backend']}: accuracy {report['accuracy']:.2%} "
+                  f"< {args.min_accuracy:.2%}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,53 @@
-# 常见端口和服务名称的字典
+# 常见端口和服务名称的字典，按开放频率从高到低排列（参考 nmap-services 的统计频率）
 ports_and_services = {
-    20: "ftp-data",
+    80: "http",
+    23: "telnet",
+    443: "https",
     21: "ftp",
     22: "ssh",
-    23: "telnet",
     25: "smtp",
-    53: "domain",
-    67: "dhcps",
-    68: "dhcpc",
-    69: "tftp",
-    80: "http",
+    3389: "ms-wbt-server",
     110: "pop3",
-    119: "nntp",
-    123: "ntp",
-    135: "msrpc",
-    137: "netbios-ns",
-    138: "netbios-dgm",
+    445: "microsoft-ds",
     139: "netbios-ssn",
     143: "imap",
-    161: "snmp",
-    162: "snmptrap",
-    389: "ldap",
-    443: "https",
-    445: "microsoft-ds",
+    53: "domain",
+    135: "msrpc",
+    3306: "mysql",
+    8080: "http-proxy",
+    1723: "pptp",
+    995: "pop3s",
+    993: "imaps",
+    5900: "vnc",
+    587: "submission",
     465: "smtps",
     514: "syslog",
+    8443: "https-alt",
+    1433: "ms-sql-s",
     515: "printer",
-    520: "rip",
-    587: "submission",
     631: "ipp",
-    636: "ldaps",
-    993: "imaps",
-    995: "pop3s",
-    1080: "socks",
-    1433: "ms-sql-s",
-    1434: "ms-sql-m",
-    1521: "oracle",
-    1723: "pptp",
-    3306: "mysql",
-    3389: "ms-wbt-server",
+    389: "ldap",
     5432: "postgresql",
-    5900: "vnc",
+    1521: "oracle",
     6379: "redis",
-    8080: "http-proxy",
-    8443: "https-alt",
+    27017: "mongodb",
+    1080: "socks",
+    636: "ldaps",
+    119: "nntp",
     9000: "cslistener",
-    27017: "mongodb"
+    20: "ftp-data",
+    1434: "ms-sql-m",
+    123: "ntp",
+    161: "snmp",
+    137: "netbios-ns",
+    138: "netbios-dgm",
+    162: "snmptrap",
+    69: "tftp",
+    67: "dhcps",
+    68: "dhcpc",
+    520: "rip"
 }
+
+# 按开放频率从高到低排序的常见端口，与 ports_and_services 的顺序一致，
+# 用于 "topN" 端口规格和优先扫描最可能开放的端口；N 不能超过其长度
+ranked_ports = list(ports_and_services)
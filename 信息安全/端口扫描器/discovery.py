@@ -0,0 +1,42 @@
+"""
+主机发现
+扫描网段之前，先用少数几个最常开放的端口探测每个主机，
+只对有响应的主机扫描完整的端口范围，避免在不存在的地址上逐个端口等待超时
+"""
+
+import scan_engine
+from scan_engine import OPEN, CLOSED, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+
+# 用于主机发现的端口，按开放的可能性排列
+DISCOVERY_PORTS = (80, 443, 22)
+
+
+def discover_hosts(hosts, ports=DISCOVERY_PORTS, backend="asyncio",
+                   concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, timing=None,
+                   stats=None):
+    """
+    并发探测主机是否在线
+
+    连接成功（端口开放）或被拒绝（收到RST，端口关闭）都说明主机在线；
+    只有超时或其他错误的主机视为不在线。一个主机被确认在线后不再探测它的其余端口。
+
+    Args:
+        hosts (iterable): 主机地址
+        ports (iterable): 探测的端口，默认为 80、443、22
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        concurrency (int): 最大并发连接数
+        timeout (float): 单个连接的超时时间（秒），指定 timing 时忽略
+        timing: 时序控制器，默认为固定超时；与后续完整扫描共用时，
+            主机发现阶段测得的RTT可以直接用于完整扫描
+        stats (ScanStats): 提供时记录扫描统计
+
+    Returns:
+        dict: 在线主机 -> {端口: 状态}，只包含已得到开放或关闭结果的端口
+    """
+    hosts = list(hosts)
+    alive = {}
+    probes = ((host, port) for port in ports for host in hosts if host not in alive)
+    for result in scan_engine.scan(probes, backend, concurrency, timeout, timing, stats):
+        if result.state in (OPEN, CLOSED):
+            alive.setdefault(result.host, {})[result.port] = result.state
+    return alive
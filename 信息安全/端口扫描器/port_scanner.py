@@ -1,59 +1,614 @@
+import asyncio
+import io
+import ipaddress
+import itertools
 import socket
 import re
+from collections import namedtuple
 from common_ports import ports_and_services
+import scan_engine
+from scan_engine import OPEN, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+from targets import IntervalSet, parse_targets, format_address
+from timing import make_timing
+from resolver import default_resolver
+from port_spec import PortSet
+from scan_journal import ScanJournal
+from banner import BannerGrabber
+from discovery import discover_hosts
+from results_store import ResultStore
 
-def get_open_ports(target, port_range, verbose=False):
+def get_open_ports(target, port_range, verbose=False, concurrency=DEFAULT_CONCURRENCY,
+                   timeout=DEFAULT_TIMEOUT, backend="asyncio", timing=None,
+                   stop_after=None, resume=None, banners=False,
+                   rate=None, host_rate=None, stats=None):
     """
     扫描指定目标主机的端口范围，返回开放端口列表或详细描述
-    
+
+    默认使用asyncio并发扫描，同时保持最多 concurrency 个连接在途。
+    如果调用方已经处于运行中的事件循环内，请改用 async_get_open_ports。
+
     Args:
-        target (str): 目标主机，可以是URL或IP地址
-        port_range (list): 端口范围，包含起始和结束端口
+        target (str): 目标主机，可以是URL、IPv4地址或IPv6地址
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
         verbose (bool): 是否返回详细模式，默认为False
-    
+        concurrency (int): 最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，可选 "polite"、"normal"、"aggressive"、"insane"；
+            默认为None，即所有端口使用固定的 timeout
+        stop_after (int): 找到这么多个开放端口后提前结束扫描，默认为None（扫描全部端口）
+        resume (str): 扫描进度日志的路径。扫描过程中定期把进度写入该文件，
+            中断后用同一路径再次调用会跳过已探测的端口；扫描完成后删除日志。
+            默认为None，不记录进度
+        banners (bool): 详细模式下是否读取开放端口的横幅来识别服务，默认为False，
+            即只按常见端口字典标注服务；横幅抓取与连接扫描同时进行
+        rate (float or RateLimiter): 全局每秒最多发起的连接数（包括重试），
+            或在多次扫描间共享的 rate_limit.RateLimiter；默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        stats (ScanStats): 提供时记录连接耗时分布、各错误码次数、在途连接数峰值和总耗时，
+            见 scan_stats.ScanStats
+
     Returns:
         list or str: 开放端口列表或详细描述字符串
+
+    Raises:
+        IndexError: 端口范围列表少于两个元素
+        ValueError: 端口规格格式错误
     """
+    ports = PortSet.from_range(port_range)
     try:
-        # 验证IP地址格式
-        if is_valid_ip(target):
-            ip_address = target
-            hostname = target
-        else:
-            # 尝试解析URL
+        hostname, ip_address, error = _resolve_target(target)
+        if error:
+            return error
+
+        journal = ScanJournal(resume) if resume else None
+        probes = _port_probes(ip_address, ports)
+        previous = []
+        if journal is not None:
+            previous = journal.open_ports(ip_address, ports)
+            probes = journal.pending(probes)
+            if stop_after is not None:
+                if len(previous) >= stop_after:
+                    probes = iter(())
+                stop_after -= len(previous)
+
+        grabber = BannerGrabber() if banners and verbose else None
+        try:
             try:
-                ip_address = socket.gethostbyname(target)
-                hostname = target
-            except socket.gaierror:
-                return "Error: Invalid hostname"
-        
-        # 验证IP地址是否有效
-        if not is_valid_ip(ip_address):
-            return "Error: Invalid IP address"
-        
-        # 扫描端口
-        open_ports = []
-        start_port, end_port = port_range[0], port_range[1]
-        
-        for port in range(start_port, end_port + 1):
+                results = scan_engine.scan(probes, backend, concurrency, timeout,
+                                           make_timing(timing, timeout, rate, host_rate), stats)
+                if journal is not None:
+                    results = journal.record(results)
+                open_ports = _collect_open_ports(results, stop_after, grabber)
+            finally:
+                # 无论正常结束、出错还是被Ctrl-C中断，都把最新进度写入磁盘
+                if journal is not None:
+                    journal.flush()
+            if journal is not None:
+                open_ports = sorted(previous + open_ports)
+                journal.finish()
+
+            if verbose:
+                services = None
+                if grabber is not None:
+                    services = grabber.services(ip_address, open_ports)
+                return format_verbose_output(hostname, ip_address, open_ports, services)
+            else:
+                return open_ports
+        finally:
+            if grabber is not None:
+                grabber.close()
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def async_get_open_ports(target, port_range, verbose=False, concurrency=DEFAULT_CONCURRENCY,
+                               timeout=DEFAULT_TIMEOUT, backend="asyncio", timing=None,
+                               stop_after=None, banners=False,
+                               rate=None, host_rate=None, stats=None):
+    """
+    get_open_ports 的异步版本，参数和返回值与其相同
+
+    Args:
+        target (str): 目标主机，可以是URL、IPv4地址或IPv6地址
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
+        verbose (bool): 是否返回详细模式，默认为False
+        concurrency (int): 最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，可选 "polite"、"normal"、"aggressive"、"insane"；
+            默认为None，即所有端口使用固定的 timeout
+        stop_after (int): 找到这么多个开放端口后提前结束扫描，默认为None（扫描全部端口）
+        banners (bool): 详细模式下是否读取横幅来识别服务，默认为False
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        stats (ScanStats): 提供时记录扫描统计
+
+    Returns:
+        list or str: 开放端口列表或详细描述字符串
+    """
+    ports = PortSet.from_range(port_range)
+    try:
+        # 域名解析是阻塞调用，放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        hostname, ip_address, error = await loop.run_in_executor(None, _resolve_target, target)
+        if error:
+            return error
+
+        probes = _port_probes(ip_address, ports)
+        timing = make_timing(timing, timeout, rate, host_rate)
+        grabber = BannerGrabber() if banners and verbose else None
+        try:
+            if backend == "asyncio":
+                open_ports = []
+                results = scan_engine.scan_asyncio(probes, concurrency, timeout, timing, stats)
+                try:
+                    async for result in results:
+                        if result.state == OPEN:
+                            open_ports.append(result.port)
+                            if grabber is not None:
+                                grabber.submit(result.host, result.port)
+                            if stop_after is not None and len(open_ports) >= stop_after:
+                                break
+                finally:
+                    await results.aclose()
+                open_ports.sort()
+            else:
+                # 同步后端同样放到线程池中运行
+                results = scan_engine.scan(probes, backend, concurrency, timeout, timing, stats)
+                open_ports = await loop.run_in_executor(None, _collect_open_ports, results,
+                                                        stop_after, grabber)
+
+            if verbose:
+                services = None
+                if grabber is not None:
+                    services = await loop.run_in_executor(None, grabber.services,
+                                                          ip_address, open_ports)
+                return format_verbose_output(hostname, ip_address, open_ports, services)
+            else:
+                return open_ports
+        finally:
+            if grabber is not None:
+                grabber.close()
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def get_open_ports_many(targets, port_range, verbose=False, concurrency=DEFAULT_CONCURRENCY,
+                        timeout=DEFAULT_TIMEOUT, backend="asyncio", timing=None,
+                        stop_after=None, resume=None, banners=False,
+                        rate=None, host_rate=None, discover=False, stats=None):
+    """
+    一次扫描多个目标主机，所有主机共享同一个并发预算
+
+    目标先被展开为去重后的地址区间集合，然后按 "端口优先" 的顺序交错生成
+    (主机, 端口) 任务，一个 /24 网段只需一趟扫描即可完成。
+
+    Args:
+        targets (str or list): 目标列表，支持IP地址、主机名、CIDR网段
+            （如 "10.0.0.0/24"）和地址范围（如 "10.0.0.1-20"）；
+            主机名在线程池中并发解析，IPv6地址只能作为单个主机指定
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
+        verbose (bool): 是否返回详细模式，默认为False
+        concurrency (int): 所有主机共享的最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，可选 "polite"、"normal"、"aggressive"、"insane"；
+            默认为None，即所有端口使用固定的 timeout
+        stop_after (int): 每个主机找到这么多个开放端口后不再扫描该主机，默认为None
+        resume (str): 扫描进度日志的路径，含义与 get_open_ports 相同，
+            日志中按IP地址记录每个主机的进度
+        banners (bool): 详细模式下是否读取横幅来识别服务，默认为False
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        discover (bool): 是否先探测 80、443、22 端口确认主机在线，
+            只对连接成功或被拒绝的主机扫描完整端口范围，默认为False
+        stats (ScanStats): 提供时记录扫描统计（包括主机发现阶段）
+
+    Returns:
+        dict or str: 主机 -> 开放端口列表（详细模式下为详细描述字符串）的映射；
+            主机名解析失败时对应的值为错误信息；目标格式错误时返回错误信息
+    """
+    ports = PortSet.from_range(port_range)
+    try:
+        expanded = _expand_targets(targets)
+        scan_set, ipv6_names = expanded.scan_set, expanded.ipv6_names
+
+        # 已经找到足够多开放端口的主机不再生成新的任务
+        satisfied = set()
+        open_ports = {}
+        journal = ScanJournal(resume) if resume else None
+        if journal is not None:
+            for host in journal.hosts():
+                host_ports = journal.open_ports(host, ports)
+                if host_ports:
+                    open_ports[host] = host_ports
+                    if stop_after is not None and len(host_ports) >= stop_after:
+                        satisfied.add(host)
+
+        def scan_hosts():
+            return itertools.chain(map(format_address, scan_set), ipv6_names)
+
+        # 主机发现与完整扫描共用时序控制器，完整扫描可以沿用发现阶段测得的RTT
+        timing = make_timing(timing, timeout, rate, host_rate)
+        hosts = None  # None 表示扫描全部主机
+        discovered = {}
+        if discover:
+            discovered = discover_hosts(scan_hosts(), backend=backend, concurrency=concurrency,
+                                        timeout=timeout, timing=timing, stats=stats)
+            hosts = [host for host in scan_hosts() if host in discovered]
+            for host in hosts:
+                for port, state in discovered[host].items():
+                    if state == OPEN and port in ports and host not in satisfied:
+                        host_ports = open_ports.setdefault(host, [])
+                        if port not in host_ports:
+                            host_ports.append(port)
+                        if stop_after is not None and len(host_ports) >= stop_after:
+                            satisfied.add(host)
+
+        # 发现阶段已经得到结果的端口不再重复探测
+        probes = ((host, port) for port in ports.scan_order()
+                  for host in (scan_hosts() if hosts is None else hosts)
+                  if host not in satisfied and port not in discovered.get(host, ()))
+        if journal is not None:
+            probes = journal.pending(probes)
+
+        grabber = BannerGrabber() if banners and verbose else None
+        try:
+            results = scan_engine.scan(probes, backend, concurrency, timeout, timing, stats)
+            if journal is not None:
+                results = journal.record(results)
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(1)  # 设置超时时间为1秒
-                result = sock.connect_ex((ip_address, port))
-                if result == 0:
-                    open_ports.append(port)
-                sock.close()
-            except:
-                pass
-        
-        if verbose:
-            return format_verbose_output(hostname, ip_address, open_ports)
-        else:
-            return open_ports
-            
+                for result in results:
+                    if result.state == OPEN and result.host not in satisfied:
+                        host_ports = open_ports.setdefault(result.host, [])
+                        host_ports.append(result.port)
+                        if grabber is not None:
+                            grabber.submit(result.host, result.port)
+                        if stop_after is not None and len(host_ports) >= stop_after:
+                            satisfied.add(result.host)
+            finally:
+                if journal is not None:
+                    journal.flush()
+            if journal is not None:
+                journal.finish()
+
+            def host_output(hostname, ip_address, host_ports):
+                if not verbose:
+                    return list(host_ports)
+                services = None
+                if grabber is not None:
+                    services = grabber.services(ip_address, host_ports)
+                return format_verbose_output(hostname, ip_address, host_ports, services)
+
+            results = {}
+            for hostname, ip_address in _label_hosts(expanded):
+                host_ports = sorted(open_ports.get(ip_address, []))
+                results[hostname] = host_output(hostname, ip_address, host_ports)
+            results.update(expanded.errors)
+            return results
+        finally:
+            if grabber is not None:
+                grabber.close()
+
     except Exception as e:
         return f"Error: {str(e)}"
 
+def rescan(targets, port_range, store, sample=1.0, concurrency=DEFAULT_CONCURRENCY,
+           timeout=DEFAULT_TIMEOUT, backend="asyncio", timing=None, rate=None, host_rate=None,
+           stats=None):
+    """
+    根据上次的扫描结果增量重扫，并报告开放端口的变化
+
+    - 先探测上次开放的端口（它们最可能发生变化）
+    - 从未扫描过的端口全部探测
+    - 上次关闭的端口每次只抽查 sample 比例，抽查的端口逐次轮换，
+      每 1/sample 次扫描覆盖全部历史上关闭的端口
+    没有被抽查的端口沿用上次的结果，因此每次扫描的开销与变化的多少成正比，而不是与端口范围成正比。
+
+    Args:
+        targets (str or list): 目标列表，格式与 get_open_ports_many 相同
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
+        store (str or ResultStore): 结果存储文件的路径或已打开的结果存储，扫描后写回
+        sample (float): 每次抽查的历史上关闭端口的比例，取值 (0, 1]，默认为1（全部重扫）
+        concurrency (int): 所有主机共享的最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，默认为None
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        stats (ScanStats): 提供时记录扫描统计
+
+    Returns:
+        dict or str: 主机 -> {"open": 当前开放端口, "opened": 新开放的端口,
+            "closed": 不再开放的端口, "probed": 本次探测的端口数}；
+            主机名解析失败时对应的值为错误信息；目标格式错误时返回错误信息
+
+    Raises:
+        IndexError: 端口范围列表少于两个元素
+        ValueError: 端口规格格式错误或 sample 超出范围
+    """
+    ports = PortSet.from_range(port_range)
+    if not 0 < sample <= 1:
+        raise ValueError(f"Invalid sample fraction: {sample}")
+    stride = max(1, round(1 / sample))
+    try:
+        expanded = _expand_targets(targets)
+        if not isinstance(store, ResultStore):
+            store = ResultStore(store)
+
+        def scan_hosts():
+            return itertools.chain(map(format_address, expanded.scan_set), expanded.ipv6_names)
+
+        def probes():
+            for host in scan_hosts():
+                record = store.get(host)
+                if record is not None:
+                    for port in record.open:
+                        if port in ports:
+                            yield host, port
+            for port in ports.scan_order():
+                for host in scan_hosts():
+                    record = store.get(host)
+                    if record is None or port not in record.scanned:
+                        yield host, port
+                    elif port not in record.open and (port + record.runs) % stride == 0:
+                        yield host, port
+
+        probed = {}
+        open_ports = {}
+        for result in scan_engine.scan(probes(), backend, concurrency, timeout,
+                                       make_timing(timing, timeout, rate, host_rate), stats):
+            probed.setdefault(result.host, []).append(result.port)
+            if result.state == OPEN:
+                open_ports.setdefault(result.host, []).append(result.port)
+
+        summaries = {}
+        for host in scan_hosts():
+            host_probed = probed.get(host, [])
+            opened, closed = store.update(host, host_probed, open_ports.get(host, []))
+            summaries[host] = {
+                "open": [port for port in store.get(host).open if port in ports],
+                "opened": opened,
+                "closed": closed,
+                "probed": len(host_probed),
+            }
+        store.save()
+
+        results = {}
+        for hostname, ip_address in _label_hosts(expanded):
+            results[hostname] = dict(summaries[ip_address])
+        results.update(expanded.errors)
+        return results
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def iter_open_ports(target, port_range, concurrency=DEFAULT_CONCURRENCY,
+                    timeout=DEFAULT_TIMEOUT, backend="selectors", timing=None,
+                    rate=None, host_rate=None, stats=None):
+    """
+    边扫描边产出开放端口，每确认一个开放端口立即产出
+
+    端口按确认的先后顺序产出，而不是按端口号排序；内存占用与端口范围大小无关。
+    默认使用 selectors 后端，它本身就是同步生成器，不需要事件循环。
+
+    Args:
+        target (str): 目标主机，可以是URL或IP地址
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
+        concurrency (int): 最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，默认为None
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        stats (ScanStats): 提供时记录扫描统计
+
+    Yields:
+        tuple: (端口, 服务名称, 连接耗时秒数)
+
+    Raises:
+        ValueError: 主机名或IP地址无效时抛出，异常信息与 get_open_ports 返回的错误信息相同；
+            端口规格格式错误时同样抛出
+    """
+    ports = PortSet.from_range(port_range)
+    _, ip_address, error = _resolve_target(target)
+    if error:
+        raise ValueError(error)
+    yield from _iter_open_ports(ip_address, ports, concurrency, timeout, backend, timing,
+                                rate, host_rate, stats)
+
+def stream_verbose_output(target, port_range, fp, concurrency=DEFAULT_CONCURRENCY,
+                          timeout=DEFAULT_TIMEOUT, backend="selectors", timing=None,
+                          rate=None, host_rate=None, stats=None):
+    """
+    扫描并把详细输出逐行写入文件对象，每确认一个开放端口就写出一行
+
+    Args:
+        target (str): 目标主机，可以是URL或IP地址
+        port_range (list or str): 端口范围，包含起始和结束端口的列表，
+            或端口规格字符串（如 "1-1024,3306,top20"）
+        fp: 可写的文件对象
+        concurrency (int): 最大并发连接数，默认为500
+        timeout (float): 单个端口的连接超时时间（秒），默认为1
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        timing (str): 自适应时序配置，默认为None
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+        stats (ScanStats): 提供时记录扫描统计
+
+    Returns:
+        str: 出错时返回错误信息，否则返回None
+    """
+    ports = PortSet.from_range(port_range)
+    try:
+        hostname, ip_address, error = _resolve_target(target)
+        if error:
+            return error
+        open_ports = (port for port, _, _ in _iter_open_ports(
+            ip_address, ports, concurrency, timeout, backend, timing, rate, host_rate, stats))
+        write_verbose_output(hostname, ip_address, open_ports, fp)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def _iter_open_ports(ip_address, ports, concurrency, timeout, backend, timing,
+                     rate=None, host_rate=None, stats=None):
+    """
+    扫描已解析的IP地址，逐个产出开放端口
+
+    Yields:
+        tuple: (端口, 服务名称, 连接耗时秒数)
+    """
+    results = scan_engine.scan(_port_probes(ip_address, ports), backend, concurrency, timeout,
+                               make_timing(timing, timeout, rate, host_rate), stats)
+    for result in results:
+        if result.state == OPEN:
+            yield result.port, ports_and_services.get(result.port, "unknown"), result.latency
+
+_ExpandedTargets = namedtuple("_ExpandedTargets",
+                              ["addresses", "scan_set", "names", "ipv6_names", "errors"])
+
+def _expand_targets(targets):
+    """
+    展开目标列表并并发解析其中的主机名
+
+    Args:
+        targets (str or list): 目标列表
+
+    Returns:
+        _ExpandedTargets: 直接指定的IPv4地址集合、待扫描的IPv4地址集合（含主机名解析结果）、
+            地址 -> 主机名列表、IPv6地址 -> 主机名列表、主机名 -> 错误信息
+    """
+    addresses, hostnames = parse_targets(targets)
+
+    # IPv4结果同样并入地址集合以便去重
+    names = {}
+    errors = {}
+    ipv6_names = {}
+    scan_set = IntervalSet()
+    for start, end in addresses.intervals():
+        scan_set.add(start, end)
+    for name, resolved in default_resolver.resolve_many(hostnames).items():
+        if isinstance(resolved, Exception):
+            errors[name] = "Error: Invalid hostname"
+            continue
+        ip_address = resolved[0]
+        if ":" in ip_address:
+            ipv6_names.setdefault(ip_address, []).append(name)
+            continue
+        address = int(ipaddress.IPv4Address(ip_address))
+        names.setdefault(address, []).append(name)
+        scan_set.add(address)
+    return _ExpandedTargets(addresses, scan_set, names, ipv6_names, errors)
+
+def _label_hosts(expanded):
+    """
+    按目标中出现的名称产出每个结果条目
+
+    Args:
+        expanded (_ExpandedTargets): 展开后的目标
+
+    Yields:
+        tuple: (结果中使用的名称, IP地址)，直接指定的IP地址以自身为名称
+    """
+    for address in expanded.scan_set:
+        ip_address = format_address(address)
+        if address in expanded.addresses:
+            yield ip_address, ip_address
+        for hostname in expanded.names.get(address, []):
+            yield hostname, ip_address
+    for ip_address, hostnames in expanded.ipv6_names.items():
+        for hostname in hostnames:
+            yield hostname, ip_address
+
+def _resolve_target(target):
+    """
+    解析扫描目标，主机名通过带缓存的解析器解析
+
+    Args:
+        target (str): 目标主机，可以是URL、IPv4地址或IPv6地址
+
+    Returns:
+        tuple: (主机名, IP地址, 错误信息)，解析成功时错误信息为None
+    """
+    # 验证IP地址格式
+    if is_valid_ip(target):
+        return target, target, None
+    ipv6_address = _parse_ipv6(target)
+    if ipv6_address is not None:
+        return target, ipv6_address, None
+
+    # 形如IPv4地址但数值无效
+    if re.match(r'^[\d.]+$', target):
+        return target, None, "Error: Invalid IP address"
+
+    # 尝试解析URL
+    try:
+        ip_address = default_resolver.resolve_one(target)
+    except socket.gaierror:
+        return target, None, "Error: Invalid hostname"
+
+    return target, ip_address, None
+
+def _parse_ipv6(target):
+    """
+    如果目标是IPv6地址（可带方括号）则返回规范化后的地址，否则返回None
+
+    Args:
+        target (str): 目标主机
+
+    Returns:
+        str: 规范化后的IPv6地址，或None
+    """
+    try:
+        return str(ipaddress.IPv6Address(target.strip("[]")))
+    except ValueError:
+        return None
+
+def _port_probes(ip_address, ports):
+    """
+    按开放可能性从高到低生成待扫描的 (IP地址, 端口) 序列
+
+    Args:
+        ip_address (str): 目标IP地址
+        ports (PortSet): 待扫描端口集合
+
+    Yields:
+        tuple: (IP地址, 端口)
+    """
+    for port in ports.scan_order():
+        yield ip_address, port
+
+def _collect_open_ports(results, stop_after=None, grabber=None):
+    """
+    从探测结果中收集开放端口
+
+    Args:
+        results (iterable): ProbeResult 迭代器
+        stop_after (int): 收集到这么多个开放端口后停止迭代，默认为None
+        grabber (BannerGrabber): 提供时，每发现一个开放端口立即提交横幅抓取
+
+    Returns:
+        list: 排序后的开放端口列表（并发后端按完成顺序产出结果）
+    """
+    open_ports = []
+    for result in results:
+        if result.state == OPEN:
+            open_ports.append(result.port)
+            if grabber is not None:
+                grabber.submit(result.host, result.port)
+            if stop_after is not None and len(open_ports) >= stop_after:
+                break
+    if hasattr(results, "close"):
+        # 提前停止时关闭生成器，释放仍在途的连接
+        results.close()
+    return sorted(open_ports)
+
 def is_valid_ip(ip):
     """
     验证IP地址格式是否有效
@@ -77,7 +632,7 @@ def is_valid_ip(ip):
     
     return True
 
-def format_verbose_output(hostname, ip_address, open_ports):
+def format_verbose_output(hostname, ip_address, open_ports, services=None):
     """
     格式化详细输出
     
@@ -85,18 +640,46 @@ def format_verbose_output(hostname, ip_address, open_ports):
         hostname (str): 主机名
         ip_address (str): IP地址
         open_ports (list): 开放端口列表
+        services (dict): 端口 -> 服务名称（如横幅识别的结果），
+            未包含的端口使用常见端口字典
     
     Returns:
         str: 格式化的详细输出字符串
     """
-    if not open_ports:
-        return f"Open ports for {hostname} ({ip_address})\nPORT     SERVICE\n"
-    
-    output = f"Open ports for {hostname} ({ip_address})\n"
-    output += "PORT     SERVICE\n"
-    
+    buffer = io.StringIO()
+    write_verbose_output(hostname, ip_address, open_ports, buffer, services)
+    return buffer.getvalue()
+
+def write_verbose_output(hostname, ip_address, open_ports, fp, services=None):
+    """
+    把详细输出逐行写入文件对象，写出的内容与 format_verbose_output 相同
+
+    每行写入后立即刷新，open_ports 可以是边扫描边产出端口的迭代器。
+
+    Args:
+        hostname (str): 主机名
+        ip_address (str): IP地址
+        open_ports (iterable): 开放端口的可迭代对象
+        fp: 可写的文件对象
+        services (dict): 端口 -> 服务名称，未包含的端口使用常见端口字典
+    """
+    fp.write(f"Open ports for {hostname} ({ip_address})\nPORT     SERVICE")
+    _flush(fp)
+
+    # 换行写在每行开头，这样不需要知道哪一行是最后一行
+    empty = True
     for port in open_ports:
-        service = ports_and_services.get(port, "unknown")
-        output += f"{port:<8} {service}\n"
-    
-    return output.rstrip()
+        empty = False
+        service = (services or {}).get(port) or ports_and_services.get(port, "unknown")
+        fp.write(f"\n{port:<8} {service}")
+        _flush(fp)
+
+    if empty:
+        fp.write("\n")
+        _flush(fp)
+
+def _flush(fp):
+    """刷新文件对象（如果支持）"""
+    flush = getattr(fp, "flush", None)
+    if flush is not None:
+        flush()
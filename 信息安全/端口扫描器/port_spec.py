@@ -0,0 +1,201 @@
+"""
+端口规格
+解析形如 "1-1024,3306,8000-8100,top20" 的端口规格，
+并按端口开放的可能性从高到低给出扫描顺序
+"""
+
+import base64
+import zlib
+
+from common_ports import ranked_ports
+
+MAX_PORT = 65535
+
+
+class PortSet:
+    """
+    基于位图的端口集合
+
+    65536个端口各占一位，整个集合固定占用8KB，
+    加入、查询都是O(1)，按端口号升序遍历时跳过全零字节。
+    """
+
+    def __init__(self, ports=()):
+        """
+        初始化端口集合
+
+        Args:
+            ports (iterable): 初始端口
+        """
+        self._bits = bytearray((MAX_PORT + 1) // 8)
+        self._count = 0
+        for port in ports:
+            self.add(port)
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        解析端口规格字符串
+
+        Args:
+            spec (str): 以逗号分隔的端口规格，每一项可以是单个端口（"3306"）、
+                端口范围（"8000-8100"）或最常见的N个端口（"top20"，
+                N 不能超过 common_ports.ranked_ports 的长度）
+
+        Returns:
+            PortSet: 端口集合
+
+        Raises:
+            ValueError: 规格格式错误、端口超出范围或N超过常见端口表的长度
+        """
+        ports = cls()
+        for item in spec.split(","):
+            item = item.strip().lower()
+            if not item:
+                continue
+            if item.startswith("top"):
+                count = int(item[3:])
+                if not 1 <= count <= len(ranked_ports):
+                    raise ValueError(f"Invalid top port count: {item} "
+                                     f"(at most top{len(ranked_ports)})")
+                for port in ranked_ports[:count]:
+                    ports.add(port)
+            elif "-" in item:
+                start, _, end = item.partition("-")
+                ports.add_range(int(start), int(end))
+            else:
+                ports.add(int(item))
+        return ports
+
+    @classmethod
+    def from_range(cls, port_range):
+        """
+        把各种形式的端口参数转换为端口集合
+
+        Args:
+            port_range (list or str or PortSet): 包含起始和结束端口的列表、
+                端口规格字符串或端口集合
+
+        Returns:
+            PortSet: 端口集合
+
+        Raises:
+            IndexError: 列表少于两个元素
+            ValueError: 规格格式错误或端口超出范围
+        """
+        if isinstance(port_range, PortSet):
+            return port_range
+        if isinstance(port_range, str):
+            return cls.parse(port_range)
+        start_port, end_port = port_range[0], port_range[1]
+        ports = cls()
+        if start_port <= end_port:
+            ports.add_range(start_port, end_port)
+        return ports
+
+    def add(self, port):
+        """
+        加入一个端口
+
+        Args:
+            port (int): 端口号
+        """
+        if not 0 <= port <= MAX_PORT:
+            raise ValueError(f"Port out of range: {port}")
+        index, bit = port >> 3, 1 << (port & 7)
+        if not self._bits[index] & bit:
+            self._bits[index] |= bit
+            self._count += 1
+
+    def add_range(self, start, end):
+        """
+        加入闭区间 [start, end] 内的所有端口
+
+        Args:
+            start (int): 起始端口
+            end (int): 结束端口
+        """
+        if start > end:
+            raise ValueError(f"Invalid port range: {start}-{end}")
+        if not (0 <= start and end <= MAX_PORT):
+            raise ValueError(f"Port out of range: {start}-{end}")
+        for port in range(start, end + 1):
+            self.add(port)
+
+    def to_bytes(self):
+        """
+        导出位图
+
+        Returns:
+            bytes: 8192字节的位图
+        """
+        return bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        从位图恢复端口集合
+
+        Args:
+            data (bytes): to_bytes 导出的位图
+
+        Returns:
+            PortSet: 端口集合
+        """
+        if len(data) != (MAX_PORT + 1) // 8:
+            raise ValueError("Invalid port bitmap length")
+        ports = cls()
+        ports._bits[:] = data
+        ports._count = sum(bin(byte).count("1") for byte in data if byte)
+        return ports
+
+    def encode(self):
+        """
+        把位图压缩编码为ASCII字符串，便于写入JSON文件
+        （稀疏位图压缩后只有几十字节）
+
+        Returns:
+            str: 编码后的字符串
+        """
+        return base64.b64encode(zlib.compress(self.to_bytes())).decode("ascii")
+
+    @classmethod
+    def decode(cls, text):
+        """
+        解码 encode 生成的字符串
+
+        Args:
+            text (str): 编码后的字符串
+
+        Returns:
+            PortSet: 端口集合
+        """
+        return cls.from_bytes(zlib.decompress(base64.b64decode(text)))
+
+    def __contains__(self, port):
+        return 0 <= port <= MAX_PORT and bool(self._bits[port >> 3] & (1 << (port & 7)))
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index, byte in enumerate(self._bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield (index << 3) | bit
+
+    def scan_order(self):
+        """
+        按开放可能性从高到低产出端口：先是按频率排序的常见端口，
+        然后是其余端口（按端口号升序）
+
+        Yields:
+            int: 端口号
+        """
+        ranked = [port for port in ranked_ports if port in self]
+        yield from ranked
+        ranked = set(ranked)
+        for port in self:
+            if port not in ranked:
+                yield port
@@ -0,0 +1,233 @@
+"""
+扫描速率限制
+用令牌桶限制全局和单主机每秒发起的连接数，所有并发连接和主机共享同一组令牌桶，
+并统计实际达到的速率
+"""
+
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶：以 rate 个/秒的速度补充令牌，最多积攒 burst 个，
+    每发起一个连接消耗一个令牌
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        """
+        初始化令牌桶，初始时桶是满的
+
+        Args:
+            rate (float): 每秒补充的令牌数
+            burst (float): 桶容量，默认为10毫秒的令牌数（至少1个）
+            clock (callable): 返回当前时间的函数，便于测试
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid rate: {rate}")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate / 100)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """
+        计算还需等待多久才有一个令牌
+
+        Returns:
+            float: 等待时间（秒），已有令牌时返回0
+        """
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self):
+        """消耗一个令牌（调用前应确认 delay() 为0）"""
+        self._refill()
+        self._tokens -= 1
+
+
+class RateLimiter:
+    """
+    全局和单主机速率限制器
+
+    同一个限制器可以在多次扫描之间共享，扫描结束后通过 stats() 查看实际速率。
+    """
+
+    def __init__(self, rate=None, host_rate=None, burst=None, clock=time.monotonic):
+        """
+        初始化限制器
+
+        Args:
+            rate (float): 全局每秒最多发起的连接数，默认为None（不限制）
+            host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）
+            burst (float): 令牌桶容量，默认为各自速率10毫秒的令牌数（至少1个）
+            clock (callable): 返回当前时间的函数，便于测试
+        """
+        self.rate = rate
+        self.host_rate = host_rate
+        self.burst = burst
+        self._clock = clock
+        self._global = TokenBucket(rate, burst, clock) if rate else None
+        self._hosts = {}  # 主机 -> TokenBucket
+        self.sent = 0
+        self.host_sent = {}  # 主机 -> 已发起的连接数
+        self._first = None
+        self._last = None
+        self._host_window = {}  # 主机 -> [首个连接时间, 最后一个连接时间]
+
+    def _host_bucket(self, host):
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            bucket = self._hosts[host] = TokenBucket(self.host_rate, self.burst, self._clock)
+        return bucket
+
+    def delay(self, host):
+        """
+        计算还需等待多久才能向该主机发起一个连接
+
+        Args:
+            host (str): 目标主机
+
+        Returns:
+            float: 等待时间（秒），可以立即发起时返回0
+        """
+        wait = self._global.delay() if self._global is not None else 0.0
+        if self.host_rate:
+            wait = max(wait, self._host_bucket(host).delay())
+        return wait
+
+    def take(self, host):
+        """
+        记录已向该主机发起一个连接并消耗令牌
+
+        Args:
+            host (str): 目标主机
+        """
+        if self._global is not None:
+            self._global.take()
+        if self.host_rate:
+            self._host_bucket(host).take()
+        now = self._clock()
+        if self._first is None:
+            self._first = now
+        self._last = now
+        self.sent += 1
+        self.host_sent[host] = self.host_sent.get(host, 0) + 1
+        window = self._host_window.get(host)
+        if window is None:
+            self._host_window[host] = [now, now]
+        else:
+            window[1] = now
+
+    def achieved_rate(self, host=None):
+        """
+        计算从第一个连接到最后一个连接之间实际达到的速率
+
+        Args:
+            host (str): 目标主机，默认为None（全局速率）
+
+        Returns:
+            float: 每秒连接数，连接数不足两个时返回0
+        """
+        if host is None:
+            sent, first, last = self.sent, self._first, self._last
+        else:
+            sent = self.host_sent.get(host, 0)
+            first, last = self._host_window.get(host, (None, None))
+        if sent < 2 or last == first:
+            return 0.0
+        return (sent - 1) / (last - first)
+
+    def stats(self):
+        """
+        返回速率统计
+
+        Returns:
+            dict: 全局上限、单主机上限、已发起的连接数、发送时长、
+                实际全局速率和实际速率最高的主机的速率
+        """
+        busiest = max(self.host_sent, key=self.host_sent.get, default=None)
+        return {
+            "rate_cap": self.rate,
+            "host_rate_cap": self.host_rate,
+            "sent": self.sent,
+            "elapsed": (self._last - self._first) if self._first is not None else 0.0,
+            "rate": self.achieved_rate(),
+            "max_host_rate": self.achieved_rate(busiest) if busiest is not None else 0.0,
+        }
+
+
+class RateLimitedTiming:
+    """
+    给时序控制器加上速率限制：令牌不足时拒绝发起连接，
+    并通过 wait_time() 告诉扫描后端需要等待多久
+    """
+
+    def __init__(self, timing, limiter):
+        """
+        初始化控制器
+
+        Args:
+            timing: 被包装的时序控制器
+            limiter (RateLimiter): 速率限制器
+        """
+        self.timing = timing
+        self.limiter = limiter
+        self._clock = limiter._clock  # 与令牌桶使用同一个时钟
+        self.max_retries = timing.max_retries
+        self._retry_at = None
+        self._denied = False
+
+    def timeout(self, host, attempt=0):
+        """返回被包装控制器的超时时间"""
+        return self.timing.timeout(host, attempt)
+
+    def admit(self, host):
+        """
+        并发窗口和令牌桶都允许时才发起连接
+
+        Args:
+            host (str): 目标主机
+
+        Returns:
+            bool: 允许时返回True
+        """
+        if not self.timing.admit(host):
+            return False
+        wait = self.limiter.delay(host)
+        if wait <= 0:
+            return True
+        # 记录最早可以再次尝试的时间
+        ready = self._clock() + wait
+        if not self._denied or ready < self._retry_at:
+            self._retry_at = ready
+        self._denied = True
+        return False
+
+    def sent(self, host):
+        """消耗令牌并通知被包装的控制器"""
+        self.limiter.take(host)
+        self.timing.sent(host)
+
+    def completed(self, result, attempt=0):
+        """由被包装的控制器决定是否重试"""
+        return self.timing.completed(result, attempt)
+
+    def wait_time(self):
+        """
+        返回自上次调用以来被速率限制挡住的任务最早还需等待多久
+
+        Returns:
+            float: 等待时间（秒），没有任务被速率限制挡住时返回None
+        """
+        if not self._denied:
+            return self.timing.wait_time()
+        self._denied = False
+        return max(0.0, self._retry_at - self._clock())
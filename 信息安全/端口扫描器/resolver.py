@@ -0,0 +1,182 @@
+"""
+带缓存的域名解析
+使用线程池并发调用 getaddrinfo 批量解析主机名，并把结果缓存一段时间，
+同时支持IPv4和IPv6地址
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 缓存有效期（秒）。系统的 getaddrinfo 不返回DNS记录的TTL，
+# 因此成功结果使用固定的有效期，解析失败的结果只缓存较短时间
+DEFAULT_TTL = 300
+DEFAULT_NEGATIVE_TTL = 30
+
+# 批量解析时的最大线程数
+DEFAULT_MAX_WORKERS = 32
+
+
+class Resolver:
+    """
+    带TTL缓存的解析器
+
+    缓存按主机名保存解析出的地址列表（或解析失败的异常），过期后重新解析。
+    IP地址字面量不经过系统解析器，直接返回。
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_workers=DEFAULT_MAX_WORKERS, clock=time.monotonic):
+        """
+        初始化解析器
+
+        Args:
+            ttl (float): 成功结果的缓存时间（秒）
+            negative_ttl (float): 解析失败结果的缓存时间（秒）
+            max_workers (int): 批量解析时的最大线程数
+            clock (callable): 返回当前时间的函数，便于测试
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self._clock = clock
+        self._cache = {}  # 主机名 -> (过期时间, 地址列表或异常)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, hostname):
+        """
+        解析主机名的所有地址
+
+        Args:
+            hostname (str): 主机名或IP地址
+
+        Returns:
+            list: 去重后的地址字符串列表，IPv4地址排在IPv6地址之前
+
+        Raises:
+            socket.gaierror: 主机名无法解析
+        """
+        literal = _literal_address(hostname)
+        if literal is not None:
+            return [literal]
+
+        now = self._clock()
+        with self._lock:
+            entry = self._cache.get(hostname)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                value = entry[1]
+                if isinstance(value, Exception):
+                    raise value
+                return list(value)
+            self.misses += 1
+
+        try:
+            addresses = _getaddrinfo(hostname)
+        except socket.gaierror as e:
+            with self._lock:
+                self._cache[hostname] = (self._clock() + self.negative_ttl, e)
+            raise
+
+        with self._lock:
+            self._cache[hostname] = (self._clock() + self.ttl, addresses)
+        return list(addresses)
+
+    def resolve_one(self, hostname):
+        """
+        解析主机名并返回首选地址（优先IPv4）
+
+        Args:
+            hostname (str): 主机名或IP地址
+
+        Returns:
+            str: 地址字符串
+
+        Raises:
+            socket.gaierror: 主机名无法解析
+        """
+        return self.resolve(hostname)[0]
+
+    def resolve_many(self, hostnames):
+        """
+        在线程池中并发解析多个主机名，已缓存的主机名不会重复解析
+
+        Args:
+            hostnames (iterable): 主机名列表
+
+        Returns:
+            dict: 主机名 -> 地址列表；解析失败的主机名对应 socket.gaierror 异常
+        """
+        hostnames = list(dict.fromkeys(hostnames))
+        results = {}
+
+        def resolve(hostname):
+            try:
+                return self.resolve(hostname)
+            except socket.gaierror as e:
+                return e
+
+        if len(hostnames) <= 1:
+            for hostname in hostnames:
+                results[hostname] = resolve(hostname)
+            return results
+
+        workers = min(self.max_workers, len(hostnames))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for hostname, value in zip(hostnames, executor.map(resolve, hostnames)):
+                results[hostname] = value
+        return results
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
+
+
+def _literal_address(value):
+    """
+    如果是IP地址字面量则返回规范化后的地址字符串，否则返回None
+
+    Args:
+        value (str): 主机名或IP地址
+
+    Returns:
+        str: 规范化后的地址，或None
+    """
+    try:
+        return str(ipaddress.ip_address(value.strip("[]")))
+    except ValueError:
+        return None
+
+
+def _getaddrinfo(hostname):
+    """
+    调用系统解析器
+
+    Args:
+        hostname (str): 主机名
+
+    Returns:
+        list: 去重后的地址列表，IPv4在前
+    """
+    infos = socket.getaddrinfo(hostname, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+    addresses = []
+    for family, _, _, _, sockaddr in infos:
+        if family not in (socket.AF_INET, socket.AF_INET6):
+            continue
+        address = str(ipaddress.ip_address(sockaddr[0].split("%")[0]))
+        if address not in addresses:
+            addresses.append(address)
+    if not addresses:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    # 稳定排序，保持系统返回的同族地址顺序
+    addresses.sort(key=lambda address: ":" in address)
+    return addresses
+
+
+# 模块级默认解析器，供端口扫描器共享缓存
+default_resolver = Resolver()
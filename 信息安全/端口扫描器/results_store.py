@@ -0,0 +1,127 @@
+"""
+扫描结果存储
+按主机保存历次扫描的结果（开放端口和已扫描过的端口），
+供增量重扫优先探测上次开放的端口、只抽查一部分历史上关闭的端口
+"""
+
+import json
+import os
+import time
+
+from port_spec import PortSet
+from scan_journal import write_json_atomic
+
+_FORMAT_VERSION = 1
+
+
+class HostRecord:
+    """单个主机的历史扫描结果"""
+
+    def __init__(self, open_ports=None, scanned=None, runs=0, updated=None):
+        """
+        Args:
+            open_ports (PortSet): 最近一次确认开放的端口
+            scanned (PortSet): 扫描过的全部端口
+            runs (int): 已经扫描过的次数
+            updated (float): 最近一次扫描的时间戳
+        """
+        self.open = open_ports if open_ports is not None else PortSet()
+        self.scanned = scanned if scanned is not None else PortSet()
+        self.runs = runs
+        self.updated = updated
+
+
+class ResultStore:
+    """
+    按主机保存扫描结果的JSON文件
+
+    每个主机保存两个压缩后的端口位图，即使扫描全部65535个端口，
+    每个主机也只占几十字节。
+    """
+
+    def __init__(self, path):
+        """
+        打开结果存储，文件已存在时载入其中的结果
+
+        Args:
+            path (str): 文件路径
+        """
+        self.path = path
+        self._hosts = {}  # 主机 -> HostRecord
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported results store: {path}")
+            for host, entry in data["hosts"].items():
+                self._hosts[host] = HostRecord(PortSet.decode(entry["open"]),
+                                               PortSet.decode(entry["scanned"]),
+                                               entry["runs"], entry["updated"])
+
+    def get(self, host):
+        """
+        返回主机的历史结果
+
+        Args:
+            host (str): 主机地址
+
+        Returns:
+            HostRecord: 历史结果，从未扫描过时返回None
+        """
+        return self._hosts.get(host)
+
+    def hosts(self):
+        """
+        返回有记录的主机
+
+        Returns:
+            list: 主机地址列表
+        """
+        return list(self._hosts)
+
+    def update(self, host, probed, open_ports):
+        """
+        用一次扫描的结果更新主机记录；本次没有探测的端口保留原来的状态
+
+        Args:
+            host (str): 主机地址
+            probed (iterable): 本次探测的端口
+            open_ports (iterable): 本次探测中开放的端口
+
+        Returns:
+            tuple: (新开放的端口列表, 新关闭的端口列表)
+        """
+        record = self._hosts.get(host)
+        if record is None:
+            record = self._hosts[host] = HostRecord()
+        open_now = PortSet(open_ports)
+        opened = []
+        closed = []
+        for port in probed:
+            was_open = port in record.open
+            if port in open_now:
+                if not was_open:
+                    opened.append(port)
+            elif was_open:
+                closed.append(port)
+            record.scanned.add(port)
+
+        gone = set(closed)
+        updated = PortSet(port for port in record.open if port not in gone)
+        for port in opened:
+            updated.add(port)
+        record.open = updated
+        record.runs += 1
+        record.updated = time.time()
+        return sorted(opened), sorted(closed)
+
+    def save(self):
+        """把结果原子地写入磁盘"""
+        write_json_atomic(self.path, {
+            "version": _FORMAT_VERSION,
+            "hosts": {
+                host: {"open": record.open.encode(), "scanned": record.scanned.encode(),
+                       "runs": record.runs, "updated": record.updated}
+                for host, record in self._hosts.items()
+            },
+        })
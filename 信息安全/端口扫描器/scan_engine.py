@@ -0,0 +1,530 @@
+"""
+端口扫描引擎
+提供三种TCP连接扫描后端：
+- asyncio: 基于协程的并发扫描
+- selectors: 单线程非阻塞connect + epoll/kqueue/select 多路复用
+- sequential: 逐个端口的阻塞扫描（原始实现，用作对照基准）
+
+所有后端都通过时序控制器（见 FixedTiming、timing.AdaptiveTiming 和
+rate_limit.RateLimitedTiming）获取每个连接的超时时间、单主机并发窗口、重试决定，
+以及被速率限制挡住时需要等待的时间。
+"""
+
+import asyncio
+import errno
+import heapq
+import selectors
+import socket
+import time
+from collections import OrderedDict, deque, namedtuple
+
+# 端口状态
+OPEN = "open"
+CLOSED = "closed"
+FILTERED = "filtered"
+ERROR = "error"
+
+# 默认并发连接数和超时时间（秒）
+DEFAULT_CONCURRENCY = 500
+DEFAULT_TIMEOUT = 1
+
+# 可选的扫描后端
+BACKENDS = ("asyncio", "selectors", "sequential")
+
+# 非阻塞connect进行中时返回的错误码
+_CONNECT_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+
+# 单个端口的探测结果
+ProbeResult = namedtuple("ProbeResult", ["host", "port", "state", "latency", "errno"])
+
+
+class FixedTiming:
+    """
+    固定超时时间的时序控制器：不限制单主机并发，也不重试
+    """
+
+    max_retries = 0
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        """
+        初始化控制器
+
+        Args:
+            timeout (float): 每个连接的超时时间（秒）
+        """
+        self._timeout = timeout
+
+    def timeout(self, host, attempt=0):
+        """返回固定的超时时间"""
+        return self._timeout
+
+    def admit(self, host):
+        """总是允许发起连接"""
+        return True
+
+    def sent(self, host):
+        """无需记录"""
+
+    def completed(self, result, attempt=0):
+        """从不重试"""
+        return False
+
+    def wait_time(self):
+        """不限制速率，无需等待"""
+        return None
+
+
+class _Dispatcher:
+    """
+    按时序控制器的并发窗口分发探测任务，并管理重试队列
+
+    被窗口挡住的任务按主机排队，最多缓存 backlog 个，
+    因此一个慢主机不会阻塞其他主机的任务。
+    """
+
+    def __init__(self, probes, timing, backlog, stats=None):
+        self._probes = iter(probes)
+        self._timing = timing
+        self._stats = stats
+        self._backlog = max(1, backlog)
+        self._waiting = OrderedDict()  # 主机 -> deque[(端口, 重试次数)]
+        self._waiting_count = 0
+        self._exhausted = False
+        self.in_flight = 0
+
+    def next(self):
+        """
+        取出下一个可以立即发起的任务
+
+        Returns:
+            tuple: (host, port, attempt)，暂时没有可发起的任务时返回None
+        """
+        for host, queue in self._waiting.items():
+            if self._timing.admit(host):
+                port, attempt = queue.popleft()
+                if not queue:
+                    del self._waiting[host]
+                self._waiting_count -= 1
+                return self._send(host, port, attempt)
+
+        while not self._exhausted and self._waiting_count < self._backlog:
+            try:
+                host, port = next(self._probes)
+            except StopIteration:
+                self._exhausted = True
+                break
+            if host not in self._waiting and self._timing.admit(host):
+                return self._send(host, port, 0)
+            self._defer(host, port, 0)
+        return None
+
+    def completed(self, result, attempt):
+        """
+        记录一个连接的结果
+
+        Args:
+            result (ProbeResult): 探测结果
+            attempt (int): 第几次重试
+
+        Returns:
+            bool: 结果为最终结果时返回True；需要重试时返回False
+        """
+        self.in_flight -= 1
+        retry = self._timing.completed(result, attempt)
+        if self._stats is not None:
+            self._stats.completed(result, not retry)
+        if retry:
+            self._defer(result.host, result.port, attempt + 1)
+            return False
+        return True
+
+    def finished(self):
+        """所有任务（包括重试）都已完成时返回True"""
+        return self._exhausted and not self._waiting_count and not self.in_flight
+
+    def wait_time(self):
+        """
+        next() 返回None后，需要等待多久才可能有任务被速率限制放行
+
+        Returns:
+            float: 等待时间（秒），与速率无关（只需等待其他连接完成）时返回None
+        """
+        return self._timing.wait_time()
+
+    def _send(self, host, port, attempt):
+        self._timing.sent(host)
+        if self._stats is not None:
+            self._stats.sent(attempt)
+        self.in_flight += 1
+        return host, port, attempt
+
+    def _defer(self, host, port, attempt):
+        self._waiting.setdefault(host, deque()).append((port, attempt))
+        self._waiting_count += 1
+
+
+def _family(host):
+    """
+    根据地址字符串选择套接字地址族
+
+    Args:
+        host (str): IPv4或IPv6地址
+
+    Returns:
+        int: socket.AF_INET 或 socket.AF_INET6
+    """
+    return socket.AF_INET6 if ":" in host else socket.AF_INET
+
+
+def _classify(err):
+    """
+    根据connect返回的错误码判断端口状态
+
+    Args:
+        err (int): 错误码，0表示连接成功
+
+    Returns:
+        str: 端口状态
+    """
+    if err == 0:
+        return OPEN
+    if err == errno.ECONNREFUSED:
+        return CLOSED
+    if err in _CONNECT_IN_PROGRESS or err == errno.ETIMEDOUT:
+        return FILTERED
+    return ERROR
+
+
+def _probe_blocking(host, port, timeout):
+    """
+    以阻塞方式探测单个TCP端口
+
+    Args:
+        host (str): 目标IP地址（IPv4或IPv6）
+        port (int): 目标端口
+        timeout (float): 连接超时时间（秒）
+
+    Returns:
+        ProbeResult: 探测结果
+    """
+    start = time.perf_counter()
+    try:
+        sock = socket.socket(_family(host), socket.SOCK_STREAM)
+    except OSError as e:
+        return ProbeResult(host, port, ERROR, 0.0, e.errno)
+    try:
+        sock.settimeout(timeout)
+        err = sock.connect_ex((host, port))
+    except socket.timeout:
+        err = errno.ETIMEDOUT
+    except OSError as e:
+        err = e.errno
+    finally:
+        sock.close()
+    if err in _CONNECT_IN_PROGRESS:
+        # 带超时的connect_ex在超时后返回EAGAIN
+        err = errno.ETIMEDOUT
+    state = _classify(err)
+    return ProbeResult(host, port, state, time.perf_counter() - start,
+                       None if state == OPEN else err)
+
+
+def scan_sequential(probes, timeout=DEFAULT_TIMEOUT, timing=None, stats=None):
+    """
+    逐个端口阻塞扫描，每个端口最多等待 timeout 秒
+
+    Args:
+        probes (iterable): (host, port) 元组的可迭代对象
+        timeout (float): 单个连接的超时时间（秒），指定 timing 时忽略
+        timing: 时序控制器，默认为 FixedTiming(timeout)
+        stats (ScanStats): 提供时记录扫描统计
+
+    Yields:
+        ProbeResult: 每个端口的探测结果
+    """
+    timing = timing or FixedTiming(timeout)
+    dispatcher = _Dispatcher(probes, timing, 1, stats)
+    if stats is not None:
+        stats.start()
+    try:
+        while True:
+            task = dispatcher.next()
+            if task is None:
+                wait = dispatcher.wait_time()
+                if wait is None or dispatcher.finished():
+                    break
+                time.sleep(wait)
+                continue
+            host, port, attempt = task
+            result = _probe_blocking(host, port, timing.timeout(host, attempt))
+            if dispatcher.completed(result, attempt):
+                yield result
+    finally:
+        if stats is not None:
+            stats.stop()
+
+
+def scan_selectors(probes, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                   timing=None, stats=None):
+    """
+    单线程多路复用扫描
+
+    同时发起最多 concurrency 个非阻塞connect，由默认选择器（Linux上为epoll）
+    通知连接完成，超时时间记录在最小堆中，每轮只需检查堆顶。
+
+    Args:
+        probes (iterable): (host, port) 元组的可迭代对象
+        concurrency (int): 最大并发连接数
+        timeout (float): 单个连接的超时时间（秒），指定 timing 时忽略
+        timing: 时序控制器，默认为 FixedTiming(timeout)
+        stats (ScanStats): 提供时记录扫描统计
+
+    Yields:
+        ProbeResult: 每个端口的探测结果
+    """
+    timing = timing or FixedTiming(timeout)
+    dispatcher = _Dispatcher(probes, timing, concurrency, stats)
+    if stats is not None:
+        stats.start()
+    selector = selectors.DefaultSelector()
+    in_flight = {}  # 序号 -> (sock, host, port, attempt, start)
+    deadlines = []  # (截止时间, 序号) 组成的最小堆
+    seq = 0
+
+    def finish(key, err):
+        sock, host, port, attempt, start = in_flight.pop(key)
+        selector.unregister(sock)
+        sock.close()
+        state = _classify(err)
+        result = ProbeResult(host, port, state, time.perf_counter() - start,
+                             None if state == OPEN else err)
+        return result if dispatcher.completed(result, attempt) else None
+
+    try:
+        while True:
+            # 补充新的连接直到达到并发上限
+            while len(in_flight) < concurrency:
+                task = dispatcher.next()
+                if task is None:
+                    break
+                host, port, attempt = task
+                start = time.perf_counter()
+                try:
+                    sock = socket.socket(_family(host), socket.SOCK_STREAM)
+                except OSError as e:
+                    result = ProbeResult(host, port, ERROR, 0.0, e.errno)
+                    if dispatcher.completed(result, attempt):
+                        yield result
+                    continue
+                sock.setblocking(False)
+                try:
+                    err = sock.connect_ex((host, port))
+                except OSError as e:
+                    err = e.errno
+                if err not in _CONNECT_IN_PROGRESS:
+                    # 本机目标常常立即得到结果
+                    sock.close()
+                    state = _classify(err)
+                    result = ProbeResult(host, port, state, time.perf_counter() - start,
+                                         None if state == OPEN else err)
+                    if dispatcher.completed(result, attempt):
+                        yield result
+                    continue
+                seq += 1
+                in_flight[seq] = (sock, host, port, attempt, start)
+                selector.register(sock, selectors.EVENT_WRITE, seq)
+                heapq.heappush(deadlines, (start + timing.timeout(host, attempt), seq))
+
+            rate_wait = dispatcher.wait_time()
+            if not in_flight:
+                if dispatcher.finished():
+                    break
+                if rate_wait:
+                    time.sleep(rate_wait)
+                continue
+
+            # 丢弃已完成连接留下的过期堆项
+            while deadlines and deadlines[0][1] not in in_flight:
+                heapq.heappop(deadlines)
+            wait = max(0.0, deadlines[0][0] - time.perf_counter())
+            if rate_wait is not None:
+                wait = min(wait, rate_wait)
+
+            for key, _ in selector.select(wait):
+                err = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                result = finish(key.data, err)
+                if result is not None:
+                    yield result
+
+            # 处理超时的连接
+            now = time.perf_counter()
+            while deadlines and deadlines[0][0] <= now:
+                _, key = heapq.heappop(deadlines)
+                if key in in_flight:
+                    result = finish(key, errno.ETIMEDOUT)
+                    if result is not None:
+                        yield result
+    finally:
+        for sock, _, _, _, _ in in_flight.values():
+            sock.close()
+        selector.close()
+        if stats is not None:
+            stats.stop()
+
+
+def _iter_async(agen):
+    """
+    在新的事件循环中同步迭代一个异步生成器
+
+    Args:
+        agen: 异步生成器
+
+    Yields:
+        异步生成器产出的每个值
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+def scan(probes, backend="asyncio", concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+         timing=None, stats=None):
+    """
+    使用指定后端扫描，以同步生成器形式产出结果
+
+    Args:
+        probes (iterable): (host, port) 元组的可迭代对象
+        backend (str): 扫描后端，可选 "asyncio"、"selectors"、"sequential"
+        concurrency (int): 最大并发连接数（sequential后端忽略此参数）
+        timeout (float): 单个连接的超时时间（秒），指定 timing 时忽略
+        timing: 时序控制器，默认为 FixedTiming(timeout)
+        stats (ScanStats): 提供时记录扫描统计
+
+    Returns:
+        iterator: ProbeResult 迭代器
+    """
+    if backend == "asyncio":
+        return _iter_async(scan_asyncio(probes, concurrency, timeout, timing, stats))
+    if backend == "selectors":
+        return scan_selectors(probes, concurrency, timeout, timing, stats)
+    if backend == "sequential":
+        return scan_sequential(probes, timeout, timing, stats)
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+async def probe_port_async(host, port, timeout=DEFAULT_TIMEOUT):
+    """
+    以非阻塞方式探测单个TCP端口
+
+    Args:
+        host (str): 目标IP地址（IPv4或IPv6）
+        port (int): 目标端口
+        timeout (float): 连接超时时间（秒）
+
+    Returns:
+        ProbeResult: 探测结果
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    sock = None
+    try:
+        sock = socket.socket(_family(host), socket.SOCK_STREAM)
+        sock.setblocking(False)
+        await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+        state, err = OPEN, None
+    except asyncio.TimeoutError:
+        state, err = FILTERED, errno.ETIMEDOUT
+    except ConnectionRefusedError:
+        state, err = CLOSED, errno.ECONNREFUSED
+    except OSError as e:
+        state, err = ERROR, e.errno
+    finally:
+        if sock is not None:
+            sock.close()
+    return ProbeResult(host, port, state, time.perf_counter() - start, err)
+
+
+async def scan_asyncio(probes, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                       timing=None, stats=None):
+    """
+    并发扫描一组 (主机, 端口)，按完成顺序逐个产出结果
+
+    固定数量的工作协程从同一个分发器中取任务，因此同时在途的连接数
+    不超过 concurrency，且内存占用与端口总数无关。
+
+    Args:
+        probes (iterable): (host, port) 元组的可迭代对象
+        concurrency (int): 最大并发连接数
+        timeout (float): 单个连接的超时时间（秒），指定 timing 时忽略
+        timing: 时序控制器，默认为 FixedTiming(timeout)
+        stats (ScanStats): 提供时记录扫描统计
+
+    Yields:
+        ProbeResult: 每个端口的探测结果
+    """
+    timing = timing or FixedTiming(timeout)
+    dispatcher = _Dispatcher(probes, timing, concurrency, stats)
+    if stats is not None:
+        stats.start()
+    results = asyncio.Queue(maxsize=concurrency)
+    wakeup = asyncio.Event()
+    done = object()
+
+    async def worker():
+        try:
+            while True:
+                task = dispatcher.next()
+                if task is None:
+                    if dispatcher.finished():
+                        break
+                    # 等待其他连接完成，使并发窗口或重试队列发生变化；
+                    # 被速率限制挡住时最多等到令牌补充，然后唤醒其他工作协程
+                    wait = dispatcher.wait_time()
+                    wakeup.clear()
+                    if wait is None:
+                        await wakeup.wait()
+                    else:
+                        try:
+                            await asyncio.wait_for(wakeup.wait(), wait)
+                        except asyncio.TimeoutError:
+                            wakeup.set()
+                    continue
+                host, port, attempt = task
+                result = await probe_port_async(host, port, timing.timeout(host, attempt))
+                final = dispatcher.completed(result, attempt)
+                wakeup.set()
+                if final:
+                    await results.put(result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 交给消费者重新抛出，避免其永久等待
+            await results.put(e)
+            return
+        wakeup.set()
+        await results.put(done)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    remaining = len(workers)
+    try:
+        while remaining:
+            result = await results.get()
+            if result is done:
+                remaining -= 1
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if stats is not None:
+            stats.stop()
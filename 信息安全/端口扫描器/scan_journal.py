@@ -0,0 +1,186 @@
+"""
+扫描进度日志
+为每个主机记录已探测端口和开放端口的位图，定期写入磁盘，
+扫描中断（崩溃或Ctrl-C）后可以从日志继续，而不必从头扫描
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from port_spec import PortSet
+from scan_engine import OPEN
+
+# 默认每隔多少秒把进度写入磁盘
+DEFAULT_FLUSH_INTERVAL = 5
+
+_FORMAT_VERSION = 1
+
+
+def write_json_atomic(path, data):
+    """
+    先写临时文件再原子替换目标文件，写入过程中崩溃不会损坏已有的文件
+
+    Args:
+        path (str): 目标文件路径
+        data: 可序列化为JSON的对象
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".scan-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ScanJournal:
+    """
+    扫描进度日志
+
+    日志文件是一个JSON对象，每个主机保存两个压缩后的端口位图：
+    已得到最终结果的端口（probed）和其中开放的端口（open）。
+    写入时先写临时文件再原子替换，中途崩溃不会留下损坏的日志。
+    """
+
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        打开日志，文件已存在时载入其中的进度
+
+        Args:
+            path (str): 日志文件路径
+            flush_interval (float): 写入磁盘的间隔（秒）
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._probed = {}  # 主机 -> PortSet
+        self._open = {}    # 主机 -> PortSet
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported scan journal: {path}")
+            for host, entry in data["hosts"].items():
+                self._probed[host] = PortSet.decode(entry["probed"])
+                self._open[host] = PortSet.decode(entry["open"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def is_probed(self, host, port):
+        """
+        判断某个端口是否已有最终结果
+
+        Args:
+            host (str): 主机地址
+            port (int): 端口
+
+        Returns:
+            bool: 已探测过时返回True
+        """
+        probed = self._probed.get(host)
+        return probed is not None and port in probed
+
+    def hosts(self):
+        """
+        返回日志中有记录的主机
+
+        Returns:
+            list: 主机地址列表
+        """
+        return list(self._probed)
+
+    def open_ports(self, host, ports=None):
+        """
+        返回日志中记录的开放端口
+
+        Args:
+            host (str): 主机地址
+            ports (PortSet): 只返回该集合内的端口，默认为全部
+
+        Returns:
+            list: 升序的开放端口列表
+        """
+        recorded = self._open.get(host)
+        if recorded is None:
+            return []
+        return [port for port in recorded if ports is None or port in ports]
+
+    def pending(self, probes):
+        """
+        过滤掉已经探测过的 (主机, 端口)
+
+        Args:
+            probes (iterable): (host, port) 元组的可迭代对象
+
+        Yields:
+            tuple: 尚未探测的 (host, port)
+        """
+        for host, port in probes:
+            if not self.is_probed(host, port):
+                yield host, port
+
+    def record(self, results):
+        """
+        记录经过的每个探测结果，并按间隔写入磁盘
+
+        Args:
+            results (iterable): ProbeResult 迭代器
+
+        Yields:
+            ProbeResult: 原样产出每个结果
+        """
+        try:
+            for result in results:
+                self.add(result)
+                yield result
+        finally:
+            if hasattr(results, "close"):
+                results.close()
+
+    def add(self, result):
+        """
+        记录一个探测结果
+
+        Args:
+            result (ProbeResult): 探测结果
+        """
+        probed = self._probed.get(result.host)
+        if probed is None:
+            probed = self._probed[result.host] = PortSet()
+            self._open[result.host] = PortSet()
+        probed.add(result.port)
+        if result.state == OPEN:
+            self._open[result.host].add(result.port)
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """把进度原子地写入磁盘"""
+        self._last_flush = time.monotonic()
+        if not self._dirty:
+            return
+        write_json_atomic(self.path, {
+            "version": _FORMAT_VERSION,
+            "hosts": {
+                host: {"probed": self._probed[host].encode(), "open": self._open[host].encode()}
+                for host in self._probed
+            },
+        })
+        self._dirty = False
+
+    def finish(self):
+        """扫描完成后删除日志文件，下次使用同一路径会重新开始扫描"""
+        self._dirty = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
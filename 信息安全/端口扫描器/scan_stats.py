@@ -0,0 +1,229 @@
+"""
+扫描统计
+记录每次连接的耗时分布、各错误码的次数、同时在途连接数的峰值和总耗时，
+用于判断扫描变慢的原因（超时、拒绝还是文件描述符耗尽）并据此调整并发数
+"""
+
+import bisect
+import errno
+import json
+import time
+
+# 耗时直方图的桶上限：0.1毫秒起每桶翻倍，最后一个桶约为6.5秒，更长的计入溢出桶
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(17))
+
+
+class LatencyHistogram:
+    """按指数分桶的耗时直方图"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, latency):
+        """
+        加入一个耗时样本
+
+        Args:
+            latency (float): 耗时（秒）
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.min = latency if self.min is None else min(self.min, latency)
+        self.max = latency if self.max is None else max(self.max, latency)
+
+    def merge(self, other):
+        """
+        把另一个直方图的样本并入本直方图
+
+        Args:
+            other (LatencyHistogram): 另一个直方图
+        """
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, fraction):
+        """
+        估算分位数，返回分位数所在桶的上限
+
+        Args:
+            fraction (float): 分位，如0.99
+
+        Returns:
+            float: 耗时（秒），没有样本时返回0；落在溢出桶时返回最大值
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[index], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: 样本数、平均值、最小值、最大值、p50/p99估算值，以及非空的桶
+                （桶上限毫秒数 -> 样本数，溢出桶记为 "inf"）
+        """
+        buckets = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                key = f"{LATENCY_BUCKETS[index] * 1000:g}" if index < len(LATENCY_BUCKETS) else "inf"
+                buckets[key] = count
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "min_ms": (self.min or 0.0) * 1000,
+            "max_ms": (self.max or 0.0) * 1000,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "buckets_ms": buckets,
+        }
+
+
+class ScanStats:
+    """
+    一次（或多次）扫描的统计信息
+
+    把同一个 ScanStats 传给多次扫描时统计会累加。
+
+    用法::
+
+        stats = ScanStats()
+        port_scanner.get_open_ports("192.168.1.10", [1, 65535], stats=stats)
+        print(stats.to_json())
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        Args:
+            clock (callable): 返回当前时间的函数，便于测试
+        """
+        self._clock = clock
+        self.started = None
+        self.finished = None
+        self.attempts = 0         # 发起的连接数（包括重试）
+        self.retries = 0          # 其中的重试次数
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.states = {}          # 最终状态 -> 端口数
+        self.errors = {}          # 错误码名称 -> 次数（包括会被重试的连接）
+        self.latency = {}         # 状态 -> LatencyHistogram（包括会被重试的连接）
+
+    def start(self):
+        """标记扫描开始（多次扫描累加时只记录第一次）"""
+        if self.started is None:
+            self.started = self._clock()
+
+    def stop(self):
+        """标记扫描结束"""
+        self.finished = self._clock()
+
+    @property
+    def elapsed(self):
+        """从开始到结束（或到现在，扫描尚未结束时）的秒数"""
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else self._clock()
+        return end - self.started
+
+    def sent(self, attempt=0):
+        """
+        记录发起了一个连接
+
+        Args:
+            attempt (int): 第几次重试，0表示首次探测
+        """
+        self.attempts += 1
+        if attempt:
+            self.retries += 1
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight:
+            self.max_in_flight = self.in_flight
+
+    def completed(self, result, final=True):
+        """
+        记录一个连接的结果
+
+        Args:
+            result (ProbeResult): 探测结果
+            final (bool): 是否为最终结果（会被重试的结果为False）
+        """
+        self.in_flight -= 1
+        histogram = self.latency.get(result.state)
+        if histogram is None:
+            histogram = self.latency[result.state] = LatencyHistogram()
+        histogram.add(result.latency)
+        if result.errno is not None:
+            name = errno.errorcode.get(result.errno, str(result.errno))
+            self.errors[name] = self.errors.get(name, 0) + 1
+        if final:
+            self.states[result.state] = self.states.get(result.state, 0) + 1
+
+    def combined_latency(self, states=None):
+        """
+        合并若干状态的耗时直方图
+
+        Args:
+            states (iterable): 状态，默认为None（全部状态）
+
+        Returns:
+            LatencyHistogram: 合并后的直方图
+        """
+        combined = LatencyHistogram()
+        for state, histogram in self.latency.items():
+            if states is None or state in states:
+                combined.merge(histogram)
+        return combined
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: 全部统计信息
+        """
+        elapsed = self.elapsed
+        ports = sum(self.states.values())
+        return {
+            "elapsed": elapsed,
+            "ports": ports,
+            "ports_per_sec": ports / elapsed if elapsed else 0.0,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "max_in_flight": self.max_in_flight,
+            "states": dict(self.states),
+            "errors": dict(self.errors),
+            "latency": {state: histogram.to_dict() for state, histogram in self.latency.items()},
+        }
+
+    def to_json(self, indent=2):
+        """
+        Returns:
+            str: JSON格式的统计信息
+        """
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def dump(self, path):
+        """
+        把统计信息以JSON格式写入文件
+
+        Args:
+            path (str): 文件路径
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+            f.write("\n")
@@ -0,0 +1,143 @@
+"""
+扫描目标解析
+把主机名、IP地址、CIDR网段和地址范围展开为去重后的整数区间集合
+"""
+
+import bisect
+import ipaddress
+
+
+class IntervalSet:
+    """
+    由互不相交的闭区间组成的整数集合
+
+    区间按起点排序，相邻或重叠的区间会被合并，因此一个 /16 网段
+    只占用一个区间，而不是65536个元素。
+    """
+
+    def __init__(self):
+        """初始化空集合"""
+        self._starts = []
+        self._ends = []
+
+    def add(self, start, end=None):
+        """
+        加入闭区间 [start, end]，end 省略时只加入 start
+
+        Args:
+            start (int): 区间起点
+            end (int): 区间终点
+        """
+        if end is None:
+            end = start
+        if end < start:
+            raise ValueError(f"Invalid interval: {start}-{end}")
+
+        # 找出所有与新区间重叠或相邻的区间并合并
+        lo = bisect.bisect_left(self._ends, start - 1)
+        hi = bisect.bisect_right(self._starts, end + 1)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def intervals(self):
+        """
+        返回所有区间
+
+        Returns:
+            list: (起点, 终点) 元组列表
+        """
+        return list(zip(self._starts, self._ends))
+
+    def __contains__(self, value):
+        i = bisect.bisect_right(self._starts, value) - 1
+        return i >= 0 and value <= self._ends[i]
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def __bool__(self):
+        return bool(self._starts)
+
+
+def _parse_range(item):
+    """
+    解析地址范围，支持 "10.0.0.1-10.0.0.20" 和 "10.0.0.1-20" 两种写法
+
+    Args:
+        item (str): 地址范围
+
+    Returns:
+        tuple: (起始地址整数, 结束地址整数)，不是地址范围时返回None
+    """
+    left, _, right = item.partition("-")
+    try:
+        first = ipaddress.IPv4Address(left.strip())
+    except ValueError:
+        return None
+
+    right = right.strip()
+    if right.isdigit() and int(right) <= 255:
+        # 只写了最后一段
+        last = ipaddress.IPv4Address(left.strip().rsplit(".", 1)[0] + "." + right)
+    else:
+        last = ipaddress.IPv4Address(right)
+    return int(first), int(last)
+
+
+def parse_targets(targets):
+    """
+    解析扫描目标列表
+
+    Args:
+        targets (str or list): 目标列表，字符串时以逗号或空白分隔。
+            每一项可以是IP地址、CIDR网段（如 "10.0.0.0/24"）、
+            地址范围（如 "10.0.0.1-20"）或主机名
+
+    Returns:
+        tuple: (IntervalSet, list)，分别是展开后的IPv4地址集合和
+            需要解析的主机名列表（保持输入顺序并去重）
+    """
+    if isinstance(targets, str):
+        targets = targets.replace(",", " ").split()
+
+    addresses = IntervalSet()
+    hostnames = []
+    for item in targets:
+        item = item.strip()
+        if not item:
+            continue
+        if "/" in item:
+            network = ipaddress.IPv4Network(item, strict=False)
+            addresses.add(int(network.network_address), int(network.broadcast_address))
+            continue
+        if "-" in item:
+            bounds = _parse_range(item)
+            if bounds is not None:
+                addresses.add(*bounds)
+                continue
+        try:
+            addresses.add(int(ipaddress.IPv4Address(item)))
+        except ValueError:
+            if item not in hostnames:
+                hostnames.append(item)
+    return addresses, hostnames
+
+
+def format_address(value):
+    """
+    把整数形式的IPv4地址转换为点分十进制字符串
+
+    Args:
+        value (int): 整数地址
+
+    Returns:
+        str: 点分十进制地址
+    """
+    return str(ipaddress.IPv4Address(value))
@@ -3,8 +3,58 @@
 端口扫描器单元测试模块
 """
 
+import asyncio
+import io
+import json
+import os
+import socket
+import tempfile
 import unittest
+from unittest import mock
 import port_scanner
+import scan_engine
+import targets
+import timing
+import resolver
+from port_spec import PortSet
+from common_ports import ports_and_services, ranked_ports
+from scan_journal import ScanJournal
+import banner
+import rate_limit
+import discovery
+from results_store import ResultStore
+import scan_stats
+import benchmark
+
+def open_local_listeners(count):
+    """在本机打开若干监听端口，返回 (套接字列表, 端口列表)"""
+    listeners = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(16)
+        listeners.append(sock)
+    return listeners, sorted(s.getsockname()[1] for s in listeners)
+
+def open_blackhole_port():
+    """
+    打开一个不响应SYN的本机端口：backlog为0且已被占满的监听套接字，
+    内核会直接丢弃新的连接请求，效果等同于被防火墙过滤
+
+    Returns:
+        tuple: (需要保持打开的套接字列表, 端口)
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    sockets = [listener]
+    for _ in range(3):
+        filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        filler.setblocking(False)
+        filler.connect_ex(("127.0.0.1", port))
+        sockets.append(filler)
+    return sockets, port
 
 class TestPortScanner(unittest.TestCase):
     """端口扫描器测试类"""
@@ -78,6 +128,544 @@ class TestPortScanner(unittest.TestCase):
         result = port_scanner.get_open_ports("127.0.0.1", [80, 85])
         self.assertIsInstance(result, list)
     
+    def test_concurrent_scan_finds_local_listeners(self):
+        """测试并发扫描能找到本机监听端口"""
+        listeners, ports = open_local_listeners(3)
+        try:
+            result = port_scanner.get_open_ports("127.0.0.1", [ports[0], ports[-1]],
+                                                 concurrency=50)
+            # 范围内可能还有其他进程的监听端口，只检查我们打开的端口
+            self.assertTrue(set(ports) <= set(result))
+            self.assertEqual(result, sorted(result))
+        finally:
+            for sock in listeners:
+                sock.close()
+
+    def test_async_get_open_ports(self):
+        """测试异步版本的扫描接口"""
+        listeners, ports = open_local_listeners(2)
+        try:
+            result = asyncio.run(port_scanner.async_get_open_ports(
+                "127.0.0.1", [ports[0], ports[-1]], True))
+            self.assertIn("Open ports for 127.0.0.1 (127.0.0.1)", result)
+            self.assertIn(f"{ports[0]:<8} unknown", result)
+        finally:
+            for sock in listeners:
+                sock.close()
+
+    def test_scan_backends(self):
+        """测试各个扫描后端结果一致"""
+        listeners, ports = open_local_listeners(3)
+        try:
+            for backend in scan_engine.BACKENDS:
+                result = port_scanner.get_open_ports("127.0.0.1", [ports[0], ports[-1]],
+                                                     backend=backend)
+                self.assertTrue(set(ports) <= set(result), backend)
+        finally:
+            for sock in listeners:
+                sock.close()
+
+        result = port_scanner.get_open_ports("127.0.0.1", [80, 80], backend="unknown")
+        self.assertEqual(result, "Error: Unknown backend: unknown")
+
+    def test_scan_backends_report_filtered(self):
+        """测试各个扫描后端都能识别超时的端口"""
+        sockets, port = open_blackhole_port()
+        try:
+            for backend in scan_engine.BACKENDS:
+                results = list(scan_engine.scan([("127.0.0.1", port)], backend, timeout=0.2))
+                self.assertEqual(len(results), 1)
+                self.assertEqual(results[0].state, scan_engine.FILTERED, backend)
+        finally:
+            for sock in sockets:
+                sock.close()
+
+    def test_parse_targets(self):
+        """测试目标解析与区间去重"""
+        addresses, hostnames = targets.parse_targets(
+            "10.0.0.0/30, 10.0.0.2-5 10.0.0.5 example.com,example.com")
+        self.assertEqual(addresses.intervals(), [(167772160, 167772165)])
+        self.assertEqual(len(addresses), 6)
+        self.assertEqual(hostnames, ["example.com"])
+
+        addresses, _ = targets.parse_targets(["192.168.1.250-192.168.2.1", "10.0.0.9"])
+        self.assertEqual(len(addresses), 9)
+        self.assertIn(3232236032, addresses)  # 192.168.2.0
+
+    def test_get_open_ports_many(self):
+        """测试多主机扫描"""
+        listeners, ports = open_local_listeners(2)
+        try:
+            result = port_scanner.get_open_ports_many(
+                "127.0.0.1-2, 127.0.0.1/32, localhost", [ports[0], ports[-1]])
+            self.assertEqual(set(result), {"127.0.0.1", "127.0.0.2", "localhost"})
+            self.assertTrue(set(ports) <= set(result["127.0.0.1"]))
+            self.assertEqual(result["localhost"], result["127.0.0.1"])
+
+            result = port_scanner.get_open_ports_many(["127.0.0.1"], [ports[0], ports[0]], True)
+            self.assertEqual(result["127.0.0.1"], port_scanner.format_verbose_output(
+                "127.0.0.1", "127.0.0.1", [ports[0]]))
+        finally:
+            for sock in listeners:
+                sock.close()
+
+    def test_rtt_estimator(self):
+        """测试RTT估算与超时计算"""
+        estimator = timing.RttEstimator()
+        self.assertIsNone(estimator.rto())
+        estimator.update(0.010)
+        self.assertAlmostEqual(estimator.rto(), 0.030)
+        for _ in range(50):
+            estimator.update(0.010)
+        self.assertAlmostEqual(estimator.srtt, 0.010)
+        self.assertLess(estimator.rto(), 0.011)
+
+    def test_adaptive_timing(self):
+        """测试自适应超时收缩、重试和丢包退避"""
+        controller = timing.AdaptiveTiming("aggressive")
+        profile = timing.TIMING_PROFILES["aggressive"]
+        self.assertEqual(controller.timeout("10.0.0.1"), profile.initial_timeout)
+
+        # 无响应的主机不重试
+        filtered = scan_engine.ProbeResult("10.0.0.1", 1, scan_engine.FILTERED, 0.5, 110)
+        controller.sent("10.0.0.1")
+        self.assertFalse(controller.completed(filtered))
+
+        # 收到响应后超时时间收缩到最小值，超时端口会以加倍的超时时间重试
+        closed = scan_engine.ProbeResult("10.0.0.1", 2, scan_engine.CLOSED, 0.0002, 111)
+        controller.sent("10.0.0.1")
+        self.assertFalse(controller.completed(closed))
+        self.assertEqual(controller.timeout("10.0.0.1"), profile.min_timeout)
+        self.assertEqual(controller.timeout("10.0.0.1", 1), profile.min_timeout * 2)
+        controller.sent("10.0.0.1")
+        self.assertTrue(controller.completed(filtered))
+
+        # 重试后才响应视为丢包，并发窗口减半
+        controller.sent("10.0.0.1")
+        controller.completed(closed, attempt=1)
+        self.assertEqual(controller.drops, 1)
+        self.assertEqual(controller._host("10.0.0.1").cwnd, profile.max_parallelism / 2)
+
+    def test_timing_profile_scan(self):
+        """测试自适应时序下各后端的扫描结果"""
+        listeners, ports = open_local_listeners(1)
+        sockets, filtered_port = open_blackhole_port()
+        probes = [("127.0.0.1", ports[0]), ("127.0.0.1", filtered_port)]
+        try:
+            for backend in scan_engine.BACKENDS:
+                results = scan_engine.scan(probes, backend,
+                                           timing=timing.AdaptiveTiming("insane"))
+                states = {result.port: result.state for result in results}
+                self.assertEqual(states, {ports[0]: scan_engine.OPEN,
+                                          filtered_port: scan_engine.FILTERED}, backend)
+        finally:
+            for sock in listeners + sockets:
+                sock.close()
+
+        result = port_scanner.get_open_ports("127.0.0.1", [80, 80], timing="unknown")
+        self.assertEqual(result, "Error: Unknown timing profile: unknown")
+
+    def test_iter_open_ports(self):
+        """测试流式产出开放端口"""
+        listeners, ports = open_local_listeners(2)
+        try:
+            found = {}
+            for port, service, latency in port_scanner.iter_open_ports(
+                    "127.0.0.1", [ports[0], ports[-1]]):
+                found[port] = service
+                self.assertGreaterEqual(latency, 0)
+            self.assertTrue(set(ports) <= set(found))
+            self.assertEqual(found[ports[0]], "unknown")
+        finally:
+            for sock in listeners:
+                sock.close()
+
+        with self.assertRaises(ValueError):
+            list(port_scanner.iter_open_ports("invalid-hostname-12345", [80, 90]))
+
+    def test_write_verbose_output(self):
+        """测试流式详细输出与 format_verbose_output 一致"""
+        for open_ports in ([], [22, 80, 443], [5000]):
+            buffer = io.StringIO()
+            port_scanner.write_verbose_output("test.com", "192.168.1.1", iter(open_ports), buffer)
+            self.assertEqual(buffer.getvalue(), port_scanner.format_verbose_output(
+                "test.com", "192.168.1.1", open_ports))
+
+        listeners, ports = open_local_listeners(1)
+        try:
+            buffer = io.StringIO()
+            error = port_scanner.stream_verbose_output("127.0.0.1", [ports[0], ports[0]], buffer)
+            self.assertIsNone(error)
+            self.assertEqual(buffer.getvalue(), port_scanner.format_verbose_output(
+                "127.0.0.1", "127.0.0.1", ports))
+        finally:
+            for sock in listeners:
+                sock.close()
+
+    def test_resolver_cache(self):
+        """测试解析缓存的命中、过期和失败缓存"""
+        now = [0.0]
+        cache = resolver.Resolver(ttl=60, negative_ttl=5, clock=lambda: now[0])
+        lookups = []
+
+        def fake_getaddrinfo(hostname):
+            lookups.append(hostname)
+            if hostname == "missing.example":
+                raise socket.gaierror(socket.EAI_NONAME, "not found")
+            return ["10.0.0.1", "fe80::1"]
+
+        with mock.patch.object(resolver, "_getaddrinfo", fake_getaddrinfo):
+            self.assertEqual(cache.resolve("a.example"), ["10.0.0.1", "fe80::1"])
+            self.assertEqual(cache.resolve_one("a.example"), "10.0.0.1")
+            self.assertEqual(lookups, ["a.example"])
+
+            now[0] = 61
+            cache.resolve("a.example")
+            self.assertEqual(lookups, ["a.example", "a.example"])
+
+            for _ in range(2):
+                with self.assertRaises(socket.gaierror):
+                    cache.resolve("missing.example")
+            self.assertEqual(lookups.count("missing.example"), 1)
+
+            results = cache.resolve_many(["a.example", "b.example", "missing.example", "::1"])
+            self.assertEqual(results["b.example"], ["10.0.0.1", "fe80::1"])
+            self.assertIsInstance(results["missing.example"], socket.gaierror)
+            self.assertEqual(results["::1"], ["::1"])
+            self.assertEqual(lookups.count("a.example"), 2)
+
+    def test_ipv6_target(self):
+        """测试IPv6目标扫描"""
+        if not socket.has_ipv6:
+            self.skipTest("IPv6 not available")
+        listener = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        try:
+            listener.bind(("::1", 0))
+        except OSError:
+            listener.close()
+            self.skipTest("IPv6 loopback not available")
+        listener.listen(16)
+        port = listener.getsockname()[1]
+        try:
+            for backend in scan_engine.BACKENDS:
+                result = port_scanner.get_open_ports("::1", [port, port], backend=backend)
+                self.assertEqual(result, [port], backend)
+        finally:
+            listener.close()
+
+    def test_port_spec(self):
+        """测试端口规格解析与扫描顺序"""
+        ports = PortSet.parse("1-10, 3306,8000-8002,top3")
+        self.assertEqual(len(ports), 10 + 1 + 3 + 3)
+        self.assertIn(3306, ports)
+        self.assertIn(443, ports)
+        self.assertNotIn(11, ports)
+        self.assertEqual(list(PortSet.parse("8002,8000-8001,1")), [1, 8000, 8001, 8002])
+
+        # 常见端口按频率排在前面，其余端口按端口号升序
+        order = list(PortSet.parse("1-25,80,443,3306").scan_order())
+        self.assertEqual(order[:5], [80, 23, 443, 21, 22])
+        self.assertEqual(order[-3:], [18, 19, 24])
+        self.assertEqual(sorted(order), list(PortSet.parse("1-25,80,443,3306")))
+
+        self.assertEqual(list(PortSet.from_range([5, 7])), [5, 6, 7])
+        self.assertEqual(len(PortSet.from_range([7, 5])), 0)
+        with self.assertRaises(ValueError):
+            PortSet.parse("70000")
+        with self.assertRaises(ValueError):
+            PortSet.parse("http")
+
+        # topN 不能超过常见端口表的长度
+        self.assertEqual(len(PortSet.parse(f"top{len(ranked_ports)}")), len(ranked_ports))
+        self.assertEqual(set(ranked_ports), set(ports_and_services))
+        for spec in (f"top{len(ranked_ports) + 1}", "top1000", "top0"):
+            with self.assertRaises(ValueError):
+                PortSet.parse(spec)
+
+    def test_stop_after(self):
+        """测试找到指定数量的开放端口后提前结束"""
+        listeners, ports = open_local_listeners(3)
+        spec = ",".join(str(port) for port in ports)
+        try:
+            for backend in scan_engine.BACKENDS:
+                result = port_scanner.get_open_ports("127.0.0.1", spec, backend=backend)
+                self.assertEqual(result, ports, backend)
+                result = port_scanner.get_open_ports("127.0.0.1", spec, backend=backend,
+                                                     stop_after=1)
+                self.assertEqual(len(result), 1, backend)
+            result = port_scanner.get_open_ports_many("127.0.0.1", spec, stop_after=2)
+            self.assertEqual(len(result["127.0.0.1"]), 2)
+        finally:
+            for sock in listeners:
+                sock.close()
+
+    def test_resume_from_journal(self):
+        """测试中断后从扫描进度日志继续"""
+        listeners, ports = open_local_listeners(3)
+        spec = ",".join(str(port) for port in ports)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scan.journal")
+            try:
+                # 模拟只扫描了第一个端口就被中断的扫描
+                with ScanJournal(path) as journal:
+                    for result in journal.record(scan_engine.scan([("127.0.0.1", ports[0])])):
+                        self.assertEqual(result.state, scan_engine.OPEN)
+                journal = ScanJournal(path)
+                self.assertTrue(journal.is_probed("127.0.0.1", ports[0]))
+                self.assertFalse(journal.is_probed("127.0.0.1", ports[1]))
+                self.assertEqual(journal.open_ports("127.0.0.1"), ports[:1])
+
+                # 关闭已记录的端口：继续扫描时不会重新探测它，结果仍来自日志
+                for sock in listeners:
+                    if sock.getsockname()[1] == ports[0]:
+                        sock.close()
+                result = port_scanner.get_open_ports("127.0.0.1", spec, resume=path)
+                self.assertEqual(result, ports)
+                self.assertFalse(os.path.exists(path))
+
+                # 扫描完成后日志被删除，再次扫描会重新探测所有端口
+                result = port_scanner.get_open_ports_many("127.0.0.1", spec, resume=path)
+                self.assertEqual(result["127.0.0.1"], ports[1:])
+                self.assertFalse(os.path.exists(path))
+            finally:
+                for sock in listeners:
+                    sock.close()
+
+    def test_banner_signatures(self):
+        """测试横幅特征索引"""
+        self.assertEqual(banner.match_banner(b"SSH-2.0-OpenSSH_8.9p1\r\n"), "ssh")
+        self.assertEqual(banner.match_banner(b"HTTP/1.1 200 OK\r\n"), "http")
+        self.assertEqual(banner.match_banner(b"220 ProFTPD Server ready\r\n"), "ftp")
+        self.assertEqual(banner.match_banner(b"220 mx.example.com ESMTP Postfix\r\n"), "smtp")
+        self.assertEqual(banner.match_banner(b"+OK POP3 ready\r\n"), "pop3")
+        self.assertIsNone(banner.match_banner(b""))
+        # 无法识别时退回常见端口字典
+        self.assertEqual(banner.identify_service(80, b"garbage"), "http")
+        self.assertEqual(banner.identify_service(2, b""), "unknown")
+
+    def test_banner_grabbing(self):
+        """测试详细模式下通过横幅识别非标准端口上的服务"""
+        with benchmark.ServerFarm(open_count=1, closed_count=1, blackholed_count=0,
+                                  delayed_count=1, delay=0.05) as farm:
+            ports = sorted(farm.expected)
+            spec = ",".join(str(port) for port in ports)
+            open_ports = [port for port in ports if farm.expected[port] == scan_engine.OPEN]
+            # 延迟端口在连接后发送SSH横幅，另一个开放端口立即关闭连接
+            ssh_ports = [port for port in open_ports
+                         if banner.grab_banner(farm.host, port).startswith(b"SSH-")]
+            self.assertEqual(len(ssh_ports), 1)
+
+            result = port_scanner.get_open_ports(farm.host, spec, verbose=True, banners=True)
+            self.assertIn(f"{ssh_ports[0]:<8} ssh", result)
+            result = port_scanner.get_open_ports(farm.host, spec, verbose=True)
+            self.assertNotIn("ssh", result)
+            result = port_scanner.get_open_ports_many(farm.host, spec, verbose=True, banners=True)
+            self.assertIn(f"{ssh_ports[0]:<8} ssh", result[farm.host])
+            result = asyncio.run(port_scanner.async_get_open_ports(farm.host, spec, verbose=True,
+                                                                   banners=True))
+            self.assertIn(f"{ssh_ports[0]:<8} ssh", result)
+
+    def test_token_bucket(self):
+        """测试令牌桶"""
+        now = [0.0]
+        bucket = rate_limit.TokenBucket(10, burst=2, clock=lambda: now[0])
+        self.assertEqual(bucket.delay(), 0)
+        bucket.take()
+        bucket.take()
+        self.assertAlmostEqual(bucket.delay(), 0.1)
+        now[0] = 0.05
+        self.assertAlmostEqual(bucket.delay(), 0.05)
+        # 令牌最多积攒 burst 个
+        now[0] = 10.0
+        bucket.take()
+        bucket.take()
+        self.assertGreater(bucket.delay(), 0)
+
+    def test_rate_limited_timing(self):
+        """测试速率限制的时序控制器使用限制器的时钟计算等待时间"""
+        now = [100.0]
+        limiter = rate_limit.RateLimiter(rate=10, burst=1, clock=lambda: now[0])
+        timing = rate_limit.RateLimitedTiming(scan_engine.FixedTiming(), limiter)
+        self.assertIsNone(timing.wait_time())
+        self.assertTrue(timing.admit("h"))
+        timing.sent("h")
+        self.assertFalse(timing.admit("h"))
+        now[0] = 100.04
+        self.assertAlmostEqual(timing.wait_time(), 0.06)
+        # 被挡住的状态在 wait_time() 之后清除
+        self.assertIsNone(timing.wait_time())
+        now[0] = 100.2
+        self.assertTrue(timing.admit("h"))
+
+    def test_rate_limit(self):
+        """测试全局和单主机速率上限"""
+        with benchmark.ServerFarm(open_count=0, closed_count=30, blackholed_count=0,
+                                  delayed_count=0) as farm:
+            ports = sorted(farm.expected)
+            spec = ",".join(str(port) for port in ports)
+            for backend in scan_engine.BACKENDS:
+                limiter = rate_limit.RateLimiter(rate=300, burst=1)
+                result = port_scanner.get_open_ports(farm.host, spec, backend=backend,
+                                                     rate=limiter)
+                self.assertEqual(result, [], backend)
+                stats = limiter.stats()
+                self.assertEqual(stats["sent"], len(ports), backend)
+                self.assertLessEqual(stats["rate"], 300 * 1.05, backend)
+                self.assertGreater(stats["elapsed"], (len(ports) - 1) / 300 * 0.95, backend)
+
+            limiter = rate_limit.RateLimiter(host_rate=200)
+            result = port_scanner.get_open_ports_many(["127.0.0.1", "127.0.0.2"], spec,
+                                                      rate=limiter)
+            self.assertEqual(result, {"127.0.0.1": [], "127.0.0.2": []})
+            self.assertEqual(limiter.host_sent, {"127.0.0.1": len(ports), "127.0.0.2": len(ports)})
+            self.assertLessEqual(limiter.stats()["max_host_rate"], 200 * 1.1)
+            # 两个主机各自受限，总速率超过单主机上限
+            self.assertGreater(limiter.stats()["rate"], 200 * 1.1)
+
+    def test_host_discovery(self):
+        """测试主机发现：不响应的主机不做完整扫描"""
+        sockets, blackhole = open_blackhole_port()
+        listeners, ports = open_local_listeners(1)
+        spec = str(ports[0])
+        real_discover = discovery.discover_hosts
+        try:
+            # 127.0.0.1 上的黑洞端口超时，127.0.0.2 上同一端口被拒绝（RST说明主机在线）
+            alive = discovery.discover_hosts(["127.0.0.1", "127.0.0.2"], ports=[blackhole],
+                                             timeout=0.2)
+            self.assertEqual(alive, {"127.0.0.2": {blackhole: scan_engine.CLOSED}})
+
+            def discover_with(discovery_ports):
+                return lambda hosts, **kwargs: real_discover(hosts, ports=discovery_ports,
+                                                             **kwargs)
+
+            targets = ["127.0.0.1", "127.0.0.2"]
+            with mock.patch.object(port_scanner, "discover_hosts", discover_with([blackhole])):
+                result = port_scanner.get_open_ports_many(targets, spec, timeout=0.2,
+                                                          discover=True)
+            # 127.0.0.1 被判定为不在线，因此没有扫描到开放端口
+            self.assertEqual(result, {"127.0.0.1": [], "127.0.0.2": []})
+            result = port_scanner.get_open_ports_many(targets, spec, timeout=0.2)
+            self.assertEqual(result, {"127.0.0.1": ports, "127.0.0.2": []})
+
+            # 发现阶段找到的开放端口直接计入结果，不再重复探测
+            real_scan = scan_engine.scan
+            scanned = []
+
+            def recording_scan(probes, *args, **kwargs):
+                probes = list(probes)
+                scanned.append(probes)
+                return real_scan(probes, *args, **kwargs)
+
+            with mock.patch.object(port_scanner, "discover_hosts", discover_with(ports)), \
+                    mock.patch.object(scan_engine, "scan", recording_scan):
+                result = port_scanner.get_open_ports_many(targets, spec, discover=True)
+            self.assertEqual(result, {"127.0.0.1": ports, "127.0.0.2": []})
+            self.assertEqual(len(scanned), 2)
+            self.assertEqual(scanned[-1], [])
+        finally:
+            for sock in sockets + listeners:
+                sock.close()
+
+    def test_rescan(self):
+        """测试基于上次结果的增量重扫"""
+        listeners, open_ports = open_local_listeners(2)
+        with benchmark.ServerFarm(open_count=0, closed_count=20, blackholed_count=0,
+                                  delayed_count=0) as farm, \
+                tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            spec = ",".join(str(port) for port in open_ports + sorted(farm.expected))
+            try:
+                result = port_scanner.rescan("127.0.0.1", spec, path)
+                self.assertEqual(result["127.0.0.1"], {"open": open_ports, "opened": open_ports,
+                                                       "closed": [], "probed": 22})
+
+                # 每次只抽查四分之一的历史关闭端口，抽查的端口逐次轮换，4次覆盖全部
+                probed = 0
+                for _ in range(4):
+                    summary = port_scanner.rescan("127.0.0.1", spec, path,
+                                                  sample=0.25)["127.0.0.1"]
+                    self.assertEqual(summary["open"], open_ports)
+                    self.assertEqual(summary["opened"], [])
+                    self.assertLess(summary["probed"], 22)
+                    # 上次开放的端口每次都会探测
+                    probed += summary["probed"] - 2
+                self.assertEqual(probed, 20)
+
+                # 关闭一个端口后报告变化，并写回结果存储
+                for sock in listeners:
+                    if sock.getsockname()[1] == open_ports[1]:
+                        sock.close()
+                store = ResultStore(path)
+                summary = port_scanner.rescan("127.0.0.1", spec, store, sample=0.25)["127.0.0.1"]
+                self.assertEqual(summary["open"], open_ports[:1])
+                self.assertEqual(summary["closed"], open_ports[1:])
+                self.assertEqual(list(ResultStore(path).get("127.0.0.1").open), open_ports[:1])
+                self.assertEqual(store.get("127.0.0.1").runs, 6)
+
+                with self.assertRaises(ValueError):
+                    port_scanner.rescan("127.0.0.1", spec, path, sample=0)
+            finally:
+                for sock in listeners:
+                    sock.close()
+
+    def test_latency_histogram(self):
+        """测试耗时直方图"""
+        histogram = scan_stats.LatencyHistogram()
+        for latency in (0.00005, 0.0003, 0.0003, 0.002, 100.0):
+            histogram.add(latency)
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.0004)
+        self.assertEqual(histogram.percentile(1.0), 100.0)
+        report = histogram.to_dict()
+        self.assertEqual(report["buckets_ms"], {"0.1": 1, "0.4": 2, "3.2": 1, "inf": 1})
+        self.assertEqual(report["max_ms"], 100000.0)
+
+        # 合并多个状态的直方图
+        stats = scan_stats.ScanStats()
+        stats.latency = {"open": histogram, "filtered": scan_stats.LatencyHistogram()}
+        stats.latency["filtered"].add(5.0)
+        combined = stats.combined_latency(("open", "closed"))
+        self.assertEqual(combined.counts, histogram.counts)
+        self.assertEqual((combined.min, combined.max), (0.00005, 100.0))
+        self.assertEqual(stats.combined_latency().count, 6)
+        self.assertEqual(stats.combined_latency(()).percentile(0.5), 0.0)
+
+    def test_scan_stats(self):
+        """测试扫描统计：各状态、错误码、在途连接数峰值和耗时"""
+        with benchmark.ServerFarm(open_count=2, closed_count=10, blackholed_count=1,
+                                  delayed_count=0) as farm:
+            spec = ",".join(str(port) for port in farm.expected)
+            for backend in scan_engine.BACKENDS:
+                stats = scan_stats.ScanStats()
+                result = port_scanner.get_open_ports(farm.host, spec, backend=backend,
+                                                     concurrency=4, timeout=0.2, stats=stats)
+                self.assertEqual(len(result), 2, backend)
+                report = json.loads(stats.to_json())
+                self.assertEqual(report["states"], {"open": 2, "closed": 10, "filtered": 1},
+                                 backend)
+                self.assertEqual(report["errors"], {"ECONNREFUSED": 10, "ETIMEDOUT": 1}, backend)
+                self.assertEqual(report["attempts"], 13, backend)
+                self.assertEqual(report["latency"]["closed"]["count"], 10, backend)
+                self.assertGreaterEqual(report["latency"]["filtered"]["min_ms"], 200 * 0.9)
+                self.assertGreaterEqual(report["elapsed"], 0.2 * 0.9)
+                expected_in_flight = 1 if backend == "sequential" else 4
+                self.assertLessEqual(report["max_in_flight"], expected_in_flight, backend)
+                self.assertEqual(stats.in_flight, 0, backend)
+
+    def test_benchmark_server_farm(self):
+        """测试本机模拟服务器与基准统计"""
+        with benchmark.ServerFarm(open_count=2, closed_count=20, blackholed_count=1,
+                                  delayed_count=1, delay=0.05) as farm:
+            ports = sorted(farm.expected)
+            self.assertEqual(len(ports), 24)
+            for backend in scan_engine.BACKENDS:
+                report = benchmark.benchmark_backend(backend, farm.host, ports, timeout=0.2,
+                                                     expected=farm.expected)
+                self.assertEqual(report["accuracy"], 1.0, backend)
+                self.assertEqual(len(report["open_ports"]), 3)
+                self.assertGreater(report["ports_per_sec"], 0)
+                self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
     def test_error_handling(self):
         """测试错误处理"""
         # 测试空端口范围
@@ -0,0 +1,222 @@
+"""
+扫描时序控制
+按主机估算往返时间（RTT），据此收缩连接超时时间，并在检测到丢包时减小并发窗口
+"""
+
+import time
+from collections import namedtuple
+
+from scan_engine import OPEN, CLOSED, FILTERED, DEFAULT_TIMEOUT, FixedTiming
+from rate_limit import RateLimiter, RateLimitedTiming
+
+# 时序配置：初始/最小/最大超时时间（秒），最大重试次数，每个主机的最小/最大并发窗口
+TimingProfile = namedtuple("TimingProfile", [
+    "initial_timeout", "min_timeout", "max_timeout",
+    "max_retries", "min_parallelism", "max_parallelism",
+])
+
+TIMING_PROFILES = {
+    "polite": TimingProfile(1.0, 0.1, 10.0, 3, 1, 10),
+    "normal": TimingProfile(1.0, 0.1, 10.0, 2, 1, 300),
+    "aggressive": TimingProfile(0.5, 0.1, 1.25, 2, 4, 1000),
+    "insane": TimingProfile(0.25, 0.05, 0.3, 1, 8, 5000),
+}
+
+
+class RttEstimator:
+    """
+    平滑往返时间估算器，算法与TCP的重传超时（RFC 6298）相同
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self):
+        """初始化估算器"""
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def update(self, rtt):
+        """
+        加入一个RTT样本
+
+        Args:
+            rtt (float): 本次测得的往返时间（秒）
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+
+    def rto(self):
+        """
+        计算重传超时时间
+
+        Returns:
+            float: srtt + 4 * rttvar，尚无样本时返回None
+        """
+        if self.srtt is None:
+            return None
+        return self.srtt + 4 * self.rttvar
+
+
+class _HostState:
+    """单个主机的RTT估算和拥塞窗口"""
+
+    def __init__(self, profile):
+        self.rtt = RttEstimator()
+        # 未检测到丢包之前不限制该主机的并发数
+        self.cwnd = float(profile.max_parallelism)
+        self.ssthresh = float(profile.max_parallelism)
+        self.in_flight = 0
+        self.last_backoff = 0.0
+
+
+class AdaptiveTiming:
+    """
+    自适应时序控制器
+
+    - 超时时间：每个主机独立维护平滑RTT和方差，超时时间取 srtt + 4 * rttvar，
+      并限制在配置的最小值和最大值之间；尚无样本时使用初始超时时间
+    - 重试：已经响应过的主机上超时的端口会以加倍的超时时间重试，避免漏报
+    - 拥塞控制：重试后才得到响应说明之前的探测被丢弃，此时把该主机的并发窗口减半
+      （每个RTT最多一次）；之后每收到一个响应窗口逐渐恢复，与TCP的AIMD相同
+    """
+
+    def __init__(self, profile):
+        """
+        初始化控制器
+
+        Args:
+            profile (TimingProfile or str): 时序配置或配置名称
+        """
+        if isinstance(profile, str):
+            if profile not in TIMING_PROFILES:
+                raise ValueError(f"Unknown timing profile: {profile}")
+            profile = TIMING_PROFILES[profile]
+        self.profile = profile
+        self.max_retries = profile.max_retries
+        self._hosts = {}
+        self.drops = 0
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.profile)
+        return state
+
+    def timeout(self, host, attempt=0):
+        """
+        计算下一次连接的超时时间
+
+        Args:
+            host (str): 目标主机
+            attempt (int): 第几次重试，0表示首次探测
+
+        Returns:
+            float: 超时时间（秒）
+        """
+        rto = self._host(host).rtt.rto()
+        if rto is None:
+            rto = self.profile.initial_timeout
+        rto = max(self.profile.min_timeout, min(rto, self.profile.max_timeout))
+        return min(rto * (2 ** attempt), self.profile.max_timeout)
+
+    def admit(self, host):
+        """
+        判断该主机的并发窗口是否允许再发起一个连接
+
+        Args:
+            host (str): 目标主机
+
+        Returns:
+            bool: 允许时返回True
+        """
+        state = self._host(host)
+        return state.in_flight < max(self.profile.min_parallelism, int(state.cwnd))
+
+    def sent(self, host):
+        """
+        记录已向该主机发起一个连接
+
+        Args:
+            host (str): 目标主机
+        """
+        self._host(host).in_flight += 1
+
+    def completed(self, result, attempt=0):
+        """
+        记录一个连接的结果，并判断是否需要重试
+
+        Args:
+            result (ProbeResult): 探测结果
+            attempt (int): 第几次重试，0表示首次探测
+
+        Returns:
+            bool: 需要重试时返回True
+        """
+        state = self._host(result.host)
+        state.in_flight -= 1
+
+        if result.state in (OPEN, CLOSED):
+            state.rtt.update(result.latency)
+            if attempt > 0:
+                # 重试才得到响应，说明之前的探测被丢弃
+                self._backoff(state)
+            elif state.cwnd < state.ssthresh:
+                state.cwnd += 1
+            else:
+                state.cwnd += 1 / state.cwnd
+            state.cwnd = min(state.cwnd, self.profile.max_parallelism)
+            return False
+
+        # 只对已经响应过的主机重试，完全无响应的主机大概率整体被过滤
+        return (result.state == FILTERED and attempt < self.max_retries
+                and state.rtt.samples > 0)
+
+    def wait_time(self):
+        """并发窗口只在连接完成时变化，无需定时等待"""
+        return None
+
+    def _backoff(self, state):
+        """检测到丢包时把并发窗口减半，每个RTT内最多减一次"""
+        now = time.monotonic()
+        if now - state.last_backoff < (state.rtt.srtt or 0):
+            return
+        state.last_backoff = now
+        state.ssthresh = max(state.cwnd / 2, self.profile.min_parallelism)
+        state.cwnd = state.ssthresh
+        self.drops += 1
+
+
+def make_timing(timing=None, timeout=DEFAULT_TIMEOUT, rate=None, host_rate=None):
+    """
+    根据参数创建时序控制器
+
+    Args:
+        timing (str or TimingProfile or None): 时序配置；为None时使用固定超时
+        timeout (float): 固定超时时间（秒），仅在 timing 为None时使用
+        rate (float or RateLimiter): 全局每秒最多发起的连接数，或共享的速率限制器；
+            默认为None（不限制）
+        host_rate (float): 每个主机每秒最多发起的连接数，默认为None（不限制）；
+            rate 为 RateLimiter 时忽略
+
+    Returns:
+        时序控制器
+    """
+    if timing is None:
+        controller = FixedTiming(timeout)
+    elif isinstance(timing, (str, TimingProfile)):
+        controller = AdaptiveTiming(timing)
+    else:
+        controller = timing
+
+    if isinstance(rate, RateLimiter):
+        return RateLimitedTiming(controller, rate)
+    if rate or host_rate:
+        return RateLimitedTiming(controller, RateLimiter(rate, host_rate))
+    return controller